@@ -4,23 +4,29 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
-#results (from your run outputs)
+# Results store written by Source_Codes/Benchmark/benchmark.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Source_Codes', 'Benchmark'))
+import results_store
+
+# Configurations compared by default: (label, implementation, workers, array size)
+DEFAULT_CONFIGS = [
+    ('Serial', 'serial', 1, 10_000_000),
+    ('OpenMP (8 threads)', 'openmp', 8, 10_000_000),
+    ('MPI (8 processes)', 'mpi', 8, 10_000_000),
+    ('CUDA (256 blocks)', 'cuda', 256, 10_000_000),
+]
 
 def default_data_df():
-    data = {
-        'Implementation': [
-            'Serial',
-            'OpenMP (8 threads)',
-            'MPI (8 processes)',
-            'CUDA (256 blocks)'
-        ],
-        'ExecutionTimeSeconds': [
-            1.589532,   # Serial
-            0.208704,   # OpenMP (8 threads)
-            0.220486,   # MPI (8 processes)
-            1.228265    # CUDA (block size 256)
-        ]
-    }
+    data = {'Implementation': [], 'ExecutionTimeSeconds': []}
+    for label, implementation, workers, size in DEFAULT_CONFIGS:
+        rows = results_store.select(implementation, size=size, workers=workers)
+        if not rows:
+            print(f"Warning: no '{label}' result for {size} elements in {results_store.STORE}; skipped.")
+            continue
+        data['Implementation'].append(label)
+        data['ExecutionTimeSeconds'].append(rows[0]['median_s'])
+    if not data['Implementation']:
+        raise SystemExit("The results store is empty - run Source_Codes/Benchmark/benchmark.py first")
     return pd.DataFrame(data)
 
 
@@ -199,7 +205,7 @@ def plot_combined(df, out_path):
 # Main routine
 # -------------------------
 def main(argv):
-    # optional CSV: Implementation,ExecutionTimeSeconds
+    # optional CSV: Implementation,ExecutionTimeSeconds (default: the results store)
     if len(argv) >= 2:
         csv_path = argv[1]
         if not os.path.exists(csv_path):
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Benchmark runner for the Serial, OpenMP, MPI and CUDA quick sorts.
+
+Builds the selected programs with their Makefiles, runs every combination of
+array size, worker count (threads, MPI processes or CUDA block size) and
+input distribution (--distribution of the CPU programs) for a number of
+warmup and timed trials, and stores the median, p95 and standard deviation
+in results.csv (see results_store.py).
+The CPU programs are run with --json and report one record per run; for
+CUDA the "Execution Time" and "Elements/second" lines are parsed.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+
+import results_store
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Program directory and executable of each implementation
+IMPLEMENTATIONS = {
+    'serial': ('Serial', 'serial'),
+    'openmp': ('OpenMP', 'quicksort_omp'),
+    'mpi': ('MPI', 'quicksort_mpi'),
+    'cuda': ('CUDA', 'cuda_quicksort'),
+}
+
+# Extra program arguments of each input distribution (see ../Common/generate.h;
+# CUDA generates uniform random keys only)
+DISTRIBUTIONS = {name: [f'--distribution={name}'] for name in (
+    'random', 'sorted', 'reverse', 'organ-pipe', 'zipf', 'equal', 'few-unique', 'nearly-sorted')}
+
+TIME_PATTERN = re.compile(r'Execution Time:\s*([0-9.]+)\s*seconds')
+RATE_PATTERN = re.compile(r'Elements/second:\s*([0-9.]+)\s*million')
+
+
+def command(implementation, size, workers, distribution, options, mpirun, seed=None):
+    """Arguments and standard input for one run."""
+    directory, binary = IMPLEMENTATIONS[implementation]
+    path = os.path.join(SOURCE_DIR, directory, binary)
+    if implementation == 'cuda':
+        if distribution != 'random':
+            raise RuntimeError(f"cuda generates random keys only, not '{distribution}'")
+        extra = options
+    else:
+        extra = DISTRIBUTIONS[distribution] + options + ['--json']
+        if seed is not None:
+            extra = extra + [f'--seed={seed}']
+    if implementation == 'serial':
+        return [path, str(size)] + extra, None
+    if implementation == 'openmp':
+        return [path, str(size), str(workers)] + extra, None
+    if implementation == 'mpi':
+        return mpirun + ['-np', str(workers), path, str(size)] + extra, None
+    # cuda reads the block size, then the array size, from standard input
+    return [path] + extra, f'{workers}\n{size}\n'
+
+def run_once(argv, stdin):
+    """Run the program once and return (seconds, million elements/second or None)."""
+    result = subprocess.run(argv, input=stdin, capture_output=True, text=True)
+    output = result.stdout
+    if result.returncode != 0 or 'FAILED' in output:
+        tail = (output + result.stderr).strip().splitlines()[-5:]
+        raise RuntimeError(f"{' '.join(argv)} failed (exit {result.returncode}):\n  "
+                           + '\n  '.join(tail))
+    if '--json' in argv:
+        record = json.loads(output.strip().splitlines()[-1])
+        if not record['verified']:
+            raise RuntimeError(f"{' '.join(argv)} produced an unsorted array")
+        return record['time_s'], record['throughput_meps']
+    time_match = TIME_PATTERN.search(output)
+    if time_match is None:
+        raise RuntimeError(f"no 'Execution Time' line in the output of {' '.join(argv)}")
+    rate_match = RATE_PATTERN.search(output)
+    return float(time_match.group(1)), float(rate_match.group(1)) if rate_match else None
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def measure(implementation, size, workers, distribution, options, trials, warmup, mpirun,
+            seed=None):
+    """Run one configuration and return its results store row."""
+    argv, stdin = command(implementation, size, workers, distribution, options, mpirun, seed)
+    for _ in range(warmup):
+        run_once(argv, stdin)
+    times, rates = [], []
+    for _ in range(trials):
+        seconds, rate = run_once(argv, stdin)
+        times.append(seconds)
+        if rate is not None:
+            rates.append(rate)
+    median = statistics.median(times)
+    return {
+        'implementation': implementation,
+        'size': size,
+        'workers': workers,
+        'distribution': distribution,
+        'options': ' '.join(options),
+        'trials': trials,
+        'warmup': warmup,
+        'median_s': f'{median:.6f}',
+        'p95_s': f'{percentile(times, 0.95):.6f}',
+        'stddev_s': f'{statistics.stdev(times) if trials > 1 else 0.0:.6f}',
+        'min_s': f'{min(times):.6f}',
+        'throughput_meps': f'{statistics.median(rates) if rates else size / median / 1e6:.2f}',
+        'host': platform.node(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+
+def build(implementation):
+    directory = os.path.join(SOURCE_DIR, IMPLEMENTATIONS[implementation][0])
+    print(f"Building {implementation} (make -C {directory})...")
+    subprocess.run(['make', '-s', '-C', directory], check=True)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-i', '--implementations', nargs='+', default=['serial', 'openmp', 'mpi'],
+                        choices=sorted(IMPLEMENTATIONS), metavar='IMPL',
+                        help='serial, openmp, mpi and/or cuda (default: serial openmp mpi)')
+    parser.add_argument('-s', '--sizes', nargs='+', type=int, default=[10_000_000],
+                        help='array sizes (default: 10000000)')
+    parser.add_argument('-w', '--workers', nargs='+', type=int, default=[1, 2, 4, 8],
+                        help='OpenMP threads / MPI processes (default: 1 2 4 8)')
+    parser.add_argument('-b', '--block-sizes', nargs='+', type=int, default=[64, 128, 256, 512],
+                        help='CUDA block sizes (default: 64 128 256 512)')
+    parser.add_argument('-d', '--distributions', nargs='+', default=['random'],
+                        choices=sorted(DISTRIBUTIONS), metavar='DIST',
+                        help='input distributions: ' + ', '.join(DISTRIBUTIONS)
+                        + ' (default: random)')
+    parser.add_argument('--seed', type=int,
+                        help='input seed passed to the CPU programs, so every trial and '
+                        'implementation sorts the same keys (default: a new seed per run)')
+    parser.add_argument('-t', '--trials', type=int, default=5, help='timed trials (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed warmup runs (default: 1)')
+    parser.add_argument('--options', default='',
+                        help="extra program options, e.g. --options='--pivot=ninther --partition=3way'")
+    parser.add_argument('--mpirun', default='mpirun',
+                        help="MPI launcher command (default: 'mpirun')")
+    parser.add_argument('--store', default=results_store.STORE,
+                        help='results file (default: results.csv next to this script)')
+    parser.add_argument('--no-build', action='store_true', help='skip the make step')
+    args = parser.parse_args(argv)
+    if args.trials < 1 or args.warmup < 0:
+        parser.error('--trials must be >= 1 and --warmup >= 0')
+    return args
+
+def main(argv):
+    args = parse_args(argv)
+    options = shlex.split(args.options)
+    mpirun = shlex.split(args.mpirun)
+
+    if not args.no_build:
+        for implementation in args.implementations:
+            build(implementation)
+
+    rows = []
+    print(f"\n{'Implementation':<16} {'Size':>11} {'Workers':>8} {'Dist':<10} "
+          f"{'Median (s)':>11} {'p95 (s)':>10} {'Stddev':>9} {'M elem/s':>9}")
+    print('-' * 90)
+    for implementation in args.implementations:
+        if implementation == 'serial':
+            workers_list = [1]
+        elif implementation == 'cuda':
+            workers_list = args.block_sizes
+        else:
+            workers_list = args.workers
+        for distribution in args.distributions:
+            for size in args.sizes:
+                for workers in workers_list:
+                    try:
+                        row = measure(implementation, size, workers, distribution, options,
+                                      args.trials, args.warmup, mpirun, args.seed)
+                    except (OSError, RuntimeError) as error:
+                        print(f"✗ {implementation} size={size} workers={workers}: {error}",
+                              file=sys.stderr)
+                        continue
+                    rows.append(row)
+                    print(f"{implementation:<16} {size:>11} {workers:>8} {distribution:<10} "
+                          f"{row['median_s']:>11} {row['p95_s']:>10} {row['stddev_s']:>9} "
+                          f"{row['throughput_meps']:>9}")
+
+    if rows:
+        results_store.update(rows, args.store)
+        print(f"\n✓ {len(rows)} configuration(s) saved to {args.store}")
+    return 0 if rows else 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Read and update the benchmark results store (results.csv).
+
+One row per measured configuration: implementation, array size, workers
+(threads, processes or CUDA block size), input distribution and extra
+options, with the median, p95 and standard deviation of the trial times.
+benchmark.py writes the store; the graph scripts read it.
+"""
+import csv
+import math
+import os
+
+STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.csv')
+
+FIELDS = ['implementation', 'size', 'workers', 'distribution', 'options', 'trials',
+          'warmup', 'median_s', 'p95_s', 'stddev_s', 'min_s', 'throughput_meps',
+          'host', 'timestamp']
+
+# Columns that identify a configuration (a new measurement replaces the old row)
+KEY_FIELDS = ('implementation', 'size', 'workers', 'distribution', 'options')
+
+INT_FIELDS = ('size', 'workers', 'trials', 'warmup')
+FLOAT_FIELDS = ('median_s', 'p95_s', 'stddev_s', 'min_s', 'throughput_meps')
+
+
+def _convert(row):
+    for name in INT_FIELDS:
+        row[name] = int(row[name])
+    for name in FLOAT_FIELDS:
+        row[name] = float(row[name])
+    return row
+
+def load(path=STORE):
+    """Return every row of the store as a dict (numbers converted)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as file:
+        return [_convert(row) for row in csv.DictReader(file)]
+
+def save(rows, path=STORE):
+    """Write rows to the store, sorted by configuration."""
+    rows = sorted(rows, key=lambda r: (r['implementation'], r['distribution'], r['options'],
+                                       int(r['size']), int(r['workers'])))
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({name: row[name] for name in FIELDS})
+
+def update(new_rows, path=STORE):
+    """Merge new_rows into the store, replacing rows with the same configuration."""
+    rows = {tuple(str(r[k]) for k in KEY_FIELDS): r for r in load(path)}
+    for row in new_rows:
+        rows[tuple(str(row[k]) for k in KEY_FIELDS)] = row
+    save(list(rows.values()), path)
+
+def select(implementation, size=None, workers=None, distribution='random', options='',
+           path=STORE):
+    """Rows of one implementation, ordered by workers."""
+    rows = [r for r in load(path)
+            if r['implementation'] == implementation
+            and (size is None or r['size'] == size)
+            and (workers is None or r['workers'] == workers)
+            and r['distribution'] == distribution and r['options'] == options]
+    return sorted(rows, key=lambda r: (r['size'], r['workers']))
+
+def baseline(size, distribution='random', path=STORE):
+    """Median serial time for size, and whether it had to be estimated.
+
+    Without a serial row for exactly this size, the nearest measured size is
+    scaled by n log n.  Returns (None, False) if the store has no serial rows.
+    """
+    rows = select('serial', distribution=distribution, path=path)
+    for row in rows:
+        if row['size'] == size:
+            return row['median_s'], False
+    if not rows:
+        return None, False
+    nearest = min(rows, key=lambda r: abs(math.log(r['size'] / size)))
+    scale = (size * math.log2(size)) / (nearest['size'] * math.log2(nearest['size']))
+    return nearest['median_s'] * scale, True
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Scalability models fitted to the benchmark results store (results.csv).
+
+Every scaling curve (one implementation, extra options, input distribution and
+array size measured on two or more core counts) is fitted with
+
+    T(p) = a + b/p + c(p - 1)
+
+by weighted least squares, all curves at once: a is the serial part (Amdahl),
+b the work that divides among p cores and c the cost each extra core adds
+(synchronisation, communication). From the fits the module reports the
+Amdahl and Gustafson serial fractions and the Karp-Flatt serial fraction of
+every measurement, and predicts the best core count and its time for array
+sizes and core counts that were not run: b scales with the sorting work
+n log n, a and c follow a linear trend in n fitted across the measured sizes.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import results_store
+
+# Columns that identify one scaling curve
+CURVE = ['implementation', 'options', 'distribution', 'size']
+
+# Columns that identify an engine (a curve without its array size)
+ENGINE = ['implementation', 'options', 'distribution']
+
+# Implementations whose workers are cores (CUDA workers are block sizes)
+PARALLEL = ('openmp', 'mpi')
+
+# Model terms and the candidate models of a curve: the last two describe
+# curves that do not speed up (flat, or slower on more cores)
+TERMS = ('one', 'inv', 'lin')
+MODELS = (('one', 'inv', 'lin'), ('one', 'inv'), ('inv',), ('one', 'lin'), ('one',))
+
+
+def load(path=results_store.STORE):
+    """Results store as a DataFrame with a cores column (MPI: workers x --threads)."""
+    df = pd.read_csv(path, dtype={'options': str, 'host': str, 'timestamp': str},
+                     keep_default_na=False)
+    threads = df['options'].str.extract(r'--threads=(\d+)', expand=False).fillna('1').astype(int)
+    df['threads'] = np.where(df['implementation'] == 'mpi', threads, 1)
+    df['cores'] = df['workers'] * df['threads']
+    return df
+
+def work(n):
+    """Comparison work of sorting n keys, used to scale times between sizes."""
+    return n * np.log2(n)
+
+def serial_baseline(targets, serial):
+    """Serial median time for every (distribution, size) of targets.
+
+    Sizes without a serial row are scaled by n log n from the nearest
+    measured size, as results_store.baseline does.
+    """
+    pairs = targets[['distribution', 'size']].drop_duplicates().merge(
+        serial[['distribution', 'size', 'median_s']].rename(
+            columns={'size': 'serial_size', 'median_s': 'serial_median_s'}),
+        on='distribution')
+    if pairs.empty:
+        return targets.assign(serial_s=np.nan)
+    pairs['distance'] = np.abs(np.log(pairs['size'] / pairs['serial_size']))
+    nearest = pairs.loc[pairs.groupby(['distribution', 'size'])['distance'].idxmin()]
+    nearest = nearest.assign(serial_s=nearest['serial_median_s'] * work(nearest['size'])
+                             / work(nearest['serial_size']))
+    return targets.merge(nearest[['distribution', 'size', 'serial_s']],
+                         on=['distribution', 'size'], how='left')
+
+def karp_flatt(speedup, cores):
+    """Experimentally determined serial fraction (1/S - 1/p) / (1 - 1/p); NaN for p = 1."""
+    cores = np.asarray(cores, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (1.0 / np.asarray(speedup, dtype=float) - 1.0 / cores) / (1.0 - 1.0 / cores)
+    return np.where(cores > 1, fraction, np.nan)
+
+def measurements(df):
+    """Parallel rows with base_s, speedup, efficiency and karp_flatt columns.
+
+    The base is the engine's own single-core time at the same size, or the
+    serial baseline where the curve has no single-core row.
+    """
+    rows = df[df['implementation'].isin(PARALLEL)]
+    single = rows.loc[rows['cores'] == 1, CURVE + ['median_s']].rename(columns={'median_s': 'base_s'})
+    rows = serial_baseline(rows.merge(single, on=CURVE, how='left'),
+                           df[df['implementation'] == 'serial'])
+    rows['base'] = np.where(rows['base_s'].notna(), 'single-core', 'serial')
+    rows['base_s'] = rows['base_s'].fillna(rows['serial_s'])
+    rows['speedup'] = rows['base_s'] / rows['median_s']
+    rows['efficiency'] = rows['speedup'] / rows['cores']
+    rows['karp_flatt'] = karp_flatt(rows['speedup'], rows['cores'])
+    return rows
+
+def _design(cores):
+    """Model terms evaluated at cores (columns in TERMS order)."""
+    cores = np.asarray(cores, dtype=float)
+    return np.stack([np.ones_like(cores), 1.0 / cores, cores - 1.0], axis=-1)
+
+def fit(rows):
+    """Fit T(p) = a + b/p + c(p - 1) to every curve with two or more core counts.
+
+    Points are weighted by 1/T^2, so the fit minimises relative error. Each
+    curve gets, among the models of MODELS that its distinct core counts
+    determine and whose coefficients are all non-negative, the one with the
+    lowest RMS relative error.
+    """
+    rows = rows[rows['median_s'] > 0]
+    x = _design(rows['cores'])
+    y = rows['median_s'].to_numpy()
+    w = 1.0 / y ** 2
+    k = len(TERMS)
+
+    # Weighted normal equations of every curve: G = sum w x x^T, h = sum w x y
+    products = pd.DataFrame(
+        np.concatenate([(w[:, None, None] * x[:, :, None] * x[:, None, :]).reshape(len(y), k * k),
+                        w[:, None] * x * y[:, None]], axis=1),
+        index=rows.index)
+    groups = products.groupby([rows[c] for c in CURVE], sort=True)
+    sums = groups.sum()
+    gram = sums.iloc[:, :k * k].to_numpy().reshape(-1, k, k)
+    rhs = sums.iloc[:, k * k:].to_numpy()
+    distinct = rows.groupby(CURVE, sort=True)['cores'].nunique().to_numpy()
+    curve = rows.groupby(CURVE, sort=True).ngroup().to_numpy()
+    points = np.bincount(curve, minlength=len(sums))
+
+    coefficients = np.full((len(sums), k), np.nan)
+    errors = np.full(len(sums), np.inf)
+    models = np.full(len(sums), '', dtype=object)
+    for model in MODELS:
+        todo = distinct >= max(len(model), 2)
+        if not todo.any():
+            continue
+        used = [TERMS.index(t) for t in model]
+        sub_gram = gram[todo][:, used][:, :, used]
+        sub_rhs = rhs[todo][:, used]
+        solution = np.linalg.solve(sub_gram + 1e-12 * np.eye(len(used)), sub_rhs[:, :, None])[:, :, 0]
+        ok = (solution >= 0).all(axis=1)
+        index = np.flatnonzero(todo)[ok]
+        full = np.zeros((len(index), k))
+        full[:, used] = solution[ok]
+
+        # Mean squared relative error of this model on every curve it fits
+        candidate = np.full((len(sums), k), np.nan)
+        candidate[index] = full
+        squared = ((x * candidate[curve]).sum(axis=1) / y - 1.0) ** 2
+        error = np.bincount(curve, weights=np.nan_to_num(squared, nan=0.0),
+                            minlength=len(sums)) / points
+        better = index[error[index] < errors[index]]
+        coefficients[better] = candidate[better]
+        errors[better] = error[better]
+        models[better] = '+'.join(model)
+
+    fits = sums.index.to_frame(index=False)
+    fits['a'], fits['b'], fits['c'] = coefficients.T
+    fits['model'] = models
+    fits['points'] = distinct
+    span = rows.groupby(CURVE, sort=True)['cores']
+    fits['min_cores'] = span.min().to_numpy()
+    fits['max_cores'] = span.max().to_numpy()
+    fits = fits[fits['model'] != ''].reset_index(drop=True)
+
+    # Derived quantities
+    p = fits['max_cores'].to_numpy(dtype=float)
+    t1 = fits['a'] + fits['b']
+    tp = fits['a'] + fits['b'] / p + fits['c'] * (p - 1)
+    fits['t1_s'] = t1
+    fits['amdahl_fraction'] = fits['a'] / t1
+    fits['gustafson_fraction'] = (fits['a'] + fits['c'] * (p - 1)) / tp
+    with np.errstate(divide='ignore'):
+        fits['optimal_cores'] = np.where(fits['b'] == 0, 1.0,
+                                         np.where(fits['c'] > 0, np.sqrt(fits['b'] / fits['c']),
+                                                  np.inf))
+
+    # Root mean square relative error of each fit
+    evaluated = rows.merge(fits[CURVE + ['a', 'b', 'c']], on=CURVE)
+    model_s = (_design(evaluated['cores']) * evaluated[['a', 'b', 'c']].to_numpy()).sum(axis=1)
+    evaluated['error'] = (model_s / evaluated['median_s'] - 1.0) ** 2
+    rms = np.sqrt(evaluated.groupby(CURVE)['error'].mean()).rename('fit_error').reset_index()
+    return fits.merge(rms, on=CURVE, how='left')
+
+def serial_fractions(rows, fits):
+    """Measured serial fraction of every engine: fitted Amdahl and Gustafson
+    fractions and the mean Karp-Flatt fraction, over all its array sizes."""
+    fitted = fits.groupby(ENGINE).agg(sizes=('size', 'nunique'),
+                                      amdahl_fraction=('amdahl_fraction', 'mean'),
+                                      gustafson_fraction=('gustafson_fraction', 'mean'),
+                                      fit_error=('fit_error', 'max'))
+    measured = rows.sort_values('cores').groupby(ENGINE).agg(runs=('karp_flatt', 'count'),
+                                        karp_flatt=('karp_flatt', 'mean'),
+                                        karp_flatt_max_cores=('karp_flatt', 'last'))
+    return fitted.join(measured, how='left').reset_index()
+
+def size_trends(fits):
+    """Least-squares lines a(n) = a0 + a1 n and c(n) = c0 + c1 n of every engine
+    fitted at two or more array sizes."""
+    lines = []
+    for key, group in fits.groupby(ENGINE, sort=True):
+        if group['size'].nunique() < 2:
+            continue
+        n = group['size'].to_numpy(dtype=float)
+        a1, a0 = np.polyfit(n, group['a'].to_numpy(), 1)
+        c1, c0 = np.polyfit(n, group['c'].to_numpy(), 1)
+        lines.append(dict(zip(ENGINE, key), a0=a0, a1=a1, c0=c0, c1=c1))
+    return pd.DataFrame(lines, columns=ENGINE + ['a0', 'a1', 'c0', 'c1'])
+
+def predict(fits, sizes=None, max_cores=None):
+    """Best core count and its time for every engine and array size.
+
+    A size without a fit of its own takes b from the fit of the nearest
+    measured size, scaled by n log n. Its a and c come from the engine's
+    size_trends line (kept >= 0); an engine fitted at one size only keeps
+    that size's a and c, and the overheads column says which was used.
+    Candidate core counts run from 1 to max_cores (MPI: multiples of
+    --threads); MPI engines whose --threads exceeds max_cores are dropped.
+    """
+    engines = fits[ENGINE].drop_duplicates()
+    if sizes is None:
+        targets = fits[ENGINE + ['size']]
+    else:
+        targets = engines.merge(pd.DataFrame({'size': list(sizes)}), how='cross')
+    if max_cores is None:
+        max_cores = int(max(fits['max_cores'].max(), os.cpu_count() or 1))
+
+    # Nearest fitted size of the same engine
+    pairs = targets.merge(fits.rename(columns={'size': 'fit_size'}), on=ENGINE)
+    pairs['distance'] = np.abs(np.log(pairs['size'] / pairs['fit_size']))
+    best = pairs.loc[pairs.groupby(ENGINE + ['size'])['distance'].idxmin()].reset_index(drop=True)
+
+    # One MPI process needs --threads cores
+    threads = best['options'].str.extract(r'--threads=(\d+)', expand=False).fillna('1').astype(int)
+    threads = np.where(best['implementation'] == 'mpi', threads, 1)
+    fitting = threads <= max_cores
+    if not fitting.all():
+        for row in best.loc[~fitting, ENGINE].drop_duplicates().itertuples(index=False):
+            print(f"Note: {row.implementation} {row.options or '(defaults)'} needs more than "
+                  f"{max_cores} cores per process - not predicted", file=sys.stderr)
+        best = best[fitting].reset_index(drop=True)
+        threads = threads[fitting]
+
+    # Coefficients at the target size
+    own = (best['size'] == best['fit_size']).to_numpy()
+    best = best.merge(size_trends(fits), on=ENGINE, how='left')
+    trend = best['a0'].notna().to_numpy() & ~own
+    n = best['size'].to_numpy(dtype=float)
+    a0, a1, c0, c1 = best[['a0', 'a1', 'c0', 'c1']].fillna(0.0).to_numpy(dtype=float).T
+    a = np.where(trend, np.maximum(a0 + a1 * n, 0.0), best['a'].to_numpy(dtype=float))
+    b = best['b'].to_numpy(dtype=float) * work(n) / work(best['fit_size'].to_numpy(dtype=float))
+    c = np.where(trend, np.maximum(c0 + c1 * n, 0.0), best['c'].to_numpy(dtype=float))
+    overheads = np.where(own, 'fitted', np.where(trend, 'size trend', 'size-independent'))
+
+    # Model time for every candidate core count (rows: predictions, columns: p)
+    cores = np.arange(1, max_cores + 1, dtype=float)
+    times = a[:, None] + b[:, None] / cores[None, :] + c[:, None] * (cores[None, :] - 1.0)
+    times[(cores[None, :] % threads[:, None]) != 0] = np.inf
+    choice = np.argmin(times, axis=1)
+    best_time = times[np.arange(len(best)), choice]
+    max_valid = (max_cores // threads) * threads
+
+    return pd.DataFrame({
+        'implementation': best['implementation'],
+        'options': best['options'],
+        'distribution': best['distribution'],
+        'size': best['size'],
+        'fit_size': best['fit_size'],
+        'overheads': overheads,
+        'best_cores': (choice + 1).astype(int),
+        'best_workers': ((choice + 1) // threads).astype(int),
+        'time_s': best_time,
+        'speedup': (a + b) / best_time,
+        'max_cores': max_valid,
+        'time_at_max_s': times[np.arange(len(best)), max_valid - 1],
+    })
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store', default=results_store.STORE,
+                        help='results file (default: results.csv next to this script)')
+    parser.add_argument('-i', '--implementations', nargs='+', default=list(PARALLEL),
+                        choices=PARALLEL, metavar='IMPL', help='openmp and/or mpi (default: both)')
+    parser.add_argument('-s', '--sizes', nargs='+', type=int,
+                        help='array sizes to predict (default: the measured sizes)')
+    parser.add_argument('-c', '--cores', type=int,
+                        help='largest core count to consider (default: the larger of the '
+                        'measured maximum and this machine)')
+    parser.add_argument('--output', help='also write the predictions to this CSV file')
+    args = parser.parse_args(argv)
+    if args.cores is not None and args.cores < 1:
+        parser.error('--cores must be >= 1')
+    if args.sizes is not None and min(args.sizes) < 2:
+        parser.error('--sizes must be >= 2')
+    return args
+
+def main(argv):
+    args = parse_args(argv)
+    if not os.path.exists(args.store):
+        sys.exit(f"No results in {args.store} - run benchmark.py first")
+    df = load(args.store)
+    df = df[df['implementation'].isin(args.implementations + ['serial'])]
+    rows = measurements(df)
+    fits = fit(rows)
+    if fits.empty:
+        sys.exit("No curve has two or more core counts - run benchmark.py with several --workers")
+
+    pd.set_option('display.width', 160)
+    print("Measurements (speedup over the single-core run, or over serial where there is none)")
+    print(rows[CURVE + ['cores', 'median_s', 'base', 'speedup', 'efficiency', 'karp_flatt']]
+          .sort_values(CURVE + ['cores']).to_string(index=False, float_format='%.4f'))
+
+    print("\nFits: T(p) = a + b/p + c(p - 1) seconds")
+    print(fits[CURVE + ['points', 'model', 'a', 'b', 'c', 'amdahl_fraction', 'gustafson_fraction',
+                        'optimal_cores', 'fit_error']].to_string(index=False, float_format='%.4g'))
+
+    print("\nSerial fraction per engine")
+    print(serial_fractions(rows, fits).to_string(index=False, float_format='%.4f'))
+
+    predictions = predict(fits, args.sizes, args.cores)
+    print("\nPredicted best configuration")
+    print(predictions.to_string(index=False, float_format='%.4f'))
+    if args.output:
+        predictions.to_csv(args.output, index=False, float_format='%.6f')
+        print(f"\n✓ Predictions saved to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,22 +1,36 @@
-
-
-import matplotlib.pyplot as plt
 import csv
+import os
+import sys
 
-# Performance data from actual CUDA tests (1M elements)
-block_sizes = [64, 128, 256, 512]
-execution_time = [0.292133, 0.172404, 0.086914, 0.046930]
-throughput = [3.42, 5.80, 11.51, 21.31]  # Million elements/sec
+import matplotlib.pyplot as plt
 
-# Calculate speedup (compared to serial: 0.727s for 10M, scaled to 1M)
-# For 1M elements, serial would be approximately 0.0727s
-serial_time_1M = 0.0727  # Estimated serial time for 1M elements
+# Results store written by Benchmark/benchmark.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Benchmark'))
+import results_store
+
+# Array size to plot (python3 cuda_graphs.py [size])
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SIZE_LABEL = f"{SIZE / 1e6:g} Million Elements"
+
+# Median times per block size from the results store
+rows = results_store.select('cuda', size=SIZE)
+if not rows:
+    sys.exit(f"No CUDA results for {SIZE} elements - run Benchmark/benchmark.py -i cuda first")
+block_sizes = [r['workers'] for r in rows]
+execution_time = [r['median_s'] for r in rows]
+throughput = [r['throughput_meps'] for r in rows]  # Million elements/sec
+
+# Speedup over the serial baseline (scaled by n log n from the nearest
+# measured size when the store has no serial run of this size)
+serial_time, estimated = results_store.baseline(SIZE)
+if serial_time is None:
+    sys.exit("No serial results in the store - run Benchmark/benchmark.py -i serial first")
 speedup = []
 for time in execution_time:
-    speedup.append(serial_time_1M / time)
+    speedup.append(serial_time / time)
 
 print("Generating CUDA Quick Sort performance graphs...")
-print(f"\nSerial baseline (1M): {serial_time_1M:.4f}s (estimated)")
+print(f"\nSerial baseline: {serial_time:.4f}s{' (estimated)' if estimated else ''}")
 
 # =================================================================
 # GRAPH 1: BLOCK SIZE VS EXECUTION TIME
@@ -27,7 +41,7 @@ ax1.plot(block_sizes, execution_time, marker='o', linewidth=3, markersize=10,
          color='#FF6B35', label='Execution Time')
 ax1.set_xlabel('Block Size (Threads per Block)', fontsize=14, fontweight='bold')
 ax1.set_ylabel('Execution Time (seconds)', fontsize=14, fontweight='bold')
-ax1.set_title('CUDA Quick Sort: Block Size vs Execution Time\n(1 Million Elements, RTX 4060)', 
+ax1.set_title(f'CUDA Quick Sort: Block Size vs Execution Time\n({SIZE_LABEL}, RTX 4060)', 
               fontsize=16, fontweight='bold', pad=20)
 ax1.grid(True, alpha=0.3, linestyle='--')
 ax1.set_xticks(block_sizes)
@@ -54,7 +68,7 @@ ax2.plot(block_sizes, speedup, marker='s', linewidth=3, markersize=10,
          color='#4ECDC4', label='Actual Speedup')
 ax2.set_xlabel('Block Size (Threads per Block)', fontsize=14, fontweight='bold')
 ax2.set_ylabel('Speedup (times)', fontsize=14, fontweight='bold')
-ax2.set_title('CUDA Quick Sort: Block Size vs Speedup\n(1 Million Elements, RTX 4060)', 
+ax2.set_title(f'CUDA Quick Sort: Block Size vs Speedup\n({SIZE_LABEL}, RTX 4060)', 
               fontsize=16, fontweight='bold', pad=20)
 ax2.grid(True, alpha=0.3, linestyle='--')
 ax2.set_xticks(block_sizes)
@@ -77,7 +91,7 @@ print("✓ Graph 2: graph2_blocksize_vs_speedup.png")
 # =================================================================
 
 fig, axes = plt.subplots(1, 2, figsize=(16, 6))
-fig.suptitle('CUDA Quick Sort Performance Analysis (NVIDIA RTX 4060 Laptop, 1 Million Elements)', 
+fig.suptitle(f'CUDA Quick Sort Performance Analysis (NVIDIA RTX 4060 Laptop, {SIZE_LABEL})', 
              fontsize=18, fontweight='bold', y=1.02)
 
 # Left: Time
@@ -118,7 +132,7 @@ print("CUDA QUICK SORT PERFORMANCE SUMMARY")
 print("="*70)
 print(f"GPU: NVIDIA GeForce RTX 4060 Laptop")
 print(f"Algorithm: Quick Sort (segments) + Bitonic Merge (GPU)")
-print(f"Array Size: 1,000,000 elements\n")
+print(f"Array Size: {SIZE:,} elements\n")
 print(f"{'Block Size':<12} {'Time (s)':<14} {'Speedup':<12} {'Throughput':<15}")
 print("-" * 70)
 for bs, time, sp, tp in zip(block_sizes, execution_time, speedup, throughput):
@@ -158,6 +172,6 @@ with open(csv_filename, mode='w', newline='') as file:
     
     # Write data rows
     for bs, time, sp, tp in zip(block_sizes, execution_time, speedup, throughput):
-        writer.writerow([bs, 1000000, time, f"{sp:.2f}"])
+        writer.writerow([bs, SIZE, time, f"{sp:.2f}"])
 
 print(f"\n✓ CSV file generated: {csv_filename}")
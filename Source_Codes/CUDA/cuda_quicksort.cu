@@ -37,8 +37,17 @@ __device__ void insertionSort(int* arr, int left, int right) {
     }
 }
 
-// Device function-partition
+// Device function - move the median of first, middle and last to arr[high]
+__device__ void medianOfThreeToHigh(int* arr, int low, int high) {
+    int mid = low + (high - low) / 2;
+    if (arr[mid] < arr[low]) swap(&arr[mid], &arr[low]);
+    if (arr[high] < arr[low]) swap(&arr[high], &arr[low]);
+    if (arr[mid] < arr[high]) swap(&arr[mid], &arr[high]);
+}
+
+// Device function-partition (median-of-three pivot)
 __device__ int partition(int* arr, int low, int high) {
+    medianOfThreeToHigh(arr, low, high);
     int pivot = arr[high];
     int i = low - 1;
     
@@ -72,14 +81,23 @@ __device__ void quickSortDevice(int* arr, int low, int high) {
         if (low < high) {
             int pi = partition(arr, low, high);
             
-            if (pi - 1 > low) {
-                stack[++top] = low;
-                stack[++top] = pi - 1;
+            // Push the larger side first so the smaller one is popped next;
+            // this keeps the stack within log2(n) ranges
+            int left_low = low, left_high = pi - 1;
+            int right_low = pi + 1, right_high = high;
+            if (left_high - left_low < right_high - right_low) {
+                int t = left_low; left_low = right_low; right_low = t;
+                t = left_high; left_high = right_high; right_high = t;
+            }
+            
+            if (left_high > left_low) {
+                stack[++top] = left_low;
+                stack[++top] = left_high;
             }
             
-            if (pi + 1 < high) {
-                stack[++top] = pi + 1;
-                stack[++top] = high;
+            if (right_high > right_low) {
+                stack[++top] = right_low;
+                stack[++top] = right_high;
             }
         }
     }
@@ -0,0 +1,228 @@
+// Input-aware engine choice for --algorithm=auto (used through omp_sort.h)
+// a cheap sample of the input (plus a linear run scan that stops early on
+// unsorted data) picks insertion sort, serial or task quick sort, counting or
+// radix sort, or a merge of the runs already present; the choice and the
+// reason for it are kept in dispatch_engine / dispatch_reason
+#ifndef QUICKSORT_DISPATCH_H
+#define QUICKSORT_DISPATCH_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "partition.h"
+#include "radix_sort.h"
+
+// Inputs this small go straight to insertion sort
+#define DISPATCH_INSERTION_MAX 64
+
+// Below this size a serial sort is cheaper than starting a thread team
+#define DISPATCH_SERIAL_MAX 4096
+
+// Inputs made of at most this many ascending or descending runs are merged
+#define DISPATCH_MAX_RUNS 8
+
+// Evenly spaced positions sampled for order, duplicates and key range
+#define DISPATCH_SAMPLE 1024
+
+// Counting sort when the key range is at most the size and this many values
+#define DISPATCH_COUNTING_MAX_RANGE (1 << 17)
+
+// Keys needing three or more radix passes use quick sort below this size
+#define DISPATCH_WIDE_RADIX_MIN (1 << 16)
+
+// Engines the dispatcher can choose
+typedef enum {
+    ENGINE_INSERTION = 0,   // insertion sort
+    ENGINE_QUICKSORT = 1,   // serial introsort (ninther pivot, three-way partition)
+    ENGINE_TASKS = 2,       // OpenMP task quick sort
+    ENGINE_COUNTING = 3,    // counting sort over the key range
+    ENGINE_RADIX = 4,       // LSD/MSD radix sort
+    ENGINE_RUN_MERGE = 5    // merge of the presorted runs
+} SortEngine;
+
+// Names of the engines for reports, indexed by SortEngine
+static const char* const ENGINE_NAMES[] = {
+    "insertion sort", "serial quick sort", "task quick sort",
+    "counting sort", "radix sort", "run merge"
+};
+
+// Partition settings of the quick sort engines: robust on sorted and duplicate-heavy input
+static const SortOptions DISPATCH_QUICKSORT_OPTIONS = { PIVOT_NINTHER, PARTITION_THREE_WAY, 1, INSERTION_SORT_THRESHOLD, LEAF_INSERTION };
+
+// What the dispatcher learned about an input
+typedef struct {
+    int size;
+    int threads;                          // threads available to the sort
+    int runs;                             // presorted runs (-1: more than DISPATCH_MAX_RUNS)
+    int run_start[DISPATCH_MAX_RUNS + 1]; // run r is [run_start[r], run_start[r + 1])
+    int samples;                          // keys sampled
+    int ordered_percent;                  // sampled neighbour pairs already in order
+    int distinct;                         // distinct keys among the samples
+    unsigned sample_range;                // max - min of the sampled keys
+} InputProfile;
+
+// Last decision (for reports and the Python wrapper)
+int dispatch_engine = ENGINE_QUICKSORT;
+char dispatch_reason[160] = "";
+
+// Split arr[0..n-1] into maximal non-decreasing or strictly decreasing runs
+// stores up to max_runs starts (plus n) in run_start and returns the run count,
+// or -1 as soon as more than max_runs runs are found
+static inline int countRuns(const int arr[], int n, int max_runs, int run_start[]) {
+    int runs = 0;
+    int i = 0;
+    while (i < n) {
+        if (runs == max_runs) return -1;
+        run_start[runs++] = i;
+        int j = i + 1;
+        if (j < n && arr[j] < arr[i]) {
+            while (j < n && arr[j] < arr[j - 1]) j++;
+        } else {
+            while (j < n && arr[j] >= arr[j - 1]) j++;
+        }
+        i = j;
+    }
+    run_start[runs] = n;
+    return runs;
+}
+
+// Merge src[lo..mid-1] and src[mid..hi-1] into dst[lo..hi-1]
+static inline void dispatchMerge(const int src[], int dst[], int lo, int mid, int hi) {
+    int i = lo, j = mid, k = lo;
+    while (i < mid && j < hi) {
+        dst[k++] = (src[j] < src[i]) ? src[j++] : src[i++];
+    }
+    while (i < mid) dst[k++] = src[i++];
+    while (j < hi) dst[k++] = src[j++];
+}
+
+// Sort arr[0..n-1] given its runs: descending runs are reversed, then
+// neighbouring runs are merged pairwise (pairs of a round in parallel)
+// returns 0, or -1 if the scratch buffer cannot be allocated
+static inline int runMergeSort(int arr[], int n, int runs, const int run_start[], int threads) {
+    int bounds[DISPATCH_MAX_RUNS + 1];
+    memcpy(bounds, run_start, (runs + 1) * sizeof(int));
+    if (runs <= 1) {
+        if (n > 1 && arr[n - 1] < arr[0]) {
+            for (int i = 0, j = n - 1; i < j; i++, j--) {
+                int t = arr[i]; arr[i] = arr[j]; arr[j] = t;
+            }
+        }
+        return 0;
+    }
+
+    int* tmp = (int*)malloc((size_t)n * sizeof(int));
+    if (tmp == NULL) return -1;
+    for (int r = 0; r < runs; r++) {
+        int lo = bounds[r], hi = bounds[r + 1] - 1;
+        if (hi > lo && arr[hi] < arr[lo]) {
+            for (; lo < hi; lo++, hi--) {
+                int t = arr[lo]; arr[lo] = arr[hi]; arr[hi] = t;
+            }
+        }
+    }
+
+    int* src = arr;
+    int* dst = tmp;
+    while (runs > 1) {
+        int pairs = runs / 2;
+#ifdef _OPENMP
+        #pragma omp parallel for num_threads(threads) if(threads > 1) schedule(dynamic, 1)
+#endif
+        for (int p = 0; p < pairs; p++) {
+            dispatchMerge(src, dst, bounds[2 * p], bounds[2 * p + 1], bounds[2 * p + 2]);
+        }
+        if (runs % 2 == 1) {
+            int lo = bounds[runs - 1];
+            memcpy(dst + lo, src + lo, (size_t)(n - lo) * sizeof(int));
+        }
+        for (int r = 0; r <= pairs; r++) {
+            bounds[r] = bounds[2 * r < runs ? 2 * r : runs];
+        }
+        runs = (runs + 1) / 2;
+        bounds[runs] = n;
+        int* swap = src;
+        src = dst;
+        dst = swap;
+    }
+    if (src != arr) {
+        radixCopy(arr, src, n, threads);
+    }
+    free(tmp);
+    return 0;
+}
+
+// Sample arr[0..n-1] and scan it for runs
+static inline void profileInput(const int arr[], int n, int threads, InputProfile* profile) {
+    profile->size = n;
+    profile->threads = threads;
+    profile->runs = countRuns(arr, n, DISPATCH_MAX_RUNS, profile->run_start);
+
+    int samples = (n - 1 < DISPATCH_SAMPLE) ? n - 1 : DISPATCH_SAMPLE;
+    int keys[DISPATCH_SAMPLE];
+    int ordered = 0;
+    for (int s = 0; s < samples; s++) {
+        int i = (int)((long long)s * (n - 1) / samples);
+        ordered += (arr[i] <= arr[i + 1]);
+        keys[s] = arr[i];
+    }
+    int distinct = 0;
+    if (samples > 0) {
+        introSort(keys, 0, samples - 1, &DISPATCH_QUICKSORT_OPTIONS);
+        distinct = 1;
+        for (int s = 1; s < samples; s++) {
+            distinct += (keys[s] != keys[s - 1]);
+        }
+    }
+    profile->samples = samples;
+    profile->ordered_percent = (samples > 0) ? ordered * 100 / samples : 100;
+    profile->distinct = distinct;
+    profile->sample_range = (samples > 0) ? (unsigned)keys[samples - 1] - (unsigned)keys[0] : 0;
+}
+
+// Pick the engine for a profiled input and write the reason into reason[size]
+static inline SortEngine chooseEngine(const InputProfile* p, char* reason, size_t size) {
+    int bits = radixBits(p->sample_range);
+    int passes = (bits + RADIX_MAX_DIGIT_BITS - 1) / RADIX_MAX_DIGIT_BITS;
+
+    if (p->size <= DISPATCH_INSERTION_MAX) {
+        snprintf(reason, size, "%d keys <= %d", p->size, DISPATCH_INSERTION_MAX);
+        return ENGINE_INSERTION;
+    }
+    if (p->runs > 0) {
+        snprintf(reason, size, "%d presorted run%s (%d%% of sampled pairs in order)",
+                 p->runs, p->runs == 1 ? "" : "s", p->ordered_percent);
+        return ENGINE_RUN_MERGE;
+    }
+    if (p->sample_range < (unsigned)p->size && p->sample_range <= DISPATCH_COUNTING_MAX_RANGE) {
+        snprintf(reason, size, "sampled key range %u < %d keys, %d distinct of %d samples",
+                 p->sample_range, p->size, p->distinct, p->samples);
+        return ENGINE_COUNTING;
+    }
+    if (p->size < DISPATCH_SERIAL_MAX) {
+        snprintf(reason, size, "%d keys < %d, too few for radix passes or threads",
+                 p->size, DISPATCH_SERIAL_MAX);
+        return ENGINE_QUICKSORT;
+    }
+    if (passes >= 3 && p->size < DISPATCH_WIDE_RADIX_MIN) {
+        snprintf(reason, size, "%d-bit sampled keys need %d radix passes, only %d keys on %d thread%s",
+                 bits, passes, p->size, p->threads, p->threads == 1 ? "" : "s");
+        return (p->threads > 1) ? ENGINE_TASKS : ENGINE_QUICKSORT;
+    }
+    snprintf(reason, size, "%d-bit sampled key range: %d radix pass%s over %d keys",
+             bits, passes, passes == 1 ? "" : "es", p->size);
+    return ENGINE_RADIX;
+}
+
+// Record a decision, and print it to stderr when QUICKSORT_DISPATCH_LOG is set
+static inline void dispatchRecord(int engine, const char* reason) {
+    dispatch_engine = engine;
+    if (reason != dispatch_reason) {
+        snprintf(dispatch_reason, sizeof(dispatch_reason), "%s", reason);
+    }
+    if (getenv("QUICKSORT_DISPATCH_LOG") != NULL) {
+        fprintf(stderr, "dispatch: %s (%s)\n", ENGINE_NAMES[engine], dispatch_reason);
+    }
+}
+
+#endif // QUICKSORT_DISPATCH_H
@@ -0,0 +1,261 @@
+// Input generator for the CPU Quick Sorts: key distributions, explicit seeds
+// and parallel generation (Serial, OpenMP and MPI include this header)
+// key i is a pure function of (seed, i): a splitmix64 hash of the seed and the
+// index replaces rand(), so any number of threads produces the same array and
+// a seed always reproduces the same input
+#ifndef QUICKSORT_GENERATE_H
+#define QUICKSORT_GENERATE_H
+
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <time.h>
+
+// Input shapes selectable with --distribution
+typedef enum {
+    DIST_RANDOM = 0,          // uniform keys in [0, range) (original behaviour)
+    DIST_SORTED = 1,          // ascending
+    DIST_REVERSE = 2,         // descending
+    DIST_ORGAN_PIPE = 3,      // ascending first half, descending second half
+    DIST_ZIPF = 4,            // key k with probability ~ 1/(k+1)^s (parameter s, default 1)
+    DIST_EQUAL = 5,           // one key repeated
+    DIST_FEW_UNIQUE = 6,      // parameter distinct keys, spread over the range (default 16)
+    DIST_NEARLY_SORTED = 7    // ascending, parameter percent of keys random (default 1)
+} Distribution;
+
+// Names for --distribution and reports, indexed by Distribution
+static const char* const DISTRIBUTION_NAMES[] = {
+    "random", "sorted", "reverse", "organ-pipe", "zipf", "equal", "few-unique", "nearly-sorted"
+};
+#define NUM_DISTRIBUTIONS 8
+
+// Default parameter of each distribution (0: none)
+static const double DISTRIBUTION_DEFAULTS[] = { 0, 0, 0, 0, 1.0, 0, 16, 1.0 };
+
+// Constants of the rejection-inversion Zipf sampler (Hoermann and Derflinger)
+typedef struct {
+    double exponent;
+    double h_integral_x1;
+    double h_integral_n;
+    double s;
+} ZipfSampler;
+
+// What to generate
+typedef struct {
+    int distribution;   // Distribution
+    double parameter;   // distribution parameter (< 0: its default)
+    int range;          // keys lie in [0, range)
+    unsigned seed;
+    int has_seed;       // 0: seed from the clock (inputSeed)
+    ZipfSampler zipf;   // set up by inputPrepare
+} InputSpec;
+
+// Uniform random keys in [0, range) with a clock seed
+#define INPUT_SPEC_DEFAULT(range) { DIST_RANDOM, -1.0, (range), 0, 0, { 0, 0, 0, 0 } }
+
+// splitmix64 finalizer
+static inline uint64_t genMix(uint64_t x) {
+    x += 0x9E3779B97F4A7C15ULL;
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
+}
+
+// 64 random bits for element i (independent streams per stream number)
+static inline uint64_t genRandom(unsigned seed, size_t i, int stream) {
+    return genMix(genMix(((uint64_t)seed << 8) | (uint64_t)stream) ^ (uint64_t)i);
+}
+
+// Random value in [0, bound) from 64 random bits
+static inline int genBelow(uint64_t bits, int bound) {
+    return (int)(((bits >> 32) * (uint64_t)bound) >> 32);
+}
+
+// Random double in [0, 1) from 64 random bits
+static inline double genUnit(uint64_t bits) {
+    return (bits >> 11) * (1.0 / 9007199254740992.0);
+}
+
+// Fix the seed: the one given with --seed, otherwise the current time
+static inline unsigned inputSeed(InputSpec* spec) {
+    if (!spec->has_seed) {
+        spec->seed = (unsigned)time(NULL);
+        spec->has_seed = 1;
+    }
+    return spec->seed;
+}
+
+// Parameter of the distribution in effect
+static inline double inputParameter(const InputSpec* spec) {
+    return (spec->parameter >= 0) ? spec->parameter : DISTRIBUTION_DEFAULTS[spec->distribution];
+}
+
+// Helpers of the Zipf sampler: log1p(x)/x and expm1(x)/x, stable near 0
+static inline double zipfHelper1(double x) {
+    return (fabs(x) > 1e-8) ? log1p(x) / x : 1.0 - x * (0.5 - x * (1.0 / 3.0 - 0.25 * x));
+}
+
+static inline double zipfHelper2(double x) {
+    return (fabs(x) > 1e-8) ? expm1(x) / x : 1.0 + x * 0.5 * (1.0 + x / 3.0 * (1.0 + 0.25 * x));
+}
+
+static inline double zipfH(const ZipfSampler* z, double x) {
+    return exp(-z->exponent * log(x));
+}
+
+static inline double zipfHIntegral(const ZipfSampler* z, double x) {
+    double log_x = log(x);
+    return zipfHelper2((1.0 - z->exponent) * log_x) * log_x;
+}
+
+static inline double zipfHIntegralInverse(const ZipfSampler* z, double x) {
+    double t = x * (1.0 - z->exponent);
+    if (t < -1.0) t = -1.0;
+    return exp(zipfHelper1(t) * x);
+}
+
+static inline void zipfPrepare(ZipfSampler* z, double exponent, int n) {
+    z->exponent = exponent;
+    z->h_integral_x1 = zipfHIntegral(z, 1.5) - 1.0;
+    z->h_integral_n = zipfHIntegral(z, n + 0.5);
+    z->s = 2.0 - zipfHIntegralInverse(z, zipfHIntegral(z, 2.5) - zipfH(z, 2.0));
+}
+
+// Zipf rank in [1, n]; bits seeds the (rarely repeated) rejection loop
+static inline int zipfSample(const ZipfSampler* z, int n, uint64_t bits) {
+    for (;;) {
+        double u = z->h_integral_n + genUnit(bits) * (z->h_integral_x1 - z->h_integral_n);
+        double x = zipfHIntegralInverse(z, u);
+        int k = (int)(x + 0.5);
+        if (k < 1) k = 1;
+        else if (k > n) k = n;
+        if (k - x <= z->s || u >= zipfHIntegral(z, k + 0.5) - zipfH(z, k)) {
+            return k;
+        }
+        bits = genMix(bits);
+    }
+}
+
+// Position of i on an ascending ramp over [0, range) of n keys
+static inline int rampKey(size_t i, size_t n, int range) {
+    return (int)((unsigned long long)i * (unsigned long long)range / n);
+}
+
+// Fix the seed and set up the distribution's sampler (before inputKey)
+static inline void inputPrepare(InputSpec* spec) {
+    inputSeed(spec);
+    if (spec->distribution == DIST_ZIPF) {
+        zipfPrepare(&spec->zipf, inputParameter(spec), spec->range);
+    }
+}
+
+// Key i of n keys (after inputPrepare)
+static inline int inputKey(const InputSpec* spec, size_t i, size_t n) {
+    uint64_t bits = genRandom(spec->seed, i, 0);
+    int range = spec->range;
+
+    switch (spec->distribution) {
+        case DIST_SORTED:
+            return rampKey(i, n, range);
+        case DIST_REVERSE:
+            return rampKey(n - 1 - i, n, range);
+        case DIST_ORGAN_PIPE: {
+            size_t half = (n + 1) / 2;
+            return rampKey(i < half ? i : n - 1 - i, half, range);
+        }
+        case DIST_ZIPF:
+            return zipfSample(&spec->zipf, range, bits) - 1;
+        case DIST_EQUAL:
+            return genBelow(genRandom(spec->seed, 0, 0), range);
+        case DIST_FEW_UNIQUE: {
+            int unique = (int)inputParameter(spec);
+            if (unique > range) unique = range;
+            return genBelow(bits, unique) * (range / unique);
+        }
+        case DIST_NEARLY_SORTED:
+            if (genUnit(genMix(bits)) * 100.0 < inputParameter(spec)) {
+                return genBelow(bits, range);
+            }
+            return rampKey(i, n, range);
+        default:
+            return genBelow(bits, range);
+    }
+}
+
+// Fill arr[0..count-1] with keys first .. first+count-1 of n keys described by
+// spec, with threads OpenMP threads (e.g. one process's share of the input;
+// the result depends on neither the split nor the number of threads)
+static inline void generateKeyRange(int arr[], size_t first, size_t count, size_t n,
+                                    InputSpec* spec, int threads) {
+    inputPrepare(spec);
+#ifdef _OPENMP
+    #pragma omp parallel for schedule(static) num_threads(threads > 0 ? threads : 1)
+#else
+    (void)threads;
+#endif
+    for (size_t i = 0; i < count; i++) {
+        arr[i] = inputKey(spec, first + i, n);
+    }
+}
+
+// Fill arr[0..n-1] as described by spec, with threads OpenMP threads
+// (the result does not depend on the number of threads)
+static inline void generateKeys(int arr[], size_t n, InputSpec* spec, int threads) {
+    generateKeyRange(arr, 0, n, n, spec, threads);
+}
+
+// Parse --distribution=NAME[:PARAMETER], --seed=N or --range=N into spec
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+static inline int parseInputOption(const char* arg, InputSpec* spec) {
+    if (strncmp(arg, "--distribution=", 15) == 0) {
+        const char* value = arg + 15;
+        const char* colon = strchr(value, ':');
+        size_t length = colon ? (size_t)(colon - value) : strlen(value);
+        int found = -1;
+        for (int d = 0; d < NUM_DISTRIBUTIONS; d++) {
+            if (strlen(DISTRIBUTION_NAMES[d]) == length && strncmp(value, DISTRIBUTION_NAMES[d], length) == 0) {
+                found = d;
+            }
+        }
+        if (found < 0) return -1;
+        spec->distribution = found;
+        spec->parameter = -1.0;
+        if (colon != NULL) {
+            char* end;
+            double parameter = strtod(colon + 1, &end);
+            if (end == colon + 1 || *end != '\0' || DISTRIBUTION_DEFAULTS[found] == 0) return -1;
+            if (found == DIST_ZIPF && parameter <= 0) return -1;
+            if (found == DIST_FEW_UNIQUE && (parameter < 1 || parameter > 2147483647.0)) return -1;
+            if (found == DIST_NEARLY_SORTED && (parameter < 0 || parameter > 100)) return -1;
+            spec->parameter = parameter;
+        }
+        return 1;
+    }
+    if (strncmp(arg, "--seed=", 7) == 0) {
+        char* end;
+        unsigned long value = strtoul(arg + 7, &end, 10);
+        if (end == arg + 7 || *end != '\0' || arg[7] == '-' || value > 4294967295UL) return -1;
+        spec->seed = (unsigned)value;
+        spec->has_seed = 1;
+        return 1;
+    }
+    if (strncmp(arg, "--range=", 8) == 0) {
+        char* end;
+        long value = strtol(arg + 8, &end, 10);
+        if (end == arg + 8 || *end != '\0' || value < 1 || value > 2147483647L) return -1;
+        spec->range = (int)value;
+        return 1;
+    }
+    return 0;
+}
+
+// Usage lines for the options understood by parseInputOption
+#define INPUT_OPTIONS_USAGE \
+    "  --distribution=NAME[:P]        Input shape: random (default), sorted, reverse,\n" \
+    "                                 organ-pipe, zipf[:s] (s=1), equal, few-unique[:k]\n" \
+    "                                 (k=16), nearly-sorted[:pct] (pct=1)\n" \
+    "  --seed=N                       Seed of the generator (default: current time)\n" \
+    "  --range=N                      Keys lie in [0, N)\n"
+
+#endif // QUICKSORT_GENERATE_H
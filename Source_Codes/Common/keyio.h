@@ -0,0 +1,250 @@
+// Binary key input and output for the Serial, OpenMP and MPI drivers
+// files and streams hold raw native-endian 32-bit int keys (as in External/);
+// --input=FILE maps a regular file copy-on-write and sorts it in place (no
+// read copy, the file itself is never modified), --input=- reads a stream from
+// stdin in large blocks, and --output=FILE|- writes the sorted keys with large
+// unbuffered writes (MPI reads and writes its slices with MPI-IO instead)
+#ifndef QUICKSORT_KEYIO_H
+#define QUICKSORT_KEYIO_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#include "report.h"
+#ifdef _WIN32
+#include <io.h>
+#define KEYIO_OPEN _open
+#define KEYIO_READ _read
+#define KEYIO_WRITE _write
+#define KEYIO_CLOSE _close
+#define KEYIO_BINARY _O_BINARY
+#define KEYIO_MMAP 0
+#else
+#include <unistd.h>
+#include <sys/mman.h>
+#define KEYIO_OPEN open
+#define KEYIO_READ read
+#define KEYIO_WRITE write
+#define KEYIO_CLOSE close
+#define KEYIO_BINARY 0
+#define KEYIO_MMAP 1
+#endif
+
+// Bytes per read or write call
+#define KEYIO_BLOCK (8 << 20)
+
+const char* key_input_path = NULL;    // --input: keys to sort ("-": stdin, NULL: generate)
+const char* key_output_path = NULL;   // --output: where the sorted keys go ("-": stdout)
+
+// Where --output=- writes (the original stdout, see keyIoBegin)
+static int key_output_fd = -1;
+
+// Mapping behind the array returned by loadKeys (NULL: the array is on the heap)
+static void* key_mapping = NULL;
+static size_t key_mapping_bytes = 0;
+
+// Parse --input=FILE|- or --output=FILE|-
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+static inline int parseKeyIoOption(const char* arg) {
+    if (strncmp(arg, "--input=", 8) == 0) {
+        key_input_path = arg + 8;
+        return (*key_input_path != '\0') ? 1 : -1;
+    }
+    if (strncmp(arg, "--output=", 9) == 0) {
+        key_output_path = arg + 9;
+        return (*key_output_path != '\0') ? 1 : -1;
+    }
+    return 0;
+}
+
+// Usage lines for the options understood by parseKeyIoOption
+#define KEY_IO_OPTIONS_USAGE \
+    "  --input=FILE|-                 Sort the raw 32-bit int keys of FILE (mapped) or\n" \
+    "                                 of stdin; <array_size> caps the keys read (0: all)\n" \
+    "  --output=FILE|-                Write the sorted keys to FILE or stdout\n"
+
+// Name of the input for reports: "file" or "stdin"
+static inline const char* keyInputName(void) {
+    return (strcmp(key_input_path, "-") == 0) ? "stdin" : "file";
+}
+
+// Call once after option parsing and before reportBegin: with --output=- keep
+// stdout for the keys alone and send everything else printed to stdout to stderr
+// returns 0, or -1 if the keys and a --json/--csv record would share stdout
+static inline int keyIoBegin(void) {
+#ifdef _WIN32
+    if (key_input_path != NULL && strcmp(key_input_path, "-") == 0) {
+        _setmode(0, _O_BINARY);
+    }
+#endif
+    if (key_output_path == NULL || strcmp(key_output_path, "-") != 0) return 0;
+    if (output_format != OUTPUT_TEXT && output_path == NULL) {
+        fprintf(stderr, "Error: --output=- needs the record in a file (--json=FILE or --csv=FILE)\n");
+        return -1;
+    }
+    fflush(stdout);
+    key_output_fd = REPORT_DUP(REPORT_FILENO(stdout));
+    if (key_output_fd < 0) {
+        perror("stdout");
+        return -1;
+    }
+#ifdef _WIN32
+    _setmode(key_output_fd, _O_BINARY);
+#endif
+    REPORT_DUP2(REPORT_FILENO(stderr), REPORT_FILENO(stdout));
+    return 0;
+}
+
+// Read keys from a stream until end of file or max_count keys
+static inline int* readKeyStream(int fd, const char* name, long long max_count, long long* count) {
+    size_t capacity = KEYIO_BLOCK, bytes = 0;
+    size_t limit = (max_count > 0) ? (size_t)max_count * sizeof(int) : (size_t)-1;
+    char* buffer = (char*)malloc(capacity);
+
+    while (buffer != NULL && bytes < limit) {
+        if (bytes == capacity) {
+            char* grown = (char*)realloc(buffer, capacity * 2);
+            if (grown == NULL) {
+                free(buffer);
+                buffer = NULL;
+                break;
+            }
+            buffer = grown;
+            capacity *= 2;
+        }
+        size_t want = capacity - bytes;
+        if (want > KEYIO_BLOCK) want = KEYIO_BLOCK;
+        if (want > limit - bytes) want = limit - bytes;
+        long got = (long)KEYIO_READ(fd, buffer + bytes, (unsigned)want);
+        if (got < 0 && errno == EINTR) continue;
+        if (got < 0) {
+            perror(name);
+            free(buffer);
+            return NULL;
+        }
+        if (got == 0) break;
+        bytes += (size_t)got;
+    }
+    if (buffer == NULL) {
+        fprintf(stderr, "%s: out of memory after %zu bytes\n", name, bytes);
+        return NULL;
+    }
+    if (bytes % sizeof(int) != 0) {
+        fprintf(stderr, "%s: %zu bytes is not a whole number of %zu-byte keys\n",
+                name, bytes, sizeof(int));
+        free(buffer);
+        return NULL;
+    }
+    *count = (long long)(bytes / sizeof(int));
+    return (int*)buffer;
+}
+
+// Free an array returned by loadKeys (or allocated with malloc)
+static inline void releaseKeys(int* keys) {
+#if KEYIO_MMAP
+    if (keys != NULL && (void*)keys == key_mapping) {
+        munmap(key_mapping, key_mapping_bytes);
+        key_mapping = NULL;
+        key_mapping_bytes = 0;
+        return;
+    }
+#endif
+    free(keys);
+}
+
+// Keys of path ("-": stdin), at most max_count of them (0: all); *count
+// receives the number of keys; release the array with releaseKeys
+// returns NULL (after printing why) on error or when there are no keys
+static inline int* loadKeys(const char* path, long long max_count, long long* count) {
+    int from_stdin = (strcmp(path, "-") == 0);
+    const char* name = from_stdin ? "stdin" : path;
+    int fd = from_stdin ? 0 : KEYIO_OPEN(path, O_RDONLY | KEYIO_BINARY);
+    struct stat info;
+    int* keys = NULL;
+
+    *count = 0;
+    if (fd < 0 || fstat(fd, &info) != 0) {
+        perror(name);
+        if (fd > 0) KEYIO_CLOSE(fd);
+        return NULL;
+    }
+
+    if (!from_stdin && S_ISREG(info.st_mode)) {
+        if (info.st_size % sizeof(int) != 0) {
+            fprintf(stderr, "%s: size %lld is not a multiple of %zu bytes\n",
+                    path, (long long)info.st_size, sizeof(int));
+            KEYIO_CLOSE(fd);
+            return NULL;
+        }
+        long long n = (long long)(info.st_size / sizeof(int));
+        if (max_count > 0 && n > max_count) n = max_count;
+        if (n == 0) fprintf(stderr, "%s: no keys to sort\n", path);
+#if KEYIO_MMAP
+        // Private writable mapping: pages are read on first touch and copied
+        // only when the sort writes them
+        if (n > 0) {
+            size_t bytes = (size_t)n * sizeof(int);
+            keys = (int*)mmap(NULL, bytes, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd, 0);
+            if (keys == (int*)MAP_FAILED) {
+                perror(path);
+                keys = NULL;
+            } else {
+                posix_madvise(keys, bytes, POSIX_MADV_WILLNEED);
+                key_mapping = keys;
+                key_mapping_bytes = bytes;
+                *count = n;
+            }
+        }
+#else
+        if (n > 0) keys = readKeyStream(fd, path, n, count);
+#endif
+    } else {
+        keys = readKeyStream(fd, name, max_count, count);
+    }
+    if (!from_stdin) KEYIO_CLOSE(fd);
+    if (keys != NULL && *count == 0) {
+        fprintf(stderr, "%s: no keys to sort\n", name);
+        releaseKeys(keys);
+        keys = NULL;
+    }
+    return keys;
+}
+
+// Write n keys to path ("-": stdout, see keyIoBegin)
+// returns 0 on success, -1 (after printing why) on error
+static inline int writeKeys(const char* path, const int* keys, size_t n) {
+    int to_stdout = (strcmp(path, "-") == 0);
+    const char* name = to_stdout ? "stdout" : path;
+    int fd = to_stdout ? key_output_fd : KEYIO_OPEN(path, O_WRONLY | O_CREAT | O_TRUNC | KEYIO_BINARY, 0644);
+    const char* data = (const char*)keys;
+    size_t bytes = n * sizeof(int);
+    int status = 0;
+
+    if (fd < 0) {
+        perror(name);
+        return -1;
+    }
+    while (bytes > 0) {
+        size_t want = (bytes < KEYIO_BLOCK) ? bytes : KEYIO_BLOCK;
+        long done = (long)KEYIO_WRITE(fd, data, (unsigned)want);
+        if (done < 0 && errno == EINTR) continue;
+        if (done <= 0) {
+            perror(name);
+            status = -1;
+            break;
+        }
+        data += done;
+        bytes -= (size_t)done;
+    }
+    if (KEYIO_CLOSE(fd) != 0 && status == 0) {
+        perror(name);
+        status = -1;
+    }
+    if (to_stdout) key_output_fd = -1;
+    return status;
+}
+
+#endif // QUICKSORT_KEYIO_H
@@ -0,0 +1,181 @@
+// Sorting-network leaf sort for the CPU Quick Sorts (--leaf=network)
+// the bitonic network of the CUDA version (bitonicMergeKernel) applied to one
+// small range: the range is copied into a power-of-two buffer padded with
+// INT_MAX, and every compare-exchange stage runs on whole vectors of keys,
+// AVX2 (8 keys) or SSE4.1 (4 keys) chosen at runtime from the CPU features,
+// with a branchless scalar network on other CPUs and compilers
+#ifndef QUICKSORT_LEAF_SORT_H
+#define QUICKSORT_LEAF_SORT_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <limits.h>
+
+// Smallest and largest network (ranges up to NETWORK_SORT_MAX keys)
+#define NETWORK_SORT_MIN 16
+#define NETWORK_SORT_MAX 256
+
+// Automatic cutoff with --leaf=network
+#define NETWORK_SORT_THRESHOLD 64
+
+// Ranges shorter than this are cheaper to insertion sort than to pad
+#define NETWORK_SORT_SMALL 8
+
+// Instruction sets of the network
+typedef enum {
+    NETWORK_ISA_SCALAR = 0,
+    NETWORK_ISA_SSE41 = 1,
+    NETWORK_ISA_AVX2 = 2
+} NetworkIsa;
+
+// Names of the instruction sets for reports, indexed by NetworkIsa
+static const char* const NETWORK_ISA_NAMES[] = { "scalar", "SSE4.1", "AVX2" };
+
+#if (defined(__GNUC__) || defined(__clang__)) && (defined(__x86_64__) || defined(__i386__))
+#define NETWORK_SORT_X86 1
+#include <immintrin.h>
+#else
+#define NETWORK_SORT_X86 0
+#endif
+
+// Instruction set in use (-1: not chosen yet, see networkSortIsa)
+static int network_isa = -1;
+
+// Best instruction set of this CPU, capped by QUICKSORT_LEAF_ISA=scalar|sse4.1|avx2
+// (the choice is the same on every thread, so a race on the first call is harmless)
+static inline int networkSortIsa(void) {
+    if (network_isa < 0) {
+        int isa = NETWORK_ISA_SCALAR;
+        const char* env = getenv("QUICKSORT_LEAF_ISA");
+#if NETWORK_SORT_X86
+        if (__builtin_cpu_supports("avx2")) isa = NETWORK_ISA_AVX2;
+        else if (__builtin_cpu_supports("sse4.1")) isa = NETWORK_ISA_SSE41;
+#endif
+        if (env != NULL) {
+            if (strcmp(env, "scalar") == 0) isa = NETWORK_ISA_SCALAR;
+            else if (strcmp(env, "sse4.1") == 0 && isa > NETWORK_ISA_SSE41) isa = NETWORK_ISA_SSE41;
+        }
+        network_isa = isa;
+    }
+    return network_isa;
+}
+
+// Bitonic network on buf[0..n-1] (n a power of two) with one compare-exchange
+// per pair i, i + stride: ascending where (i & stage) == 0, as in
+// bitonicMergeKernel; every block of 2 * stride keys has one direction, so
+// the inner loop is branchless (and vectorizable by the compiler)
+static inline void networkSortScalar(int buf[], int n) {
+    for (int stage = 2; stage <= n; stage <<= 1) {
+        for (int stride = stage >> 1; stride > 0; stride >>= 1) {
+            for (int base = 0; base < n; base += 2 * stride) {
+                int* lower = (base & stage) ? buf + base + stride : buf + base;
+                int* upper = (base & stage) ? buf + base : buf + base + stride;
+                for (int i = 0; i < stride; i++) {
+                    int a = lower[i], b = upper[i];
+                    lower[i] = (a < b) ? a : b;
+                    upper[i] = (a < b) ? b : a;
+                }
+            }
+        }
+    }
+}
+
+#if NETWORK_SORT_X86
+// The same network with 8 keys per register: strides of 8 or more compare two
+// registers, smaller strides compare each lane with lane ^ stride of the same
+// register and blend the minimum or maximum into every lane
+__attribute__((target("avx2")))
+static void networkSortAvx2(int buf[], int n) {
+    const __m256i lane = _mm256_setr_epi32(0, 1, 2, 3, 4, 5, 6, 7);
+
+    for (int stage = 2; stage <= n; stage <<= 1) {
+        const __m256i stage_bit = _mm256_set1_epi32(stage);
+        for (int stride = stage >> 1; stride >= 8; stride >>= 1) {
+            for (int i = 0; i < n; i += 8) {
+                if (i & stride) continue;
+                __m256i a = _mm256_loadu_si256((const __m256i*)(buf + i));
+                __m256i b = _mm256_loadu_si256((const __m256i*)(buf + i + stride));
+                __m256i lo = _mm256_min_epi32(a, b);
+                __m256i hi = _mm256_max_epi32(a, b);
+                int ascending = ((i & stage) == 0);
+                _mm256_storeu_si256((__m256i*)(buf + i), ascending ? lo : hi);
+                _mm256_storeu_si256((__m256i*)(buf + i + stride), ascending ? hi : lo);
+            }
+        }
+        for (int stride = (stage < 8 ? stage : 8) >> 1; stride > 0; stride >>= 1) {
+            const __m256i stride_bit = _mm256_set1_epi32(stride);
+            const __m256i partner = _mm256_xor_si256(lane, stride_bit);
+            // Upper lane of its pair: takes the maximum when ascending
+            const __m256i upper = _mm256_cmpeq_epi32(_mm256_and_si256(lane, stride_bit), stride_bit);
+            for (int i = 0; i < n; i += 8) {
+                __m256i index = _mm256_add_epi32(_mm256_set1_epi32(i), lane);
+                __m256i descending = _mm256_cmpeq_epi32(_mm256_and_si256(index, stage_bit), stage_bit);
+                __m256i v = _mm256_loadu_si256((const __m256i*)(buf + i));
+                __m256i p = _mm256_permutevar8x32_epi32(v, partner);
+                v = _mm256_blendv_epi8(_mm256_min_epi32(v, p), _mm256_max_epi32(v, p),
+                                       _mm256_xor_si256(upper, descending));
+                _mm256_storeu_si256((__m256i*)(buf + i), v);
+            }
+        }
+    }
+}
+
+// The same network with 4 keys per register (SSE4.1 min/max and blend)
+__attribute__((target("sse4.1")))
+static void networkSortSse41(int buf[], int n) {
+    const __m128i lane = _mm_setr_epi32(0, 1, 2, 3);
+
+    for (int stage = 2; stage <= n; stage <<= 1) {
+        const __m128i stage_bit = _mm_set1_epi32(stage);
+        for (int stride = stage >> 1; stride >= 4; stride >>= 1) {
+            for (int i = 0; i < n; i += 4) {
+                if (i & stride) continue;
+                __m128i a = _mm_loadu_si128((const __m128i*)(buf + i));
+                __m128i b = _mm_loadu_si128((const __m128i*)(buf + i + stride));
+                __m128i lo = _mm_min_epi32(a, b);
+                __m128i hi = _mm_max_epi32(a, b);
+                int ascending = ((i & stage) == 0);
+                _mm_storeu_si128((__m128i*)(buf + i), ascending ? lo : hi);
+                _mm_storeu_si128((__m128i*)(buf + i + stride), ascending ? hi : lo);
+            }
+        }
+        for (int stride = (stage < 4 ? stage : 4) >> 1; stride > 0; stride >>= 1) {
+            const __m128i stride_bit = _mm_set1_epi32(stride);
+            const __m128i upper = _mm_cmpeq_epi32(_mm_and_si128(lane, stride_bit), stride_bit);
+            for (int i = 0; i < n; i += 4) {
+                __m128i index = _mm_add_epi32(_mm_set1_epi32(i), lane);
+                __m128i descending = _mm_cmpeq_epi32(_mm_and_si128(index, stage_bit), stage_bit);
+                __m128i v = _mm_loadu_si128((const __m128i*)(buf + i));
+                __m128i p = (stride == 1) ? _mm_shuffle_epi32(v, _MM_SHUFFLE(2, 3, 0, 1))
+                                          : _mm_shuffle_epi32(v, _MM_SHUFFLE(1, 0, 3, 2));
+                v = _mm_blendv_epi8(_mm_min_epi32(v, p), _mm_max_epi32(v, p),
+                                    _mm_xor_si128(upper, descending));
+                _mm_storeu_si128((__m128i*)(buf + i), v);
+            }
+        }
+    }
+}
+#endif
+
+// Sort arr[0..n-1] (n <= NETWORK_SORT_MAX) with the sorting network
+static inline void networkSort(int arr[], int n) {
+    int buf[NETWORK_SORT_MAX];
+    int size = NETWORK_SORT_MIN;
+
+    while (size < n) size <<= 1;
+    memcpy(buf, arr, (size_t)n * sizeof(int));
+    for (int i = n; i < size; i++) {
+        buf[i] = INT_MAX;
+    }
+    switch (networkSortIsa()) {
+#if NETWORK_SORT_X86
+        case NETWORK_ISA_AVX2: networkSortAvx2(buf, size); break;
+        case NETWORK_ISA_SSE41: networkSortSse41(buf, size); break;
+#endif
+        default: networkSortScalar(buf, size); break;
+    }
+    memcpy(arr, buf, (size_t)n * sizeof(int));
+}
+
+#endif // QUICKSORT_LEAF_SORT_H
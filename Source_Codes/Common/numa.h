@@ -0,0 +1,292 @@
+// NUMA-aware memory placement and thread pinning for the OpenMP engine
+// Linux places a page on the node of the thread that first writes it. With
+// --numa every pass over the keys (generation, copies of file input, scratch
+// buffers, checksums) splits the array into the same static per-thread blocks,
+// the threads are pinned so that block t stays next to thread t, and sample
+// sort gives the buckets around splitter t to thread t (see sampleSortParallel).
+// --huge-pages and --align=N control the allocation, and numaReport samples
+// where the pages of the array ended up (move_pages). Uses raw system calls,
+// so no libnuma is needed; other platforms get plain allocations and no pinning.
+#ifndef QUICKSORT_NUMA_H
+#define QUICKSORT_NUMA_H
+
+#include <stdio.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <omp.h>
+#include "partition.h"
+#include "report.h"
+#ifdef __linux__
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#endif
+
+// Thread pinning selected with --bind
+typedef enum {
+    NUMA_BIND_NONE = 0,     // leave placement to the OS (or OMP_PROC_BIND)
+    NUMA_BIND_CLOSE = 1,    // thread t on the t-th allowed CPU
+    NUMA_BIND_SPREAD = 2    // threads spread evenly over the allowed CPUs
+} NumaBind;
+
+// Names of the pinning modes for reports, indexed by NumaBind
+static const char* const NUMA_BIND_NAMES[] = { "none", "close", "spread" };
+
+// Largest CPU and node numbers handled
+#define NUMA_MAX_CPUS 4096
+#define NUMA_MAX_NODES 64
+
+// Pages of the array sampled by numaReport
+#define NUMA_SAMPLE_PAGES 4096
+
+// Huge page size used for --huge-pages alignment
+#define NUMA_HUGE_PAGE (2u << 20)
+
+int numa_mode = 0;                 // --numa: first-touch placement, pinning and report
+int numa_bind = -1;                // --bind (-1: spread with --numa, otherwise none)
+int numa_huge_pages = 0;           // --huge-pages: 2 MiB aligned, transparent huge pages
+int numa_alignment = 0;            // --align: alignment of the key array in bytes (0: malloc)
+
+// Outcome of numaBindThreads and numaAlloc, for the report
+int numa_threads_pinned = 0;
+int numa_huge_pages_advised = 0;
+
+// Parse --numa, --bind=close|spread|none, --huge-pages or --align=N
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+static inline int parseNumaOption(const char* arg) {
+    if (strcmp(arg, "--numa") == 0) {
+        numa_mode = 1;
+        return 1;
+    }
+    if (strncmp(arg, "--bind=", 7) == 0) {
+        const char* value = arg + 7;
+        if (strcmp(value, "none") == 0) numa_bind = NUMA_BIND_NONE;
+        else if (strcmp(value, "close") == 0) numa_bind = NUMA_BIND_CLOSE;
+        else if (strcmp(value, "spread") == 0) numa_bind = NUMA_BIND_SPREAD;
+        else return -1;
+        return 1;
+    }
+    if (strcmp(arg, "--huge-pages") == 0) {
+        numa_huge_pages = 1;
+        return 1;
+    }
+    if (strncmp(arg, "--align=", 8) == 0) {
+        if (parseIntValue(arg + 8, (long)sizeof(void*), &numa_alignment) != 1) return -1;
+        return ((numa_alignment & (numa_alignment - 1)) == 0) ? 1 : -1;
+    }
+    return 0;
+}
+
+// Usage lines for the options understood by parseNumaOption
+#define NUMA_OPTIONS_USAGE \
+    "  --numa                         NUMA-aware mode: page-aligned keys placed by\n" \
+    "                                 parallel first touch, pinned threads, sample sort\n" \
+    "                                 buckets kept on their owners, placement report\n" \
+    "  --bind=close|spread|none       Pin thread t to one allowed CPU (default: spread\n" \
+    "                                 with --numa, otherwise none; OMP_PROC_BIND wins)\n" \
+    "  --huge-pages                   2 MiB aligned keys with transparent huge pages\n" \
+    "  --align=N                      Align the key array to N bytes (a power of two)\n"
+
+// Pinning in effect: --bind, else spread in NUMA mode, and none if the
+// OpenMP runtime already binds its threads (OMP_PROC_BIND)
+static inline int numaBindMode(void) {
+    int mode = (numa_bind >= 0) ? numa_bind : (numa_mode ? NUMA_BIND_SPREAD : NUMA_BIND_NONE);
+    const char* env = getenv("OMP_PROC_BIND");
+
+    if (env != NULL && strcmp(env, "false") != 0 && strcmp(env, "FALSE") != 0) {
+        return NUMA_BIND_NONE;
+    }
+    return mode;
+}
+
+// Pin each of the threads OpenMP threads to one CPU of the process's
+// affinity mask (the runtime keeps the same threads for later regions)
+// returns the number of threads pinned
+static inline int numaBindThreads(int threads) {
+    int mode = numaBindMode();
+    int pinned = 0;
+
+    numa_threads_pinned = 0;
+    if (mode == NUMA_BIND_NONE) return 0;
+#ifdef __linux__
+    unsigned long mask[NUMA_MAX_CPUS / (8 * sizeof(unsigned long))];
+    int cpus[NUMA_MAX_CPUS];
+    int num_cpus = 0;
+
+    memset(mask, 0, sizeof(mask));
+    if (syscall(SYS_sched_getaffinity, 0, sizeof(mask), mask) < 0) return 0;
+    for (int c = 0; c < NUMA_MAX_CPUS; c++) {
+        if (mask[c / (8 * sizeof(unsigned long))] & (1UL << (c % (8 * sizeof(unsigned long))))) {
+            cpus[num_cpus++] = c;
+        }
+    }
+    if (num_cpus == 0) return 0;
+
+    #pragma omp parallel num_threads(threads) reduction(+:pinned)
+    {
+        int t = omp_get_thread_num();
+        int n = omp_get_num_threads();
+        int index = (mode == NUMA_BIND_SPREAD && n <= num_cpus)
+                  ? (int)((long long)t * num_cpus / n) : t % num_cpus;
+        unsigned long own[NUMA_MAX_CPUS / (8 * sizeof(unsigned long))];
+
+        memset(own, 0, sizeof(own));
+        own[cpus[index] / (8 * sizeof(unsigned long))] |= 1UL << (cpus[index] % (8 * sizeof(unsigned long)));
+        if (syscall(SYS_sched_setaffinity, 0, sizeof(own), own) == 0) {
+            pinned++;
+        }
+    }
+#else
+    (void)threads;
+#endif
+    numa_threads_pinned = pinned;
+    return pinned;
+}
+
+// Allocate bytes for the key array: malloc, or aligned to --align (page size
+// in NUMA mode, 2 MiB with --huge-pages, which also asks for transparent huge
+// pages); pages are not touched, so the first writer places them
+// release with free (or releaseKeys); returns NULL on failure
+static inline void* numaAlloc(size_t bytes) {
+    size_t alignment = (size_t)numa_alignment;
+    void* p = NULL;
+
+    numa_huge_pages_advised = 0;
+#ifdef __linux__
+    if (numa_mode && alignment < (size_t)sysconf(_SC_PAGESIZE)) {
+        alignment = (size_t)sysconf(_SC_PAGESIZE);
+    }
+    if (numa_huge_pages && alignment < NUMA_HUGE_PAGE) {
+        alignment = NUMA_HUGE_PAGE;
+    }
+    if (alignment == 0) return malloc(bytes);
+    if (posix_memalign(&p, alignment, bytes) != 0) return NULL;
+#ifdef MADV_HUGEPAGE
+    if (numa_huge_pages) {
+        size_t rounded = bytes & ~((size_t)NUMA_HUGE_PAGE - 1);
+        numa_huge_pages_advised = (rounded > 0 && madvise(p, rounded, MADV_HUGEPAGE) == 0);
+    }
+#endif
+#else
+    // (alignment and huge pages need posix_memalign and madvise)
+    (void)alignment;
+    p = malloc(bytes);
+#endif
+    return p;
+}
+
+// Write one byte per page of p[0..bytes-1] from the thread whose static block
+// of the range holds it, placing every page on that thread's node
+static inline void numaFirstTouch(void* p, size_t bytes, int threads) {
+    char* bytes_p = (char*)p;
+
+    #pragma omp parallel for schedule(static) num_threads(threads > 0 ? threads : 1)
+    for (size_t offset = 0; offset < bytes; offset += 4096) {
+        bytes_p[offset] = 0;
+    }
+}
+
+// Copy n keys from src into dst with the same static per-thread blocks as
+// numaFirstTouch, so the copy places dst on the nodes of its owners
+static inline void numaCopyKeys(int* dst, const int* src, size_t n, int threads) {
+    #pragma omp parallel num_threads(threads > 0 ? threads : 1)
+    {
+        int t = omp_get_thread_num();
+        int nt = omp_get_num_threads();
+        size_t begin = n * t / nt;
+        size_t end = n * (t + 1) / nt;
+        memcpy(dst + begin, src + begin, (end - begin) * sizeof(int));
+    }
+}
+
+// 1 if any NUMA option was given (the drivers then print numaReport)
+static inline int numaReportWanted(void) {
+    return numa_mode || numa_bind > NUMA_BIND_NONE || numa_huge_pages || numa_alignment > 0;
+}
+
+// Print (and record as counters) where the pages of keys[0..bytes-1] live:
+// the share of sampled pages and of the threads on every node, and the share
+// of pages that sit on the node of the thread owning their static block
+static inline void numaReport(const void* keys, size_t bytes, int threads, RunRecord* record) {
+    printf("Thread Binding: %s (%d of %d threads pinned)\n",
+           NUMA_BIND_NAMES[numaBindMode()], numa_threads_pinned, threads);
+    if (numa_huge_pages) {
+        printf("Huge Pages: %s\n", numa_huge_pages_advised ? "requested (MADV_HUGEPAGE)" : "not available");
+    }
+#ifdef __linux__
+    size_t page = (size_t)sysconf(_SC_PAGESIZE);
+    uintptr_t base = (uintptr_t)keys & ~(uintptr_t)(page - 1);
+    size_t num_pages = ((uintptr_t)keys + bytes - base + page - 1) / page;
+    size_t samples = (num_pages < NUMA_SAMPLE_PAGES) ? num_pages : NUMA_SAMPLE_PAGES;
+    int* thread_node = (int*)malloc((size_t)threads * sizeof(int));
+    void** pages = (void**)malloc(samples * sizeof(void*));
+    int* status = (int*)malloc(samples * sizeof(int));
+    long long node_pages[NUMA_MAX_NODES] = {0};
+    int node_threads[NUMA_MAX_NODES] = {0};
+    long long placed = 0, local = 0;
+
+    if (thread_node == NULL || pages == NULL || status == NULL || samples == 0) {
+        free(thread_node);
+        free(pages);
+        free(status);
+        return;
+    }
+
+    // Node of every thread
+    #pragma omp parallel num_threads(threads)
+    {
+        unsigned cpu = 0, node = 0;
+        if (syscall(SYS_getcpu, &cpu, &node, NULL) != 0 || node >= NUMA_MAX_NODES) node = 0;
+        thread_node[omp_get_thread_num()] = (int)node;
+    }
+    for (int t = 0; t < threads; t++) {
+        node_threads[thread_node[t]]++;
+    }
+
+    // Node of evenly spaced pages (negative status: not placed yet)
+    for (size_t i = 0; i < samples; i++) {
+        pages[i] = (void*)(base + (num_pages * i / samples) * page);
+    }
+    if (syscall(SYS_move_pages, 0, (unsigned long)samples, pages, NULL, status, 0) != 0) {
+        printf("NUMA Placement: not available (move_pages failed)\n");
+        free(thread_node);
+        free(pages);
+        free(status);
+        return;
+    }
+    for (size_t i = 0; i < samples; i++) {
+        if (status[i] < 0 || status[i] >= NUMA_MAX_NODES) continue;
+        uintptr_t address = (uintptr_t)pages[i];
+        size_t offset = (address > (uintptr_t)keys) ? address - (uintptr_t)keys : 0;
+        size_t owner = (size_t)((double)offset / bytes * threads);
+        if (owner >= (size_t)threads) owner = (size_t)threads - 1;
+        node_pages[status[i]]++;
+        placed++;
+        local += (status[i] == thread_node[owner]);
+    }
+
+    int nodes = 0;
+    printf("NUMA Placement (%zu of %zu pages sampled):\n", samples, num_pages);
+    for (int node = 0; node < NUMA_MAX_NODES; node++) {
+        if (node_pages[node] == 0 && node_threads[node] == 0) continue;
+        nodes++;
+        printf("  Node %d: %d threads, %.1f%% of pages\n", node, node_threads[node],
+               placed > 0 ? 100.0 * node_pages[node] / placed : 0.0);
+    }
+    printf("  Pages on their owning thread's node: %.1f%%\n", placed > 0 ? 100.0 * local / placed : 0.0);
+    reportCounter(record, "numa_nodes", nodes);
+    reportCounter(record, "numa_local_pages_pct", placed > 0 ? 100 * local / placed : 0);
+
+    free(thread_node);
+    free(pages);
+    free(status);
+#else
+    (void)keys;
+    (void)bytes;
+    (void)record;
+    printf("NUMA Placement: not available on this platform\n");
+#endif
+}
+
+#endif // QUICKSORT_NUMA_H
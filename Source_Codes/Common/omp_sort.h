@@ -0,0 +1,563 @@
+// OpenMP sort engine: task-based quick sort, parallel sample sort and the
+// input-aware dispatcher behind --algorithm=auto
+// (used by the OpenMP version and by the hybrid MPI+OpenMP build)
+// the including program defines sort_options and includes this header once
+#ifndef QUICKSORT_OMP_SORT_H
+#define QUICKSORT_OMP_SORT_H
+
+#include <stdlib.h>
+#include <string.h>
+#include <omp.h>
+#include "partition.h"
+#include "radix_sort.h"
+#include "dispatch.h"
+#include "numa.h"
+
+// Automatic task granularity: aim for TASKS_PER_THREAD tasks per thread,
+// but never spawn a task for fewer than TASK_THRESHOLD_MIN elements
+#define TASKS_PER_THREAD 8
+#define TASK_THRESHOLD_MIN 4096
+
+// Default range size for --parallel-partition
+#define PARALLEL_PARTITION_THRESHOLD 1000000
+
+// Samples drawn per bucket when choosing sample sort splitters
+#define SAMPLE_OVERSAMPLING 32
+
+// Whole-array algorithms selectable with --algorithm
+typedef enum {
+    ALGORITHM_QUICKSORT = 0,   // task-based quick sort
+    ALGORITHM_SAMPLESORT = 1,  // parallel sample sort
+    ALGORITHM_RADIX = 2,       // parallel LSD/MSD radix sort (Common/radix_sort.h)
+    ALGORITHM_AUTO = 3         // engine chosen per input (Common/dispatch.h)
+} SortAlgorithm;
+
+// Names of the algorithms for reports, indexed by SortAlgorithm
+static const char* const ALGORITHM_NAMES[] = { "quick sort", "sample sort", "radix sort", "auto-selected sort" };
+
+int sort_algorithm = ALGORITHM_QUICKSORT;
+
+// Partition strategy, defined by the including program
+extern SortOptions sort_options;
+
+// Ranges of at least this many elements are partitioned by the whole
+// thread team (0 disables cooperative partitioning)
+int parallel_partition_threshold = 0;
+
+// Task granularity settings (0 = choose automatically in sortParallel)
+int task_threshold = 0;     // spawn a task only for ranges larger than this
+int task_depth_limit = 0;   // no new tasks below this many levels of tasks
+
+// Values in effect for the most recent task quick sort, and the number of
+// tasks it created (for reports only: every sort counts in its own context
+// and stores the results here with atomic writes when it is done, so with
+// concurrent sorts they describe whichever finished last)
+int active_task_threshold = 0;
+int active_task_depth_limit = 0;
+long tasks_created = 0;
+
+// State of one task quick sort, passed down the task tree. Concurrent sorts
+// (e.g. from several threads of a caller) share only the settings above,
+// which they read, and the report values, which they write atomically
+typedef struct {
+    const SortOptions* options;   // pivot and partition strategy of this sort
+    int* partition_buffer;   // scratch space for cooperative partitioning, one
+                             // slot per element (NULL: partition serially)
+    int task_threshold;      // spawn a task only for ranges larger than this
+    int task_depth_limit;    // no new tasks below this many levels of tasks
+    long* tasks;             // tasks created by this sort (updated atomically)
+} TaskSortContext;
+
+// Cooperative three-way partition of arr[low..high] with the thread team
+// each task classifies one chunk, a prefix sum over the per-chunk counts gives
+// every chunk its output offsets, and the chunks scatter into the context's
+// partition buffer in parallel before being copied back
+void partitionParallel(int arr[], int low, int high, int* lt, int* gt, const TaskSortContext* ctx) {
+    int n = high - low + 1;
+    int chunks = omp_get_num_threads();
+    int pivot = arr[choosePivot(arr, low, high, ctx->options->pivot)];
+    int* tmp = ctx->partition_buffer;
+    
+    // counts[3*c + k]: elements of chunk c that are <, == or > pivot (k = 0, 1, 2)
+    int counts[3 * chunks];
+    
+    #pragma omp atomic
+    *ctx->tasks += 3 * chunks;
+    PROFILE_COUNT(COUNTER_TASKS, 3 * chunks);
+    
+    for (int c = 0; c < chunks; c++) {
+        #pragma omp task shared(arr, counts) firstprivate(c)
+        {
+            int begin = low + (int)((long long)n * c / chunks);
+            int end = low + (int)((long long)n * (c + 1) / chunks);
+            int less = 0, equal = 0;
+            for (int i = begin; i < end; i++) {
+                less += (arr[i] < pivot);
+                equal += (arr[i] == pivot);
+            }
+            counts[3 * c] = less;
+            counts[3 * c + 1] = equal;
+            counts[3 * c + 2] = (end - begin) - less - equal;
+        }
+    }
+    #pragma omp taskwait
+    
+    // Exclusive prefix sum: class by class, chunk by chunk
+    int total_less = 0, total_equal = 0;
+    for (int c = 0; c < chunks; c++) {
+        total_less += counts[3 * c];
+        total_equal += counts[3 * c + 1];
+    }
+    int next[3] = { low, low + total_less, low + total_less + total_equal };
+    for (int c = 0; c < chunks; c++) {
+        for (int k = 0; k < 3; k++) {
+            int count = counts[3 * c + k];
+            counts[3 * c + k] = next[k];
+            next[k] += count;
+        }
+    }
+    
+    // Scatter every chunk to its slots in the scratch buffer
+    for (int c = 0; c < chunks; c++) {
+        #pragma omp task shared(arr, counts, tmp) firstprivate(c)
+        {
+            int begin = low + (int)((long long)n * c / chunks);
+            int end = low + (int)((long long)n * (c + 1) / chunks);
+            int pos[3] = { counts[3 * c], counts[3 * c + 1], counts[3 * c + 2] };
+            for (int i = begin; i < end; i++) {
+                int value = arr[i];
+                int cls = (value >= pivot) + (value > pivot);
+                tmp[pos[cls]++] = value;
+            }
+        }
+    }
+    #pragma omp taskwait
+    
+    // Copy the partitioned range back in parallel
+    for (int c = 0; c < chunks; c++) {
+        #pragma omp task shared(arr, tmp) firstprivate(c)
+        {
+            int begin = low + (int)((long long)n * c / chunks);
+            int end = low + (int)((long long)n * (c + 1) / chunks);
+            memcpy(arr + begin, tmp + begin, (size_t)(end - begin) * sizeof(int));
+        }
+    }
+    #pragma omp taskwait
+    
+    *lt = low + total_less;
+    *gt = low + total_less + total_equal - 1;
+}
+
+// Serial Quick Sort (depth = levels left before the heapsort fallback)
+void quickSortSerial(int arr[], int low, int high, int depth, const SortOptions* options) {
+    PROFILE_START(start);
+    introSortLoop(arr, low, high, options, depth);
+    PROFILE_STOP(start, PHASE_LOCAL_SORT);
+}
+
+// Parallel Quick Sort using OpenMP tasks
+// task_depth counts the tasks between this call and the root
+void quickSortParallel(int arr[], int low, int high, int depth, int task_depth, const TaskSortContext* ctx) {
+    if (low < high) {
+        PROFILE_DEPTH(depth);
+        if (ctx->options->depth_guard && depth <= 0) {
+            heapSort(arr, low, high);
+            return;
+        }
+        depth--;
+        
+        int lt, gt;
+        PROFILE_START(partition_start);
+        if (ctx->partition_buffer != NULL && high - low + 1 >= parallel_partition_threshold) {
+            partitionParallel(arr, low, high, &lt, &gt, ctx);
+        } else {
+            partitionRange(arr, low, high, ctx->options, &lt, &gt);
+        }
+        PROFILE_STOP(partition_start, PHASE_PARTITION);
+        PROFILE_COUNT(COUNTER_PARTITIONS, 1);
+        
+        // A side is worth a task if it is large and the task tree is not too deep
+        int can_spawn = task_depth < ctx->task_depth_limit;
+        int spawn_left = can_spawn && (lt - low > ctx->task_threshold);
+        int spawn_right = can_spawn && (high - gt > ctx->task_threshold);
+        
+        // Left side: a new task, or sorted serially right here
+        if (spawn_left) {
+            #pragma omp atomic
+            (*ctx->tasks)++;
+            PROFILE_COUNT(COUNTER_TASKS, 1);
+            
+            #pragma omp task shared(arr) firstprivate(low, lt, depth, task_depth, ctx)
+            {
+                quickSortParallel(arr, low, lt - 1, depth, task_depth + 1, ctx);
+            }
+        } else {
+            quickSortSerial(arr, low, lt - 1, depth, ctx->options);
+        }
+        
+        // Right side stays on this thread, splitting further if it is large
+        if (spawn_right) {
+            quickSortParallel(arr, gt + 1, high, depth, task_depth + 1, ctx);
+        } else {
+            quickSortSerial(arr, gt + 1, high, depth, ctx->options);
+        }
+        
+        if (spawn_left) {
+            #pragma omp taskwait
+        }
+    }
+}
+
+// Pick the task threshold and task depth limit of ctx for a sort of size elements
+// explicit settings win, then the QUICKSORT_TASK_THRESHOLD and
+// QUICKSORT_TASK_DEPTH environment variables, then the automatic choice
+void chooseTaskGranularity(int size, int threads, TaskSortContext* ctx) {
+    int threshold = task_threshold;
+    int depth_limit = task_depth_limit;
+    const char* env;
+    
+    if (threshold <= 0 && (env = getenv("QUICKSORT_TASK_THRESHOLD")) != NULL) {
+        if (parseIntValue(env, 1, &threshold) != 1) threshold = 0;
+    }
+    if (depth_limit <= 0 && (env = getenv("QUICKSORT_TASK_DEPTH")) != NULL) {
+        if (parseIntValue(env, 1, &depth_limit) != 1) depth_limit = 0;
+    }
+    
+    if (threshold <= 0) {
+        // One thread gains nothing from tasks
+        if (threads <= 1) {
+            threshold = size;
+        } else {
+            threshold = size / (threads * TASKS_PER_THREAD);
+            if (threshold < TASK_THRESHOLD_MIN) threshold = TASK_THRESHOLD_MIN;
+        }
+    }
+    if (depth_limit <= 0) {
+        // 2 * ceil(log2(threads * TASKS_PER_THREAD)): twice the depth of a
+        // balanced task tree, leaving room for uneven splits
+        depth_limit = depthLimit(2 * threads * TASKS_PER_THREAD - 1);
+    }
+    
+    ctx->task_threshold = threshold;
+    ctx->task_depth_limit = depth_limit;
+}
+
+// Task-based Quick Sort of a whole array with the current thread team,
+// partitioning as options says
+void quickSortTasksWith(int arr[], int size, const SortOptions* options) {
+    long tasks = 0;
+    TaskSortContext ctx = { options, NULL, 0, 0, &tasks };
+    
+    // Scratch buffer for cooperative partitioning of the top levels
+    // (without one every range is partitioned serially)
+    if (parallel_partition_threshold > 0 && size >= parallel_partition_threshold
+            && omp_get_max_threads() > 1) {
+        ctx.partition_buffer = (int*)malloc((size_t)size * sizeof(int));
+        if (numa_mode && ctx.partition_buffer != NULL) {
+            numaFirstTouch(ctx.partition_buffer, (size_t)size * sizeof(int), omp_get_max_threads());
+        }
+    }
+    
+    chooseTaskGranularity(size, omp_get_max_threads(), &ctx);
+    
+    // Start parallel region and create initial task
+    #pragma omp parallel
+    {
+        PROFILE_DEPTH_ROOT(depthLimit(size));
+        #pragma omp single
+        {
+            quickSortParallel(arr, 0, size - 1, depthLimit(size), 0, &ctx);
+        }
+    }
+    
+    free(ctx.partition_buffer);
+    
+    #pragma omp atomic write
+    active_task_threshold = ctx.task_threshold;
+    #pragma omp atomic write
+    active_task_depth_limit = ctx.task_depth_limit;
+    #pragma omp atomic write
+    tasks_created = tasks;
+}
+
+// Task-based Quick Sort of a whole array with the options in sort_options
+void quickSortTasks(int arr[], int size) {
+    quickSortTasksWith(arr, size, &sort_options);
+}
+
+// Bucket of value among num_splitters distinct sorted splitters: bucket 2j
+// holds the keys between splitters j-1 and j, bucket 2j+1 the keys equal to
+// splitter j (binary search for the number of splitters <= value)
+static inline int findBucket(const int splitters[], int num_splitters, int value) {
+    int lo = 0, hi = num_splitters;
+    
+    while (lo < hi) {
+        int mid = (lo + hi) / 2;
+        if (splitters[mid] <= value) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return (lo > 0 && splitters[lo - 1] == value) ? 2 * lo - 1 : 2 * lo;
+}
+
+// Sort bucket tmp[low..high] and copy it back into arr
+// (odd buckets hold keys equal to one splitter and need no sorting)
+static inline void sortBucket(int arr[], int tmp[], int bucket, int low, int high) {
+    PROFILE_START(sort_start);
+    if (low < high && bucket % 2 == 0) {
+        introSort(tmp, low, high, &sort_options);
+    }
+    memcpy(arr + low, tmp + low, (size_t)(high - low + 1) * sizeof(int));
+    PROFILE_STOP(sort_start, PHASE_LOCAL_SORT);
+}
+
+// Parallel sample sort: one bucket per thread, plus one for each splitter
+// 1. choose up to p-1 distinct splitters from an oversampled, sorted sample
+// 2. every thread counts how many elements of its chunk fall in each bucket
+// 3. prefix sums over the counts give every (thread, bucket) pair its offset,
+//    and the threads scatter their chunks into a scratch buffer in parallel
+// 4. every bucket is sorted by one thread and copied back
+// keys equal to a splitter get a bucket of their own that needs no sorting,
+// so duplicate-heavy input (equal keys, few unique values, Zipf) does not
+// pile up in one bucket that a single thread has to sort
+// in NUMA mode (--numa) thread t first touches its block of the scratch buffer
+// and sorts buckets 2t and 2t+1, which cover about the same part of both
+// arrays, so the sort and the copy back stay on the thread's own node
+void sampleSortParallel(int arr[], int size) {
+    int* tmp = (int*)malloc((size_t)size * sizeof(int));
+    int max_threads = omp_get_max_threads();
+    int* offsets = (int*)malloc((size_t)max_threads * 2 * max_threads * sizeof(int));
+    int* bucket_start = (int*)malloc((size_t)(2 * max_threads + 1) * sizeof(int));
+    int* splitters = (int*)malloc((size_t)max_threads * sizeof(int));
+    int* sample = (int*)malloc((size_t)max_threads * SAMPLE_OVERSAMPLING * sizeof(int));
+    
+    // Without scratch space (or threads) fall back to the task-based sort
+    if (tmp == NULL || offsets == NULL || bucket_start == NULL || splitters == NULL
+            || sample == NULL || max_threads <= 1 || size < max_threads * SAMPLE_OVERSAMPLING) {
+        free(tmp);
+        free(offsets);
+        free(bucket_start);
+        free(splitters);
+        free(sample);
+        quickSortTasks(arr, size);
+        return;
+    }
+    
+    #pragma omp atomic write
+    tasks_created = 0;
+    int num_splitters = 0;
+    int num_buckets = 1;
+    
+    #pragma omp parallel
+    {
+        int nt = omp_get_num_threads();
+        int tid = omp_get_thread_num();
+        int begin = (int)((long long)size * tid / nt);
+        int end = (int)((long long)size * (tid + 1) / nt);
+        PROFILE_START(partition_start);
+        
+        // Place this thread's block of the scratch buffer on its node
+        if (numa_mode) {
+            for (int i = begin; i < end; i += 4096 / (int)sizeof(int)) {
+                tmp[i] = 0;
+            }
+        }
+        
+        // Step 1: splitters from nt * SAMPLE_OVERSAMPLING jittered, evenly spaced samples
+        #pragma omp single
+        {
+            int num_samples = nt * SAMPLE_OVERSAMPLING;
+            int stride = size / num_samples;
+            unsigned int state = 12345u;
+            
+            for (int i = 0; i < num_samples; i++) {
+                state = state * 1103515245u + 12345u;
+                sample[i] = arr[i * stride + (int)((state >> 16) % (unsigned int)stride)];
+            }
+            introSort(sample, 0, num_samples - 1, &sort_options);
+            // (repeated splitters are dropped: their keys share one equal bucket)
+            for (int b = 1; b < nt; b++) {
+                int splitter = sample[b * SAMPLE_OVERSAMPLING];
+                if (num_splitters == 0 || splitters[num_splitters - 1] != splitter) {
+                    splitters[num_splitters++] = splitter;
+                }
+            }
+            num_buckets = 2 * num_splitters + 1;
+        }
+        int* my_offsets = offsets + tid * num_buckets;
+        
+        // Step 2: classify this thread's chunk
+        for (int b = 0; b < num_buckets; b++) {
+            my_offsets[b] = 0;
+        }
+        for (int i = begin; i < end; i++) {
+            my_offsets[findBucket(splitters, num_splitters, arr[i])]++;
+        }
+        #pragma omp barrier
+        
+        // Step 3a: exclusive prefix sum, bucket by bucket, thread by thread
+        #pragma omp single
+        {
+            int next = 0;
+            for (int b = 0; b < num_buckets; b++) {
+                bucket_start[b] = next;
+                for (int t = 0; t < nt; t++) {
+                    int count = offsets[t * num_buckets + b];
+                    offsets[t * num_buckets + b] = next;
+                    next += count;
+                }
+            }
+            bucket_start[num_buckets] = next;
+        }
+        
+        // Step 3b: scatter this thread's chunk into its bucket slots
+        for (int i = begin; i < end; i++) {
+            int value = arr[i];
+            tmp[my_offsets[findBucket(splitters, num_splitters, value)]++] = value;
+        }
+        PROFILE_STOP(partition_start, PHASE_PARTITION);
+        #pragma omp barrier
+        
+        // Step 4: sort every bucket and copy it back (buckets 2t and 2t+1 on
+        // thread t in NUMA mode, otherwise whichever thread is free)
+        if (numa_mode) {
+            #pragma omp for schedule(static, 2)
+            for (int b = 0; b < num_buckets; b++) {
+                sortBucket(arr, tmp, b, bucket_start[b], bucket_start[b + 1] - 1);
+            }
+        } else {
+            #pragma omp for schedule(dynamic, 1)
+            for (int b = 0; b < num_buckets; b++) {
+                sortBucket(arr, tmp, b, bucket_start[b], bucket_start[b + 1] - 1);
+            }
+        }
+    }
+    
+    free(tmp);
+    free(offsets);
+    free(bucket_start);
+    free(splitters);
+    free(sample);
+}
+
+// Profile arr[0..size-1], pick an engine with chooseEngine and run it
+// (the quick sort engines use DISPATCH_QUICKSORT_OPTIONS for this call;
+// counting sort falls back to radix sort, radix sort to task quick sort)
+void sortAuto(int arr[], int size) {
+    InputProfile profile;
+    int threads = omp_get_max_threads();
+    
+    if (size <= 1) {
+        dispatchRecord(ENGINE_INSERTION, "nothing to sort");
+        return;
+    }
+    profileInput(arr, size, threads, &profile);
+    int engine = chooseEngine(&profile, dispatch_reason, sizeof(dispatch_reason));
+    
+    if (engine == ENGINE_RUN_MERGE
+            && runMergeSort(arr, size, profile.runs, profile.run_start, threads) == 0) {
+        dispatchRecord(engine, dispatch_reason);
+        return;
+    }
+    if (engine == ENGINE_COUNTING) {
+        if (countingSort(arr, size, DISPATCH_COUNTING_MAX_RANGE, threads) == 0) {
+            dispatchRecord(engine, dispatch_reason);
+            return;
+        }
+        engine = ENGINE_RADIX;
+        snprintf(dispatch_reason, sizeof(dispatch_reason),
+                 "exact key range too wide for counting sort");
+    }
+    if (engine == ENGINE_RADIX) {
+        if (radixSort(arr, size, threads) == 0) {
+            dispatchRecord(engine, dispatch_reason);
+            return;
+        }
+        engine = ENGINE_TASKS;
+        snprintf(dispatch_reason, sizeof(dispatch_reason), "no memory for the radix scratch buffer");
+    }
+    
+    if (engine == ENGINE_INSERTION) {
+        insertionSort(arr, 0, size - 1);
+    } else if (engine == ENGINE_QUICKSORT) {
+        introSort(arr, 0, size - 1, &DISPATCH_QUICKSORT_OPTIONS);
+    } else {
+        // (ENGINE_TASKS, or a run merge that could not allocate its buffer)
+        quickSortTasksWith(arr, size, &DISPATCH_QUICKSORT_OPTIONS);
+        engine = ENGINE_TASKS;
+    }
+    dispatchRecord(engine, dispatch_reason);
+}
+
+// Sort a whole array with a team of num_threads threads using the selected algorithm
+// (num_threads <= 0 keeps the current OpenMP default)
+void sortParallel(int arr[], int size, int num_threads) {
+    if (num_threads > 0) {
+        omp_set_num_threads(num_threads);
+    }
+    
+    if (sort_algorithm == ALGORITHM_AUTO) {
+        sortAuto(arr, size);
+    } else if (sort_algorithm == ALGORITHM_SAMPLESORT) {
+        sampleSortParallel(arr, size);
+    } else if (sort_algorithm == ALGORITHM_RADIX) {
+        // (the radix passes are timed as a whole, on the calling thread)
+        PROFILE_START(start);
+        int status = radixSort(arr, size, omp_get_max_threads());
+        PROFILE_STOP(start, PHASE_LOCAL_SORT);
+        if (status != 0) {
+            quickSortTasks(arr, size);
+        }
+    } else {
+        // (also the fallback when radix sort cannot allocate its scratch buffer)
+        quickSortTasks(arr, size);
+    }
+}
+
+// Parse one OpenMP-specific command line option
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+int parseOmpOption(const char* arg) {
+    if (strncmp(arg, "--algorithm=", 12) == 0) {
+        const char* value = arg + 12;
+        if (strcmp(value, "quicksort") == 0) sort_algorithm = ALGORITHM_QUICKSORT;
+        else if (strcmp(value, "samplesort") == 0) sort_algorithm = ALGORITHM_SAMPLESORT;
+        else if (strcmp(value, "radix") == 0) sort_algorithm = ALGORITHM_RADIX;
+        else if (strcmp(value, "auto") == 0) sort_algorithm = ALGORITHM_AUTO;
+        else return -1;
+        return 1;
+    }
+    if (strcmp(arg, "--parallel-partition") == 0) {
+        parallel_partition_threshold = PARALLEL_PARTITION_THRESHOLD;
+        return 1;
+    }
+    if (strncmp(arg, "--parallel-partition=", 21) == 0) {
+        return parseIntValue(arg + 21, 2, &parallel_partition_threshold);
+    }
+    if (strncmp(arg, "--task-threshold=", 17) == 0) {
+        return parseIntValue(arg + 17, 1, &task_threshold);
+    }
+    if (strncmp(arg, "--task-depth=", 13) == 0) {
+        return parseIntValue(arg + 13, 1, &task_depth_limit);
+    }
+    return 0;
+}
+
+// Usage lines for the options understood by parseOmpOption
+#define OMP_OPTIONS_USAGE \
+    "  --algorithm=quicksort|samplesort|radix|auto\n" \
+    "                                 Task-based quick sort (default), sample sort,\n" \
+    "                                 radix sort (integer keys, range-sized digits), or\n" \
+    "                                 an engine chosen from a sample of the input\n" \
+    "  --parallel-partition[=N]       Partition ranges of N or more elements with the\n" \
+    "                                 whole thread team (default N: 1000000)\n" \
+    "  --task-threshold=N             Only spawn tasks for ranges larger than N\n" \
+    "                                 (default: size / (8 * threads), at least 4096)\n" \
+    "  --task-depth=D                 Stop spawning tasks D levels below the root\n" \
+    "                                 (default: 2 * log2(8 * threads))\n" \
+    "Environment: QUICKSORT_TASK_THRESHOLD and QUICKSORT_TASK_DEPTH set the same\n" \
+    "values when the flags are not given; QUICKSORT_DISPATCH_LOG prints every\n" \
+    "--algorithm=auto decision to stderr\n"
+
+#endif // QUICKSORT_OMP_SORT_H
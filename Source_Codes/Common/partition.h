@@ -0,0 +1,384 @@
+// Shared partitioning and introsort routines for the CPU Quick Sorts
+// (Serial, OpenMP and MPI include this header)
+#ifndef QUICKSORT_PARTITION_H
+#define QUICKSORT_PARTITION_H
+
+#include <stdlib.h>
+#include <string.h>
+#include "profile.h"
+#include "leaf_sort.h"
+
+// How the pivot is chosen
+typedef enum {
+    PIVOT_LAST = 0,      // rightmost element (original behaviour)
+    PIVOT_MEDIAN3 = 1,   // median of first, middle and last
+    PIVOT_NINTHER = 2    // Tukey's ninther: median of three medians of three
+} PivotStrategy;
+
+// How a range is split around the pivot
+typedef enum {
+    PARTITION_LOMUTO = 0,     // two-way Lomuto scan
+    PARTITION_THREE_WAY = 1,  // Dutch flag: < pivot, == pivot, > pivot
+    PARTITION_BLOCK = 2       // branchless BlockQuicksort (buffered offsets)
+} PartitionScheme;
+
+// How ranges below the cutoff are finished
+typedef enum {
+    LEAF_INSERTION = 0,   // insertion sort
+    LEAF_NETWORK = 1      // vectorized bitonic sorting network (leaf_sort.h)
+} LeafSort;
+
+// Runtime-selectable sort configuration
+typedef struct {
+    int pivot;        // PivotStrategy
+    int scheme;       // PartitionScheme
+    int depth_guard;  // non-zero: heapsort once depth exceeds 2*log2(n)
+    int cutoff;       // leaf sort below this size (-1: auto, 0: off)
+    int leaf;         // LeafSort
+} SortOptions;
+
+// Defaults reproduce the original rightmost-pivot Lomuto sort
+#define SORT_OPTIONS_DEFAULT { PIVOT_LAST, PARTITION_LOMUTO, 0, -1, LEAF_INSERTION }
+
+// Automatic insertion sort cutoff for the block partition
+// (same value as the CUDA version)
+#define INSERTION_SORT_THRESHOLD 32
+
+// Elements classified per block by the block partition
+#define PARTITION_BLOCK_SIZE 64
+
+// Ranges at least this long use the ninther instead of median of three
+#define NINTHER_THRESHOLD 128
+
+// Function to swap two elements
+static inline void sortSwap(int* a, int* b) {
+    int temp = *a;
+    *a = *b;
+    *b = temp;
+}
+
+// Index of the median of arr[a], arr[b] and arr[c]
+static inline int medianOfThree(const int arr[], int a, int b, int c) {
+    if (arr[a] < arr[b]) {
+        if (arr[b] < arr[c]) return b;
+        return (arr[a] < arr[c]) ? c : a;
+    }
+    if (arr[a] < arr[c]) return a;
+    return (arr[b] < arr[c]) ? c : b;
+}
+
+// Order arr[a] <= arr[b] <= arr[c] in place (median of three, kept in the middle)
+static inline void sortThree(int arr[], int a, int b, int c) {
+    if (arr[b] < arr[a]) sortSwap(&arr[a], &arr[b]);
+    if (arr[c] < arr[b]) sortSwap(&arr[b], &arr[c]);
+    if (arr[b] < arr[a]) sortSwap(&arr[a], &arr[b]);
+}
+
+// Index of the pivot for arr[low..high] under the given strategy
+static inline int choosePivot(const int arr[], int low, int high, int strategy) {
+    int mid = low + (high - low) / 2;
+
+    switch (strategy) {
+        case PIVOT_MEDIAN3:
+            return medianOfThree(arr, low, mid, high);
+        case PIVOT_NINTHER:
+            if (high - low + 1 >= NINTHER_THRESHOLD) {
+                int step = (high - low + 1) / 8;
+                int m1 = medianOfThree(arr, low, low + step, low + 2 * step);
+                int m2 = medianOfThree(arr, mid - step, mid, mid + step);
+                int m3 = medianOfThree(arr, high - 2 * step, high - step, high);
+                return medianOfThree(arr, m1, m2, m3);
+            }
+            return medianOfThree(arr, low, mid, high);
+        default:
+            return high;
+    }
+}
+
+// Lomuto partition around arr[high]; returns the final pivot position
+static inline int partitionLomuto(int arr[], int low, int high) {
+    int pivot = arr[high];
+    int i = low - 1;
+
+    for (int j = low; j < high; j++) {
+        if (arr[j] < pivot) {
+            i++;
+            sortSwap(&arr[i], &arr[j]);
+        }
+    }
+    sortSwap(&arr[i + 1], &arr[high]);
+    return i + 1;
+}
+
+// Block partition of arr[low..high] around arr[high] (BlockQuicksort)
+// misplaced elements on each side are first recorded as offsets in small
+// buffers without branching, then swapped in batches; returns the pivot position
+static inline int partitionBlock(int arr[], int low, int high) {
+    int pivot = arr[high];
+    int offsets_l[PARTITION_BLOCK_SIZE];
+    int offsets_r[PARTITION_BLOCK_SIZE];
+    int num_l = 0, num_r = 0, start_l = 0, start_r = 0;
+    int l = low, r = high - 1;   // unclassified range
+
+    // everything left of l is <= pivot, everything right of r is >= pivot
+    while (r - l + 1 >= 2 * PARTITION_BLOCK_SIZE) {
+        if (num_l == 0) {
+            start_l = 0;
+            for (int i = 0; i < PARTITION_BLOCK_SIZE; i++) {
+                offsets_l[num_l] = i;
+                num_l += (arr[l + i] >= pivot);
+            }
+        }
+        if (num_r == 0) {
+            start_r = 0;
+            for (int i = 0; i < PARTITION_BLOCK_SIZE; i++) {
+                offsets_r[num_r] = i;
+                num_r += (arr[r - i] <= pivot);
+            }
+        }
+
+        int num = (num_l < num_r) ? num_l : num_r;
+        for (int k = 0; k < num; k++) {
+            sortSwap(&arr[l + offsets_l[start_l + k]], &arr[r - offsets_r[start_r + k]]);
+        }
+        num_l -= num;
+        num_r -= num;
+        start_l += num;
+        start_r += num;
+
+        if (num_l == 0) l += PARTITION_BLOCK_SIZE;
+        if (num_r == 0) r -= PARTITION_BLOCK_SIZE;
+    }
+
+    // Branchless Lomuto scan over the remaining (< 2 blocks) range
+    int i = l;
+    for (int j = l; j <= r; j++) {
+        int value = arr[j];
+        int smaller = (value < pivot);
+        arr[j] = arr[i];
+        arr[i] = value;
+        i += smaller;
+    }
+    sortSwap(&arr[i], &arr[high]);
+    return i;
+}
+
+// Dutch national flag partition
+// afterwards arr[low..lt-1] < pivot, arr[lt..gt] == pivot, arr[gt+1..high] > pivot
+static inline void partitionThreeWay(int arr[], int low, int high, int pivot,
+                                     int* lt_out, int* gt_out) {
+    int lt = low, i = low, gt = high;
+
+    while (i <= gt) {
+        if (arr[i] < pivot) {
+            sortSwap(&arr[lt++], &arr[i++]);
+        } else if (arr[i] > pivot) {
+            sortSwap(&arr[i], &arr[gt--]);
+        } else {
+            i++;
+        }
+    }
+    *lt_out = lt;
+    *gt_out = gt;
+}
+
+// Partition arr[low..high] (low < high) as configured
+// elements in [*lt, *gt] are in their final place; recurse on the two sides
+static inline void partitionRange(int arr[], int low, int high, const SortOptions* opts,
+                                  int* lt, int* gt) {
+    if (opts->scheme == PARTITION_THREE_WAY) {
+        partitionThreeWay(arr, low, high, arr[choosePivot(arr, low, high, opts->pivot)], lt, gt);
+        return;
+    }
+
+    // The two-way schemes partition around arr[last]. A median of three is
+    // taken by ordering the samples in place: the smallest stays at low, the
+    // largest at high, and both are already on their side of the pivot, so
+    // only arr[low+1..high-1] is partitioned (swapping the median into
+    // arr[high] instead would move the maximum into the middle, which keeps
+    // sorted input quadratic)
+    int first = low, last = high, p;
+    if (high - low >= 2 && (opts->pivot == PIVOT_MEDIAN3
+            || (opts->pivot == PIVOT_NINTHER && high - low + 1 < NINTHER_THRESHOLD))) {
+        p = low + (high - low) / 2;
+        sortThree(arr, low, p, high);
+        first = low + 1;
+        last = high - 1;
+    } else {
+        p = choosePivot(arr, low, high, opts->pivot);
+    }
+    sortSwap(&arr[p], &arr[last]);
+    if (opts->scheme == PARTITION_BLOCK) {
+        *lt = *gt = partitionBlock(arr, first, last);
+    } else {
+        *lt = *gt = partitionLomuto(arr, first, last);
+    }
+}
+
+// Insertion sort for small ranges
+static inline void insertionSort(int arr[], int low, int high) {
+    for (int i = low + 1; i <= high; i++) {
+        int key = arr[i];
+        int j = i - 1;
+        while (j >= low && arr[j] > key) {
+            arr[j + 1] = arr[j];
+            j--;
+        }
+        arr[j + 1] = key;
+    }
+}
+
+// Leaf sort cutoff in effect for the given options
+static inline int sortCutoff(const SortOptions* opts) {
+    if (opts->cutoff >= 0) return opts->cutoff;
+    if (opts->leaf == LEAF_NETWORK) return NETWORK_SORT_THRESHOLD;
+    return (opts->scheme == PARTITION_BLOCK) ? INSERTION_SORT_THRESHOLD : 0;
+}
+
+// Finish a range below the cutoff: sorting network (ranges of NETWORK_SORT_SMALL
+// to NETWORK_SORT_MAX keys) or insertion sort
+static inline void leafSort(int arr[], int low, int high, const SortOptions* opts) {
+    int n = high - low + 1;
+    if (opts->leaf == LEAF_NETWORK && n >= NETWORK_SORT_SMALL && n <= NETWORK_SORT_MAX) {
+        networkSort(arr + low, n);
+    } else {
+        insertionSort(arr, low, high);
+    }
+}
+
+// Restore the max-heap property below node i of the heap stored in base[0..n-1]
+static inline void siftDown(int base[], int i, int n) {
+    int value = base[i];
+
+    while (2 * i + 1 < n) {
+        int child = 2 * i + 1;
+        if (child + 1 < n && base[child] < base[child + 1]) child++;
+        if (base[child] <= value) break;
+        base[i] = base[child];
+        i = child;
+    }
+    base[i] = value;
+}
+
+// Heap sort of arr[low..high]: O(n log n) worst case, no recursion
+static inline void heapSort(int arr[], int low, int high) {
+    int* base = arr + low;
+    int n = high - low + 1;
+
+    for (int i = n / 2 - 1; i >= 0; i--) {
+        siftDown(base, i, n);
+    }
+    for (int end = n - 1; end > 0; end--) {
+        sortSwap(&base[0], &base[end]);
+        siftDown(base, 0, end);
+    }
+}
+
+// Recursion depth allowed before the heapsort fallback: 2 * floor(log2(n))
+static inline int depthLimit(int n) {
+    int depth = 0;
+    while (n > 1) {
+        depth++;
+        n >>= 1;
+    }
+    return 2 * depth;
+}
+
+// Quick sort with the configured pivot/partition and optional depth guard
+// recurses into the smaller side and loops on the larger, so the stack stays O(log n)
+static inline void introSortLoop(int arr[], int low, int high, const SortOptions* opts, int depth) {
+    int cutoff = sortCutoff(opts);
+
+    while (low < high) {
+        PROFILE_DEPTH(depth);
+        if (high - low + 1 <= cutoff) {
+            leafSort(arr, low, high, opts);
+            return;
+        }
+        if (opts->depth_guard && depth <= 0) {
+            heapSort(arr, low, high);
+            return;
+        }
+        depth--;
+
+        int lt, gt;
+        partitionRange(arr, low, high, opts, &lt, &gt);
+        PROFILE_COUNT(COUNTER_PARTITIONS, 1);
+
+        if (lt - low < high - gt) {
+            introSortLoop(arr, low, lt - 1, opts, depth);
+            low = gt + 1;
+        } else {
+            introSortLoop(arr, gt + 1, high, opts, depth);
+            high = lt - 1;
+        }
+    }
+}
+
+static inline void introSort(int arr[], int low, int high, const SortOptions* opts) {
+    PROFILE_DEPTH_ROOT(depthLimit(high - low + 1));
+    introSortLoop(arr, low, high, opts, depthLimit(high - low + 1));
+}
+
+// Parse an integer option value of at least min into *out
+// returns 1 on success, -1 if the text is not such a number
+static inline int parseIntValue(const char* text, long min, int* out) {
+    char* end;
+    long value = strtol(text, &end, 10);
+    if (end == text || *end != '\0' || value < min || value > 2147483647L) return -1;
+    *out = (int)value;
+    return 1;
+}
+
+// Parse one command line option into opts
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+static inline int parseSortOption(const char* arg, SortOptions* opts) {
+    if (strncmp(arg, "--pivot=", 8) == 0) {
+        const char* value = arg + 8;
+        if (strcmp(value, "last") == 0) opts->pivot = PIVOT_LAST;
+        else if (strcmp(value, "median3") == 0) opts->pivot = PIVOT_MEDIAN3;
+        else if (strcmp(value, "ninther") == 0) opts->pivot = PIVOT_NINTHER;
+        else return -1;
+        return 1;
+    }
+    if (strncmp(arg, "--partition=", 12) == 0) {
+        const char* value = arg + 12;
+        if (strcmp(value, "lomuto") == 0) opts->scheme = PARTITION_LOMUTO;
+        else if (strcmp(value, "3way") == 0) opts->scheme = PARTITION_THREE_WAY;
+        else if (strcmp(value, "block") == 0) opts->scheme = PARTITION_BLOCK;
+        else return -1;
+        return 1;
+    }
+    if (strcmp(arg, "--introsort") == 0) {
+        opts->depth_guard = 1;
+        return 1;
+    }
+    if (strncmp(arg, "--cutoff=", 9) == 0) {
+        return parseIntValue(arg + 9, 0, &opts->cutoff);
+    }
+    if (strncmp(arg, "--leaf=", 7) == 0) {
+        const char* value = arg + 7;
+        if (strcmp(value, "insertion") == 0) opts->leaf = LEAF_INSERTION;
+        else if (strcmp(value, "network") == 0) opts->leaf = LEAF_NETWORK;
+        else return -1;
+        return 1;
+    }
+    return 0;
+}
+
+// printf format and arguments describing the leaf sort of --leaf=network
+#define LEAF_SORT_FORMAT "Leaf Sort: bitonic network (%s), ranges of up to %d keys\n"
+#define LEAF_SORT_ARGS(opts) NETWORK_ISA_NAMES[networkSortIsa()], sortCutoff(opts)
+
+// Usage lines for the options understood by parseSortOption
+#define SORT_OPTIONS_USAGE \
+    "  --pivot=last|median3|ninther   Pivot selection (default: last)\n" \
+    "  --partition=lomuto|3way|block  Lomuto, three-way or branchless block partition\n" \
+    "                                 (default: lomuto)\n" \
+    "  --introsort                    Fall back to heapsort past 2*log2(n) levels\n" \
+    "  --cutoff=N                     Leaf sort ranges of N elements or fewer\n" \
+    "                                 (default: 64 with network, 32 with block, else 0)\n" \
+    "  --leaf=insertion|network       Leaf sort: insertion sort (default) or a SIMD\n" \
+    "                                 bitonic sorting network (AVX2/SSE4.1/scalar)\n"
+
+#endif // QUICKSORT_PARTITION_H
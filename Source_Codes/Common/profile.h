@@ -0,0 +1,317 @@
+// Optional per-phase timers and hot-path counters for the CPU Quick Sorts
+// built with -DQUICKSORT_PROFILE (make PROFILE=1); otherwise every PROFILE_*
+// macro expands to nothing and the sorts are compiled exactly as before.
+// Every OpenMP thread accumulates into its own cache-line padded slot, so the
+// hot paths never share a counter. -DQUICKSORT_PERF (make PERF=1, Linux) adds
+// cycle, instruction and cache-miss counts of the sort region via perf_event_open.
+#ifndef QUICKSORT_PROFILE_H
+#define QUICKSORT_PROFILE_H
+
+// Timed phases (generate and verify are always in the run record, see report.h)
+typedef enum {
+    PHASE_DISTRIBUTE = 0,   // scatter / send the input to the ranks
+    PHASE_PARTITION = 1,    // partition passes, splitter selection, bucket classification
+    PHASE_LOCAL_SORT = 2,   // serial sorts of leaf ranges, buckets or rank blocks
+    PHASE_EXCHANGE = 3,     // all-to-all bucket exchange (PSRS)
+    PHASE_GATHER = 4,       // collect sorted blocks or slices on rank 0
+    PHASE_MERGE = 5,        // k-way merges
+    PHASE_BARRIER = 6,      // waiting for the other ranks at the closing barrier
+    PHASE_COUNT = 7
+} ProfilePhase;
+
+// Names of the phases for reports, indexed by ProfilePhase
+static const char* const PHASE_NAMES[] = {
+    "distribute", "partition", "local_sort", "exchange", "gather", "merge", "barrier"
+};
+
+// Counters (max_depth is a maximum, the others are totals)
+typedef enum {
+    COUNTER_PARTITIONS = 0,     // ranges partitioned
+    COUNTER_TASKS = 1,          // OpenMP tasks spawned
+    COUNTER_MAX_DEPTH = 2,      // deepest partition level below the root of a sort
+    COUNTER_BYTES_SENT = 3,     // key bytes sent to other ranks
+    COUNTER_CYCLES = 4,         // perf_event: CPU cycles of the sort region
+    COUNTER_INSTRUCTIONS = 5,   // perf_event: instructions retired
+    COUNTER_CACHE_MISSES = 6,   // perf_event: last-level cache misses
+    COUNTER_COUNT = 7
+} ProfileCounter;
+
+// Names of the counters for reports, indexed by ProfileCounter
+static const char* const COUNTER_NAMES[] = {
+    "partitions", "tasks", "max_depth", "bytes_sent", "cycles", "instructions", "cache_misses"
+};
+
+#ifdef QUICKSORT_PROFILE
+
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#include "report.h"
+
+// Threads with a slot of their own (higher thread numbers share the last slot)
+#define PROFILE_MAX_THREADS 256
+
+// Times and counts of one thread
+typedef struct {
+    double seconds[PHASE_COUNT];
+    long long counters[COUNTER_COUNT];
+    int depth_root;   // depth budget at the root of the sort this thread is in
+    char pad[64];     // keep the hot fields of neighbouring slots on separate cache lines
+} ProfileSlot;
+
+static ProfileSlot profile_slots[PROFILE_MAX_THREADS];
+
+// Wall-clock time in seconds
+static inline double profileNow(void) {
+#ifdef _OPENMP
+    return omp_get_wtime();
+#elif defined(CLOCK_MONOTONIC)
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return now.tv_sec + now.tv_nsec * 1e-9;
+#else
+    return (double)clock() / CLOCKS_PER_SEC;
+#endif
+}
+
+// Slot of the calling thread
+static inline ProfileSlot* profileSlot(void) {
+#ifdef _OPENMP
+    int tid = omp_get_thread_num();
+    return &profile_slots[tid < PROFILE_MAX_THREADS ? tid : PROFILE_MAX_THREADS - 1];
+#else
+    return &profile_slots[0];
+#endif
+}
+
+static inline void profileAddTime(int phase, double seconds) {
+    profileSlot()->seconds[phase] += seconds;
+}
+
+static inline void profileAdd(int counter, long long n) {
+    profileSlot()->counters[counter] += n;
+}
+
+// Start of a sort whose depth budget is limit (see depthLimit in partition.h)
+static inline void profileDepthRoot(int limit) {
+    profileSlot()->depth_root = limit;
+}
+
+// A range is being sorted with depth budget depth left
+static inline void profileDepth(int depth) {
+    ProfileSlot* slot = profileSlot();
+    long long level = slot->depth_root - depth;
+    if (level > slot->counters[COUNTER_MAX_DEPTH]) {
+        slot->counters[COUNTER_MAX_DEPTH] = level;
+    }
+}
+
+// Clear all slots (call right before the measured region)
+static inline void profileReset(void) {
+    memset(profile_slots, 0, sizeof(profile_slots));
+}
+
+// Copy the slots that were used into seconds[rows * PHASE_COUNT] and
+// counters[rows * COUNTER_COUNT]; returns rows (at most max_rows, at least 1)
+static inline int profileCollect(double seconds[], long long counters[], int max_rows) {
+    int rows = 1;
+    for (int t = 0; t < PROFILE_MAX_THREADS && t < max_rows; t++) {
+        for (int p = 0; p < PHASE_COUNT; p++) {
+            if (profile_slots[t].seconds[p] != 0.0) rows = t + 1;
+        }
+        for (int c = 0; c < COUNTER_COUNT; c++) {
+            if (profile_slots[t].counters[c] != 0) rows = t + 1;
+        }
+    }
+    for (int t = 0; t < rows; t++) {
+        memcpy(seconds + t * PHASE_COUNT, profile_slots[t].seconds, sizeof(profile_slots[t].seconds));
+        memcpy(counters + t * COUNTER_COUNT, profile_slots[t].counters, sizeof(profile_slots[t].counters));
+    }
+    return rows;
+}
+
+// Combine rows: the slowest row per phase, counters summed (max_depth: the deepest)
+static inline void profileTotals(const double seconds[], const long long counters[], int rows,
+                                 double total_seconds[], long long total_counters[]) {
+    for (int p = 0; p < PHASE_COUNT; p++) {
+        total_seconds[p] = 0.0;
+        for (int r = 0; r < rows; r++) {
+            double value = seconds[r * PHASE_COUNT + p];
+            if (value > total_seconds[p]) total_seconds[p] = value;
+        }
+    }
+    for (int c = 0; c < COUNTER_COUNT; c++) {
+        total_counters[c] = 0;
+        for (int r = 0; r < rows; r++) {
+            long long value = counters[r * COUNTER_COUNT + c];
+            if (c == COUNTER_MAX_DEPTH) {
+                if (value > total_counters[c]) total_counters[c] = value;
+            } else {
+                total_counters[c] += value;
+            }
+        }
+    }
+}
+
+#if defined(QUICKSORT_PERF) && defined(__linux__)
+#include <unistd.h>
+#include <sys/ioctl.h>
+#include <sys/syscall.h>
+#include <linux/perf_event.h>
+
+// Hardware events counted for the sort region, and their counters
+static const unsigned long long PERF_EVENTS[] = {
+    PERF_COUNT_HW_CPU_CYCLES, PERF_COUNT_HW_INSTRUCTIONS, PERF_COUNT_HW_CACHE_MISSES
+};
+static const int PERF_COUNTERS[] = { COUNTER_CYCLES, COUNTER_INSTRUCTIONS, COUNTER_CACHE_MISSES };
+#define PERF_NUM_EVENTS 3
+
+static int perf_fds[PERF_NUM_EVENTS] = { -1, -1, -1 };
+
+// Open and start the user-space hardware counters of this process
+// (inherited by threads created afterwards, e.g. the OpenMP team)
+static inline void profilePerfStart(void) {
+    for (int i = 0; i < PERF_NUM_EVENTS; i++) {
+        struct perf_event_attr attr;
+        memset(&attr, 0, sizeof(attr));
+        attr.size = sizeof(attr);
+        attr.type = PERF_TYPE_HARDWARE;
+        attr.config = PERF_EVENTS[i];
+        attr.disabled = 1;
+        attr.inherit = 1;
+        attr.exclude_kernel = 1;
+        attr.exclude_hv = 1;
+        perf_fds[i] = (int)syscall(SYS_perf_event_open, &attr, 0, -1, -1, 0);
+    }
+    for (int i = 0; i < PERF_NUM_EVENTS; i++) {
+        if (perf_fds[i] >= 0) {
+            ioctl(perf_fds[i], PERF_EVENT_IOC_RESET, 0);
+            ioctl(perf_fds[i], PERF_EVENT_IOC_ENABLE, 0);
+        }
+    }
+}
+
+// Stop the counters and add their values to the slot of thread 0
+static inline void profilePerfStop(void) {
+    for (int i = 0; i < PERF_NUM_EVENTS; i++) {
+        if (perf_fds[i] < 0) continue;
+        long long value = 0;
+        ioctl(perf_fds[i], PERF_EVENT_IOC_DISABLE, 0);
+        if (read(perf_fds[i], &value, sizeof(value)) == (ssize_t)sizeof(value)) {
+            profile_slots[0].counters[PERF_COUNTERS[i]] += value;
+        }
+        close(perf_fds[i]);
+        perf_fds[i] = -1;
+    }
+}
+
+#define PROFILE_PERF_START() profilePerfStart()
+#define PROFILE_PERF_STOP() profilePerfStop()
+#else
+#define PROFILE_PERF_START() ((void)0)
+#define PROFILE_PERF_STOP() ((void)0)
+#endif
+
+// Print one row per thread or rank (label "Thread" or "Rank"), the phases and
+// counters that were used, and the combined totals
+static inline void profilePrint(const char* label, const double seconds[],
+                                const long long counters[], int rows) {
+    double total_seconds[PHASE_COUNT];
+    long long total_counters[COUNTER_COUNT];
+    int used[PHASE_COUNT];
+    int any = 0;
+    profileTotals(seconds, counters, rows, total_seconds, total_counters);
+
+    for (int p = 0; p < PHASE_COUNT; p++) {
+        used[p] = (total_seconds[p] > 0.0);
+        any |= used[p];
+    }
+    if (any) {
+        printf("\nPhase Breakdown (seconds per %s)\n", label);
+        printf("%-8s", label);
+        for (int p = 0; p < PHASE_COUNT; p++) {
+            if (used[p]) printf(" %11s", PHASE_NAMES[p]);
+        }
+        printf(" %11s %11s %9s\n", "partitions", "tasks", "max_depth");
+        for (int r = 0; r < rows; r++) {
+            printf("%-8d", r);
+            for (int p = 0; p < PHASE_COUNT; p++) {
+                if (used[p]) printf(" %11.6f", seconds[r * PHASE_COUNT + p]);
+            }
+            const long long* row = counters + r * COUNTER_COUNT;
+            printf(" %11lld %11lld %9lld\n", row[COUNTER_PARTITIONS], row[COUNTER_TASKS],
+                   row[COUNTER_MAX_DEPTH]);
+        }
+        printf("%-8s", "Slowest");
+        for (int p = 0; p < PHASE_COUNT; p++) {
+            if (used[p]) printf(" %11.6f", total_seconds[p]);
+        }
+        printf("\n");
+    }
+    printf("%sPartitions: %lld  Tasks: %lld  Max Depth: %lld  Bytes Sent: %lld\n",
+           any ? "" : "\n", total_counters[COUNTER_PARTITIONS], total_counters[COUNTER_TASKS],
+           total_counters[COUNTER_MAX_DEPTH], total_counters[COUNTER_BYTES_SENT]);
+#ifdef QUICKSORT_PERF
+    if (total_counters[COUNTER_CYCLES] > 0) {
+        printf("Cycles: %lld  Instructions: %lld (IPC %.2f)  Cache Misses: %lld\n",
+               total_counters[COUNTER_CYCLES], total_counters[COUNTER_INSTRUCTIONS],
+               (double)total_counters[COUNTER_INSTRUCTIONS] / total_counters[COUNTER_CYCLES],
+               total_counters[COUNTER_CACHE_MISSES]);
+    } else {
+        printf("Hardware counters unavailable (perf_event_open failed; see "
+               "/proc/sys/kernel/perf_event_paranoid)\n");
+    }
+#endif
+}
+
+// Add the phases used (slowest row) and all counters to a run record
+static inline void profileRecord(RunRecord* record, const double seconds[],
+                                 const long long counters[], int rows) {
+    double total_seconds[PHASE_COUNT];
+    long long total_counters[COUNTER_COUNT];
+    profileTotals(seconds, counters, rows, total_seconds, total_counters);
+    for (int p = 0; p < PHASE_COUNT; p++) {
+        if (total_seconds[p] > 0.0) reportPhase(record, PHASE_NAMES[p], total_seconds[p]);
+    }
+    for (int c = 0; c < COUNTER_COUNT; c++) {
+        if (c < COUNTER_CYCLES || total_counters[c] > 0) {
+            reportCounter(record, COUNTER_NAMES[c], total_counters[c]);
+        }
+    }
+}
+
+// Print this process's per-thread breakdown and add it to record
+static inline void profileReport(RunRecord* record) {
+    static double seconds[PROFILE_MAX_THREADS * PHASE_COUNT];
+    static long long counters[PROFILE_MAX_THREADS * COUNTER_COUNT];
+    int rows = profileCollect(seconds, counters, PROFILE_MAX_THREADS);
+    profilePrint("Thread", seconds, counters, rows);
+    profileRecord(record, seconds, counters, rows);
+}
+
+#define PROFILE_START(t) double t = profileNow()
+#define PROFILE_STOP(t, phase) profileAddTime(phase, profileNow() - (t))
+#define PROFILE_COUNT(counter, n) profileAdd(counter, n)
+#define PROFILE_DEPTH_ROOT(limit) profileDepthRoot(limit)
+#define PROFILE_DEPTH(depth) profileDepth(depth)
+#define PROFILE_RESET() profileReset()
+#define PROFILE_REPORT(record) profileReport(record)
+
+#else
+
+#define PROFILE_START(t) ((void)0)
+#define PROFILE_STOP(t, phase) ((void)0)
+#define PROFILE_COUNT(counter, n) ((void)0)
+#define PROFILE_DEPTH_ROOT(limit) ((void)0)
+#define PROFILE_DEPTH(depth) ((void)0)
+#define PROFILE_RESET() ((void)0)
+#define PROFILE_REPORT(record) ((void)0)
+#define PROFILE_PERF_START() ((void)0)
+#define PROFILE_PERF_STOP() ((void)0)
+
+#endif // QUICKSORT_PROFILE
+
+#endif // QUICKSORT_PROFILE_H
@@ -0,0 +1,342 @@
+// Radix sort backend for int keys (Serial, OpenMP and MPI include this header)
+// keys are sorted as unsigned offsets from the observed minimum, so the digit
+// width and the number of passes follow the actual key range; in OpenMP builds
+// every pass uses per-thread histograms and a prefix-sum scatter
+#ifndef QUICKSORT_RADIX_SORT_H
+#define QUICKSORT_RADIX_SORT_H
+
+#include <stdlib.h>
+#include <string.h>
+#include "partition.h"
+#ifdef _OPENMP
+#include <omp.h>
+#define RADIX_THREAD_NUM() omp_get_thread_num()
+#define RADIX_NUM_THREADS() omp_get_num_threads()
+#define RADIX_MAX_THREADS() omp_get_max_threads()
+#else
+#define RADIX_THREAD_NUM() 0
+#define RADIX_NUM_THREADS() 1
+#define RADIX_MAX_THREADS() 1
+#endif
+
+// Widest digit: 2^11 buckets per thread keep the histograms in L1/L2 cache
+#define RADIX_MAX_DIGIT_BITS 11
+
+// Ranges this small are finished with introsort instead of another pass
+#define RADIX_SMALL 512
+
+// Use MSD instead of LSD when one top-level bucket holds more than this
+// percentage of a sample (skewed keys: the big bucket gets its own, narrower range)
+#define RADIX_SKEW_PERCENT 50
+
+// Keys sampled for the skew check
+#define RADIX_SKEW_SAMPLE 4096
+
+// How the last top-level radix sort ran (for reporting)
+typedef struct {
+    int key_bits;     // bits spanned by max - min
+    int digit_bits;   // bits per pass
+    int passes;       // LSD passes (MSD: passes of the top level)
+    int msd;          // non-zero: MSD with per-bucket recursion
+} RadixPlan;
+
+RadixPlan radix_plan = { 0, 0, 0, 0 };
+
+// Partition settings for the ranges left to introsort
+static const SortOptions RADIX_LEAF_OPTIONS = { PIVOT_NINTHER, PARTITION_THREE_WAY, 1, INSERTION_SORT_THRESHOLD, LEAF_INSERTION };
+
+// Digit of x at shift: bits of the offset x - min
+static inline unsigned radixDigit(int x, unsigned min, int shift, unsigned mask) {
+    return (((unsigned)x - min) >> shift) & mask;
+}
+
+// One stable counting pass from src into dst on digit (shift, digit_bits)
+// each thread counts its chunk, an exclusive prefix sum over (digit, thread)
+// gives every thread its write positions, and all threads scatter at once;
+// starts[d] receives where bucket d begins in dst (starts[buckets] = n) if not NULL
+// returns 0, or -1 (src and dst untouched) if the counters cannot be allocated
+static inline int radixPass(const int src[], int dst[], int n, unsigned min, int shift,
+                            int digit_bits, int threads, int starts[]) {
+    int buckets = 1 << digit_bits;
+    unsigned mask = (unsigned)buckets - 1;
+    int* counts = (int*)malloc((size_t)threads * buckets * sizeof(int));
+    if (counts == NULL) return -1;
+
+#ifdef _OPENMP
+    #pragma omp parallel num_threads(threads) if(threads > 1)
+#endif
+    {
+        int t = RADIX_THREAD_NUM();
+        int team = RADIX_NUM_THREADS();
+        int begin = (int)((long long)n * t / team);
+        int end = (int)((long long)n * (t + 1) / team);
+        int* local = counts + (size_t)t * buckets;
+
+        memset(local, 0, buckets * sizeof(int));
+        for (int i = begin; i < end; i++) {
+            local[radixDigit(src[i], min, shift, mask)]++;
+        }
+#ifdef _OPENMP
+        #pragma omp barrier
+        #pragma omp single
+#endif
+        {
+            int offset = 0;
+            for (int d = 0; d < buckets; d++) {
+                if (starts != NULL) starts[d] = offset;
+                for (int u = 0; u < team; u++) {
+                    int count = counts[(size_t)u * buckets + d];
+                    counts[(size_t)u * buckets + d] = offset;
+                    offset += count;
+                }
+            }
+            if (starts != NULL) starts[buckets] = offset;
+        }
+        for (int i = begin; i < end; i++) {
+            dst[local[radixDigit(src[i], min, shift, mask)]++] = src[i];
+        }
+    }
+    free(counts);
+    return 0;
+}
+
+// Copy n ints from src to dst with the whole team
+static inline void radixCopy(int dst[], const int src[], int n, int threads) {
+#ifdef _OPENMP
+    #pragma omp parallel num_threads(threads) if(threads > 1)
+#else
+    (void)threads;
+#endif
+    {
+        int t = RADIX_THREAD_NUM();
+        int team = RADIX_NUM_THREADS();
+        int begin = (int)((long long)n * t / team);
+        int end = (int)((long long)n * (t + 1) / team);
+        memcpy(dst + begin, src + begin, (size_t)(end - begin) * sizeof(int));
+    }
+}
+
+// Number of bits needed for range (0 for range 0)
+static inline int radixBits(unsigned range) {
+    int bits = 0;
+    while (range > 0) {
+        bits++;
+        range >>= 1;
+    }
+    return bits;
+}
+
+// Radix sort of arr[0..n-1] using tmp[0..n-1] as scratch with up to threads threads
+// record != 0 stores the chosen plan in radix_plan
+// returns 0, or -1 if a counter table cannot be allocated; arr then still
+// holds its keys (in some order), so the caller can sort it another way
+static int radixSortRange(int arr[], int tmp[], int n, int threads, int record) {
+    if (n <= RADIX_SMALL) {
+        if (n > 1) introSort(arr, 0, n - 1, &RADIX_LEAF_OPTIONS);
+        return 0;
+    }
+
+    // Observed key range decides the digit width and the number of passes
+    int min_key = arr[0], max_key = arr[0];
+#ifdef _OPENMP
+    #pragma omp parallel for num_threads(threads) if(threads > 1) \
+        reduction(min:min_key) reduction(max:max_key)
+#endif
+    for (int i = 0; i < n; i++) {
+        if (arr[i] < min_key) min_key = arr[i];
+        if (arr[i] > max_key) max_key = arr[i];
+    }
+    unsigned min = (unsigned)min_key;
+    int bits = radixBits((unsigned)max_key - min);
+    if (bits == 0) return 0;
+
+    int passes = (bits + RADIX_MAX_DIGIT_BITS - 1) / RADIX_MAX_DIGIT_BITS;
+    int digit_bits = (bits + passes - 1) / passes;
+
+    // Skew check on a sample of the top digit: if one bucket dominates, sort
+    // MSD so that bucket is re-ranged (and usually needs fewer passes)
+    int msd = 0;
+    if (passes > 1) {
+        int top_shift = (passes - 1) * digit_bits;
+        int top_buckets = 1 << (bits - top_shift);
+        int* sample_counts = (int*)calloc(top_buckets, sizeof(int));
+        if (sample_counts == NULL) return -1;
+        int samples = (n < RADIX_SKEW_SAMPLE) ? n : RADIX_SKEW_SAMPLE;
+        int largest = 0;
+        for (int s = 0; s < samples; s++) {
+            int d = radixDigit(arr[(int)((long long)s * n / samples)], min, top_shift,
+                               (unsigned)top_buckets - 1);
+            if (++sample_counts[d] > largest) largest = sample_counts[d];
+        }
+        free(sample_counts);
+        msd = (largest * 100 > samples * RADIX_SKEW_PERCENT);
+    }
+
+    if (record) {
+        radix_plan.key_bits = bits;
+        radix_plan.digit_bits = digit_bits;
+        radix_plan.passes = passes;
+        radix_plan.msd = msd;
+    }
+
+    if (!msd) {
+        // LSD: stable passes from the lowest digit up, ping-ponging between buffers
+        int* src = arr;
+        int* dst = tmp;
+        int status = 0;
+        for (int p = 0; p < passes && status == 0; p++) {
+            status = radixPass(src, dst, n, min, p * digit_bits, digit_bits, threads, NULL);
+            if (status == 0) {
+                int* swap = src;
+                src = dst;
+                dst = swap;
+            }
+        }
+        if (src != arr) {
+            radixCopy(arr, src, n, threads);
+        }
+        return status;
+    }
+
+    // MSD: one pass on the top digit, then every bucket is radix sorted on its own
+    int top_shift = (passes - 1) * digit_bits;
+    int top_bits = bits - top_shift;
+    int buckets = 1 << top_bits;
+    int* starts = (int*)malloc((buckets + 1) * sizeof(int));
+    if (starts == NULL || radixPass(arr, tmp, n, min, top_shift, top_bits, threads, starts) != 0) {
+        free(starts);
+        return -1;
+    }
+    radixCopy(arr, tmp, n, threads);
+
+    // Large buckets get the whole team one after another, small ones one thread each
+    // (a failed bucket leaves its keys in place, so the others still run)
+    int large = (threads > 1) ? n / threads : n;
+    int failed = 0;
+    for (int d = 0; d < buckets; d++) {
+        int size = starts[d + 1] - starts[d];
+        if (size > large || threads == 1) {
+            failed |= radixSortRange(arr + starts[d], tmp + starts[d], size, threads, 0) != 0;
+        }
+    }
+    if (threads > 1) {
+#ifdef _OPENMP
+        #pragma omp parallel for num_threads(threads) schedule(dynamic, 1) reduction(|:failed)
+#endif
+        for (int d = 0; d < buckets; d++) {
+            int size = starts[d + 1] - starts[d];
+            if (size <= large) {
+                failed |= radixSortRange(arr + starts[d], tmp + starts[d], size, 1, 0) != 0;
+            }
+        }
+    }
+    free(starts);
+    return failed ? -1 : 0;
+}
+
+// Radix sort of arr[0..n-1] with num_threads threads (<= 0: OpenMP default)
+// returns 0, or -1 if the scratch buffer (one int per element) or a counter
+// table cannot be allocated; arr then holds its keys, unsorted, for a fallback
+static inline int radixSort(int arr[], int n, int num_threads) {
+    int threads = (num_threads > 0) ? num_threads : RADIX_MAX_THREADS();
+    int* tmp;
+
+    radix_plan.key_bits = radix_plan.digit_bits = radix_plan.passes = radix_plan.msd = 0;
+    if (n <= 1) return 0;
+    tmp = (int*)malloc((size_t)n * sizeof(int));
+    if (tmp == NULL) return -1;
+    int status = radixSortRange(arr, tmp, n, threads, 1);
+    free(tmp);
+    if (status != 0) {
+        radix_plan.key_bits = radix_plan.digit_bits = radix_plan.passes = radix_plan.msd = 0;
+    }
+    return status;
+}
+
+// Counting sort of arr[0..n-1] with num_threads threads (<= 0: OpenMP default)
+// for keys spanning at most max_range + 1 values: per-thread histograms are summed,
+// then every thread rewrites an equal share of the output positions
+// returns 0, or -1 if the key range is wider than max_range or allocation fails
+static inline int countingSort(int arr[], int n, unsigned max_range, int num_threads) {
+    int threads = (num_threads > 0) ? num_threads : RADIX_MAX_THREADS();
+    if (n <= 1) return 0;
+
+    int min_key = arr[0], max_key = arr[0];
+#ifdef _OPENMP
+    #pragma omp parallel for num_threads(threads) if(threads > 1) \
+        reduction(min:min_key) reduction(max:max_key)
+#endif
+    for (int i = 0; i < n; i++) {
+        if (arr[i] < min_key) min_key = arr[i];
+        if (arr[i] > max_key) max_key = arr[i];
+    }
+    unsigned min = (unsigned)min_key;
+    unsigned range = (unsigned)max_key - min;
+    if (range > max_range) return -1;
+
+    int values = (int)range + 1;
+    int* counts = (int*)calloc((size_t)threads * values, sizeof(int));
+    int* starts = (int*)malloc(((size_t)values + 1) * sizeof(int));
+    if (counts == NULL || starts == NULL) {
+        free(counts);
+        free(starts);
+        return -1;
+    }
+
+#ifdef _OPENMP
+    #pragma omp parallel num_threads(threads) if(threads > 1)
+#endif
+    {
+        int t = RADIX_THREAD_NUM();
+        int team = RADIX_NUM_THREADS();
+        int begin = (int)((long long)n * t / team);
+        int end = (int)((long long)n * (t + 1) / team);
+        int* local = counts + (size_t)t * values;
+
+        for (int i = begin; i < end; i++) {
+            local[(unsigned)arr[i] - min]++;
+        }
+#ifdef _OPENMP
+        #pragma omp barrier
+        #pragma omp single
+#endif
+        {
+            int offset = 0;
+            for (int v = 0; v < values; v++) {
+                starts[v] = offset;
+                for (int u = 0; u < team; u++) {
+                    offset += counts[(size_t)u * values + v];
+                }
+            }
+            starts[values] = offset;
+        }
+
+        // First value whose block reaches into [begin, end), then fill forwards
+        int lo = 0, hi = values - 1;
+        while (lo < hi) {
+            int mid = lo + (hi - lo + 1) / 2;
+            if (starts[mid] <= begin) lo = mid;
+            else hi = mid - 1;
+        }
+        for (int v = lo, i = begin; i < end; v++) {
+            int stop = (starts[v + 1] < end) ? starts[v + 1] : end;
+            int key = (int)(min + (unsigned)v);
+            while (i < stop) arr[i++] = key;
+        }
+    }
+
+    free(counts);
+    free(starts);
+    return 0;
+}
+
+// Usage line for the --radix flag of the Serial and MPI versions
+#define RADIX_OPTION_USAGE \
+    "  --radix                        Radix sort instead of quick sort\n"
+
+// printf format and arguments describing the last radix sort plan
+#define RADIX_PLAN_FORMAT "Radix Plan: %d-bit key range, %d pass%s of %d bits (%s)\n"
+#define RADIX_PLAN_ARGS radix_plan.key_bits, radix_plan.passes, \
+    radix_plan.passes == 1 ? "" : "es", radix_plan.digit_bits, radix_plan.msd ? "MSD" : "LSD"
+
+#endif // QUICKSORT_RADIX_SORT_H
@@ -0,0 +1,257 @@
+// Structured run records for the Serial, OpenMP and MPI drivers
+// --json writes one JSON object per line, --csv one row under a fixed header
+// (REPORT_CSV_HEADER); with =FILE the record is appended to FILE, otherwise it
+// goes to stdout and the usual human-readable text is moved to stderr
+#ifndef QUICKSORT_REPORT_H
+#define QUICKSORT_REPORT_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#ifdef _WIN32
+#include <io.h>
+#define REPORT_DUP _dup
+#define REPORT_DUP2 _dup2
+#define REPORT_FILENO _fileno
+#else
+#include <unistd.h>
+#define REPORT_DUP dup
+#define REPORT_DUP2 dup2
+#define REPORT_FILENO fileno
+#endif
+
+// Phases and counters a record can hold
+#define REPORT_MAX_PHASES 16
+#define REPORT_MAX_COUNTERS 16
+
+// Columns of --csv; phases are packed into one "name=seconds;..." column so
+// the header stays the same for every implementation
+#define REPORT_CSV_HEADER "implementation,algorithm,distribution,size,workers,threads,seed,time_s," \
+    "throughput_meps,verified,phases,host,cores,compiler,timestamp"
+
+// Compiler that built the program
+#if defined(__GNUC__) && !defined(__clang__)
+#define REPORT_COMPILER "gcc " __VERSION__
+#elif defined(__VERSION__)
+#define REPORT_COMPILER __VERSION__
+#else
+#define REPORT_COMPILER "unknown"
+#endif
+
+// Output formats selectable with --json / --csv
+typedef enum {
+    OUTPUT_TEXT = 0,   // human-readable text only (default)
+    OUTPUT_JSON = 1,   // one JSON object per run (JSON Lines)
+    OUTPUT_CSV = 2     // one CSV row per run
+} OutputFormat;
+
+// One run of a sorter
+typedef struct {
+    const char* implementation;   // "serial", "openmp", "mpi", ...
+    const char* algorithm;        // e.g. "quick sort", "radix sort"
+    const char* distribution;     // input shape (Common/generate.h)
+    long long size;               // elements sorted
+    int workers;                  // threads (OpenMP) or processes (MPI), 1 for serial
+    int threads;                  // threads per worker
+    unsigned seed;                // random seed of the input
+    double time_s;                // timed region ("Execution Time")
+    int verified;                 // 1 if the output was checked and is sorted
+    int num_phases;
+    const char* phase_names[REPORT_MAX_PHASES];
+    double phase_seconds[REPORT_MAX_PHASES];
+    int num_counters;             // profiling builds only (Common/profile.h), JSON only
+    const char* counter_names[REPORT_MAX_COUNTERS];
+    long long counter_values[REPORT_MAX_COUNTERS];
+} RunRecord;
+
+static int output_format = OUTPUT_TEXT;
+static const char* output_path = NULL;  // append records here instead of writing to stdout
+
+// Where records go when output_path is NULL (the original stdout, see reportBegin)
+static FILE* record_stream = NULL;
+
+// Parse --json[=FILE] or --csv[=FILE]
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+static inline int parseOutputOption(const char* arg) {
+    const char* value = NULL;
+    if (strncmp(arg, "--json", 6) == 0 && (arg[6] == '\0' || arg[6] == '=')) {
+        output_format = OUTPUT_JSON;
+        value = arg + 6;
+    } else if (strncmp(arg, "--csv", 5) == 0 && (arg[5] == '\0' || arg[5] == '=')) {
+        output_format = OUTPUT_CSV;
+        value = arg + 5;
+    } else {
+        return 0;
+    }
+    if (*value == '=') {
+        if (value[1] == '\0') return -1;
+        output_path = value + 1;
+    }
+    return 1;
+}
+
+// Call once after option parsing: when records go to stdout, keep stdout for
+// them alone and send everything else printed to stdout to stderr
+static inline void reportBegin(void) {
+    if (output_format == OUTPUT_TEXT || output_path != NULL) return;
+    fflush(stdout);
+    int fd = REPORT_DUP(REPORT_FILENO(stdout));
+    record_stream = (fd >= 0) ? fdopen(fd, "w") : NULL;
+    if (record_stream != NULL) {
+        REPORT_DUP2(REPORT_FILENO(stderr), REPORT_FILENO(stdout));
+    }
+}
+
+// Add a named phase to a record (ignored once REPORT_MAX_PHASES are stored)
+static inline void reportPhase(RunRecord* record, const char* name, double seconds) {
+    if (record->num_phases < REPORT_MAX_PHASES) {
+        record->phase_names[record->num_phases] = name;
+        record->phase_seconds[record->num_phases] = seconds;
+        record->num_phases++;
+    }
+}
+
+// Add a named counter to a record (ignored once REPORT_MAX_COUNTERS are stored)
+static inline void reportCounter(RunRecord* record, const char* name, long long value) {
+    if (record->num_counters < REPORT_MAX_COUNTERS) {
+        record->counter_names[record->num_counters] = name;
+        record->counter_values[record->num_counters] = value;
+        record->num_counters++;
+    }
+}
+
+// Write s as a JSON string literal
+static inline void reportJsonString(FILE* out, const char* s) {
+    fputc('"', out);
+    for (; *s != '\0'; s++) {
+        if (*s == '"' || *s == '\\') fputc('\\', out);
+        if ((unsigned char)*s >= 0x20) fputc(*s, out);
+    }
+    fputc('"', out);
+}
+
+// Write s as a CSV field (quoted if it contains a comma or a quote)
+static inline void reportCsvString(FILE* out, const char* s) {
+    if (strpbrk(s, ",\"\n") == NULL) {
+        fputs(s, out);
+        return;
+    }
+    fputc('"', out);
+    for (; *s != '\0'; s++) {
+        if (*s == '"') fputc('"', out);
+        fputc(*s, out);
+    }
+    fputc('"', out);
+}
+
+// Host name and number of online processors
+static inline void reportHost(char* host, size_t size, int* cores) {
+    host[0] = '\0';
+#ifdef _WIN32
+    const char* name = getenv("COMPUTERNAME");
+    const char* count = getenv("NUMBER_OF_PROCESSORS");
+    snprintf(host, size, "%s", name != NULL ? name : "");
+    *cores = (count != NULL) ? atoi(count) : 1;
+#else
+    if (gethostname(host, size) != 0) host[0] = '\0';
+    host[size - 1] = '\0';
+    *cores = (int)sysconf(_SC_NPROCESSORS_ONLN);
+#endif
+}
+
+// Write a record in the selected format; returns 0, or -1 if it cannot be written
+static inline int reportWrite(const RunRecord* record) {
+    if (output_format == OUTPUT_TEXT) return 0;
+
+    FILE* out = (record_stream != NULL) ? record_stream : stdout;
+    int header = (output_format == OUTPUT_CSV);
+    if (output_path != NULL) {
+        out = fopen(output_path, "a");
+        if (out == NULL) {
+            fprintf(stderr, "Error: cannot append to %s\n", output_path);
+            return -1;
+        }
+        fseek(out, 0, SEEK_END);
+        header = header && ftell(out) == 0;
+    }
+
+    char host[256];
+    int cores;
+    char timestamp[32];
+    time_t now = time(NULL);
+    reportHost(host, sizeof(host), &cores);
+    strftime(timestamp, sizeof(timestamp), "%Y-%m-%dT%H:%M:%SZ", gmtime(&now));
+    const char* compiler = REPORT_COMPILER;
+    double throughput = (record->time_s > 0) ? record->size / record->time_s / 1e6 : 0.0;
+
+    if (output_format == OUTPUT_JSON) {
+        fprintf(out, "{\"implementation\": ");
+        reportJsonString(out, record->implementation);
+        fprintf(out, ", \"algorithm\": ");
+        reportJsonString(out, record->algorithm);
+        fprintf(out, ", \"distribution\": ");
+        reportJsonString(out, record->distribution);
+        fprintf(out, ", \"size\": %lld, \"workers\": %d, \"threads\": %d, \"seed\": %u, "
+                "\"time_s\": %.6f, \"throughput_meps\": %.4f, \"verified\": %s, \"phases\": {",
+                record->size, record->workers, record->threads, record->seed,
+                record->time_s, throughput, record->verified ? "true" : "false");
+        for (int i = 0; i < record->num_phases; i++) {
+            fprintf(out, "%s", i > 0 ? ", " : "");
+            reportJsonString(out, record->phase_names[i]);
+            fprintf(out, ": %.6f", record->phase_seconds[i]);
+        }
+        fprintf(out, "}");
+        if (record->num_counters > 0) {
+            fprintf(out, ", \"counters\": {");
+            for (int i = 0; i < record->num_counters; i++) {
+                fprintf(out, "%s", i > 0 ? ", " : "");
+                reportJsonString(out, record->counter_names[i]);
+                fprintf(out, ": %lld", record->counter_values[i]);
+            }
+            fprintf(out, "}");
+        }
+        fprintf(out, ", \"host\": ");
+        reportJsonString(out, host);
+        fprintf(out, ", \"cores\": %d, \"compiler\": ", cores);
+        reportJsonString(out, compiler);
+        fprintf(out, ", \"timestamp\": \"%s\"}\n", timestamp);
+    } else {
+        if (header) {
+            fprintf(out, "%s\n", REPORT_CSV_HEADER);
+        }
+        reportCsvString(out, record->implementation);
+        fputc(',', out);
+        reportCsvString(out, record->algorithm);
+        fputc(',', out);
+        reportCsvString(out, record->distribution);
+        fprintf(out, ",%lld,%d,%d,%u,%.6f,%.4f,%d,", record->size, record->workers,
+                record->threads, record->seed, record->time_s, throughput, record->verified);
+        for (int i = 0; i < record->num_phases; i++) {
+            fprintf(out, "%s%s=%.6f", i > 0 ? ";" : "", record->phase_names[i],
+                    record->phase_seconds[i]);
+        }
+        fputc(',', out);
+        reportCsvString(out, host);
+        fprintf(out, ",%d,", cores);
+        reportCsvString(out, compiler);
+        fprintf(out, ",%s\n", timestamp);
+    }
+
+    int status = ferror(out) ? -1 : 0;
+    if (output_path != NULL) {
+        if (fclose(out) != 0) status = -1;
+    } else {
+        fflush(out);
+    }
+    return status;
+}
+
+// Usage lines for the options understood by parseOutputOption
+#define OUTPUT_OPTIONS_USAGE \
+    "  --json[=FILE]                  Print one JSON record for the run (human-readable\n" \
+    "                                 text moves to stderr), or append it to FILE\n" \
+    "  --csv[=FILE]                   Print the CSV header and one row for the run, or\n" \
+    "                                 append the row to FILE (header only if FILE is new)\n"
+
+#endif // QUICKSORT_REPORT_H
@@ -0,0 +1,180 @@
+// Batched segmented sort: many independent arrays stored back to back in one
+// buffer, segment s in keys[offsets[s] .. offsets[s+1]-1] (the CPU counterpart
+// of the CUDA quickSortKernel, which sorts fixed segments of one buffer).
+// A whole batch runs in one parallel region: segments are weighted by their
+// estimated cost n*log2(n) plus a per-segment overhead and cut into chunks of
+// equal cost that the threads take dynamically, and segments too large for
+// one chunk are split into tasks by the whole team (quickSortParallel).
+// OpenMP keeps its thread team between regions, so a call costs one region
+// entry, one pass over the offsets and one O(num_segments) plan allocation.
+// Concurrent calls sort correctly: they share only the settings of omp_sort.h,
+// which they read, and the report counters below, which they write
+// atomically. The including program includes omp_sort.h first.
+#ifndef QUICKSORT_SEGMENT_SORT_H
+#define QUICKSORT_SEGMENT_SORT_H
+
+#include <stdlib.h>
+#include <string.h>
+#include <omp.h>
+#include "omp_sort.h"
+
+// Cost of a segment on top of its keys (call, setup and cache misses)
+#define SEGMENT_OVERHEAD 32
+
+// Chunks per thread: enough for the dynamic schedule to even out the load
+#define SEGMENT_CHUNKS_PER_THREAD 16
+
+// Segments costing more than this share of a thread's work are team-sorted
+// (1/SEGMENT_LARGE_SHARE of total cost / threads)
+#define SEGMENT_LARGE_SHARE 2
+
+// Benchmark mode of the OpenMP driver: split the keys into this many segments
+// (0: one ordinary sort) and pass at most segment_batch of them per call (0: all)
+int segment_count = 0;
+int segment_batch = 0;
+
+// Shape of the last batch, for reports (with concurrent calls, of whichever
+// call finished last)
+int segment_chunks = 0;          // chunks of small segments
+int segment_team_sorted = 0;     // segments split into tasks by the team
+
+// Estimated cost of sorting n keys
+static inline long long segmentCost(int n) {
+    long long cost = SEGMENT_OVERHEAD;
+    int levels = 0;
+    while ((1 << levels) < n && levels < 31) levels++;
+    return cost + (long long)n * (levels > 0 ? levels : 1);
+}
+
+// Sort every segment keys[offsets[s] .. offsets[s+1]-1], s < num_segments, in
+// place with num_threads threads (<= 0: the OpenMP default); offsets must be
+// non-decreasing. Uses the partition settings in sort_options.
+// returns 0, or -1 if the offsets are invalid or memory runs out
+int sortSegments(int keys[], const int offsets[], int num_segments, int num_threads) {
+    int threads = (num_threads > 0) ? num_threads : omp_get_max_threads();
+    long long total_cost = 0;
+    int largest = 0;
+    long tasks = 0;
+    TaskSortContext ctx = { &sort_options, NULL, 0, 0, &tasks };
+
+    if (num_segments <= 0) {
+        #pragma omp atomic write
+        segment_chunks = 0;
+        #pragma omp atomic write
+        segment_team_sorted = 0;
+        return 0;
+    }
+    for (int s = 0; s < num_segments; s++) {
+        if (offsets[s + 1] < offsets[s]) return -1;
+        total_cost += segmentCost(offsets[s + 1] - offsets[s]);
+    }
+
+    // Chunk plan of this call: chunk c covers the small segments listed in
+    // plan[chunk_start[c] .. chunk_start[c+1]-1]
+    int* plan = (int*)malloc((2 * (size_t)num_segments + 1) * sizeof(int));
+    if (plan == NULL) return -1;
+    int* chunk_start = plan + num_segments;
+
+    // Large segments go to the team, the rest into chunks of consecutive small
+    // segments of about chunk_cost each
+    long long large_cost = total_cost / ((long long)threads * SEGMENT_LARGE_SHARE);
+    long long chunk_cost = total_cost / ((long long)threads * SEGMENT_CHUNKS_PER_THREAD);
+    int num_large = 0, num_small = 0, num_chunks = 0;
+    long long filled = 0;
+
+    for (int s = 0; s < num_segments; s++) {
+        int n = offsets[s + 1] - offsets[s];
+        long long cost = segmentCost(n);
+        if (threads > 1 && n > TASK_THRESHOLD_MIN && cost > large_cost) {
+            // (listed from the back of the plan, the small ones from the front)
+            plan[num_segments - 1 - num_large++] = s;
+            if (n > largest) largest = n;
+            continue;
+        }
+        if (num_small == 0 || filled >= chunk_cost) {
+            chunk_start[num_chunks++] = num_small;
+            filled = 0;
+        }
+        plan[num_small++] = s;
+        filled += cost;
+    }
+    chunk_start[num_chunks] = num_small;
+    if (num_large > 0) {
+        chooseTaskGranularity(largest, threads, &ctx);
+    }
+
+    #pragma omp parallel num_threads(threads)
+    {
+        // One thread splits the large segments into tasks while the others
+        // start on the chunks; idle threads pick up the tasks at the barrier
+        #pragma omp single nowait
+        {
+            for (int i = 0; i < num_large; i++) {
+                int s = plan[num_segments - 1 - i];
+                #pragma omp task firstprivate(s)
+                {
+                    PROFILE_DEPTH_ROOT(depthLimit(offsets[s + 1] - offsets[s]));
+                    quickSortParallel(keys, offsets[s], offsets[s + 1] - 1,
+                                      depthLimit(offsets[s + 1] - offsets[s]), 0, &ctx);
+                }
+            }
+        }
+
+        #pragma omp for schedule(dynamic, 1)
+        for (int c = 0; c < num_chunks; c++) {
+            PROFILE_START(sort_start);
+            for (int i = chunk_start[c]; i < chunk_start[c + 1]; i++) {
+                int s = plan[i];
+                if (offsets[s + 1] - offsets[s] > 1) {
+                    introSort(keys, offsets[s], offsets[s + 1] - 1, &sort_options);
+                }
+            }
+            PROFILE_STOP(sort_start, PHASE_LOCAL_SORT);
+        }
+    }
+    free(plan);
+
+    #pragma omp atomic write
+    segment_chunks = num_chunks;
+    #pragma omp atomic write
+    segment_team_sorted = num_large;
+    return 0;
+}
+
+// 1 if every segment of keys is in order (checked in parallel)
+static inline int segmentsSorted(const int keys[], const int offsets[], int num_segments, int threads) {
+    int unsorted = 0;
+
+    #pragma omp parallel for schedule(dynamic, 256) reduction(|:unsorted) \
+        num_threads(threads > 0 ? threads : 1)
+    for (int s = 0; s < num_segments; s++) {
+        for (int i = offsets[s]; i + 1 < offsets[s + 1]; i++) {
+            if (keys[i] > keys[i + 1]) {
+                unsorted = 1;
+                break;
+            }
+        }
+    }
+    return !unsorted;
+}
+
+// Parse --segments=N or --batch=K
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+static inline int parseSegmentOption(const char* arg) {
+    if (strncmp(arg, "--segments=", 11) == 0) {
+        return parseIntValue(arg + 11, 1, &segment_count);
+    }
+    if (strncmp(arg, "--batch=", 8) == 0) {
+        return parseIntValue(arg + 8, 1, &segment_batch);
+    }
+    return 0;
+}
+
+// Usage lines for the options understood by parseSegmentOption
+#define SEGMENT_OPTIONS_USAGE \
+    "  --segments=N                   Segmented sort: split the keys into N segments\n" \
+    "                                 of random sizes and sort each one independently\n" \
+    "  --batch=K                      Pass at most K segments per sortSegments call\n" \
+    "                                 (default: all in one call)\n"
+
+#endif // QUICKSORT_SEGMENT_SORT_H
@@ -0,0 +1,315 @@
+// Typed quick sorts: size_t indices, several key types and key + payload sorting
+// DEFINE_TYPED_SORT instantiates an introsort for one key type (optionally moving
+// a payload array along with the keys), so the comparison is inlined into the
+// partition loop instead of going through a qsort-style comparator callback
+#ifndef QUICKSORT_TYPED_SORT_H
+#define QUICKSORT_TYPED_SORT_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include "partition.h"
+
+// Key types understood by typedSort (values match the Python engine)
+typedef enum {
+    KEY_INT32 = 0,
+    KEY_INT64 = 1,
+    KEY_UINT32 = 2,
+    KEY_UINT64 = 3,
+    KEY_FLOAT = 4,
+    KEY_DOUBLE = 5
+} KeyType;
+
+// Payload moved together with the keys
+typedef enum {
+    PAYLOAD_NONE = 0,
+    PAYLOAD_UINT32 = 1,   // 32-bit record ids or values
+    PAYLOAD_UINT64 = 2    // 64-bit values, pointers or argsort indices
+} PayloadType;
+
+// Ordering of integer keys
+#define TYPED_LESS(a, b) ((a) < (b))
+
+// Total order for floating point keys: NaNs sort after every number
+#define TYPED_LESS_FLOAT(a, b) ((a) < (b) || ((b) != (b) && (a) == (a)))
+
+// Recursion depth allowed before the heapsort fallback: 2 * floor(log2(n))
+static inline int typedDepthLimit(size_t n) {
+    int depth = 0;
+    while (n > 1) {
+        depth++;
+        n >>= 1;
+    }
+    return 2 * depth;
+}
+
+// Serial introsort over [0, n) for KEY_T keys with an optional VAL_T payload
+// (HAS_VALUES is 0 or 1; with 0 the payload code folds away and vals may be NULL)
+// ninther pivot, three-way partition, insertion sort below INSERTION_SORT_THRESHOLD
+// and heapsort past typedDepthLimit(n) levels
+#define DEFINE_TYPED_SORT(NAME, KEY_T, VAL_T, HAS_VALUES, LESS) \
+static inline void typedSwap_##NAME(KEY_T* keys, VAL_T* vals, size_t i, size_t j) { \
+    KEY_T key = keys[i]; \
+    keys[i] = keys[j]; \
+    keys[j] = key; \
+    if (HAS_VALUES) { \
+        VAL_T val = vals[i]; \
+        vals[i] = vals[j]; \
+        vals[j] = val; \
+    } \
+} \
+\
+static inline size_t typedMedian3_##NAME(const KEY_T* keys, size_t a, size_t b, size_t c) { \
+    if (LESS(keys[a], keys[b])) { \
+        if (LESS(keys[b], keys[c])) return b; \
+        return LESS(keys[a], keys[c]) ? c : a; \
+    } \
+    if (LESS(keys[a], keys[c])) return a; \
+    return LESS(keys[b], keys[c]) ? c : b; \
+} \
+\
+static inline size_t typedPivot_##NAME(const KEY_T* keys, size_t low, size_t high) { \
+    size_t mid = low + (high - low) / 2; \
+    if (high - low + 1 >= NINTHER_THRESHOLD) { \
+        size_t step = (high - low + 1) / 8; \
+        size_t m1 = typedMedian3_##NAME(keys, low, low + step, low + 2 * step); \
+        size_t m2 = typedMedian3_##NAME(keys, mid - step, mid, mid + step); \
+        size_t m3 = typedMedian3_##NAME(keys, high - 2 * step, high - step, high); \
+        return typedMedian3_##NAME(keys, m1, m2, m3); \
+    } \
+    return typedMedian3_##NAME(keys, low, mid, high); \
+} \
+\
+static inline void typedInsertionSort_##NAME(KEY_T* keys, VAL_T* vals, size_t low, size_t end) { \
+    for (size_t i = low + 1; i < end; i++) { \
+        KEY_T key = keys[i]; \
+        VAL_T val = HAS_VALUES ? vals[i] : (VAL_T)0; \
+        size_t j = i; \
+        while (j > low && LESS(key, keys[j - 1])) { \
+            keys[j] = keys[j - 1]; \
+            if (HAS_VALUES) vals[j] = vals[j - 1]; \
+            j--; \
+        } \
+        keys[j] = key; \
+        if (HAS_VALUES) vals[j] = val; \
+    } \
+} \
+\
+/* afterwards [low, *lt) < pivot, [*lt, *gt) == pivot, [*gt, end) > pivot */ \
+static inline void typedPartition_##NAME(KEY_T* keys, VAL_T* vals, size_t low, size_t end, \
+                                         size_t* lt_out, size_t* gt_out) { \
+    KEY_T pivot = keys[typedPivot_##NAME(keys, low, end - 1)]; \
+    size_t lt = low, i = low, gt = end; \
+    while (i < gt) { \
+        if (LESS(keys[i], pivot)) { \
+            typedSwap_##NAME(keys, vals, lt++, i++); \
+        } else if (LESS(pivot, keys[i])) { \
+            typedSwap_##NAME(keys, vals, i, --gt); \
+        } else { \
+            i++; \
+        } \
+    } \
+    *lt_out = lt; \
+    *gt_out = gt; \
+} \
+\
+static inline void typedSiftDown_##NAME(KEY_T* keys, VAL_T* vals, size_t i, size_t n) { \
+    while (2 * i + 1 < n) { \
+        size_t child = 2 * i + 1; \
+        if (child + 1 < n && LESS(keys[child], keys[child + 1])) child++; \
+        if (!LESS(keys[i], keys[child])) break; \
+        typedSwap_##NAME(keys, vals, i, child); \
+        i = child; \
+    } \
+} \
+\
+static inline void typedHeapSort_##NAME(KEY_T* keys, VAL_T* vals, size_t n) { \
+    for (size_t i = n / 2; i-- > 0; ) { \
+        typedSiftDown_##NAME(keys, vals, i, n); \
+    } \
+    for (size_t end = n - 1; end > 0; end--) { \
+        typedSwap_##NAME(keys, vals, 0, end); \
+        typedSiftDown_##NAME(keys, vals, 0, end); \
+    } \
+} \
+\
+/* recurses into the smaller side and loops on the larger, so the stack stays O(log n) */ \
+static inline void typedIntroSortLoop_##NAME(KEY_T* keys, VAL_T* vals, size_t low, size_t end, \
+                                             int depth) { \
+    while (end - low > INSERTION_SORT_THRESHOLD) { \
+        if (depth <= 0) { \
+            typedHeapSort_##NAME(keys + low, HAS_VALUES ? vals + low : vals, end - low); \
+            return; \
+        } \
+        depth--; \
+        size_t lt, gt; \
+        typedPartition_##NAME(keys, vals, low, end, &lt, &gt); \
+        if (lt - low < end - gt) { \
+            typedIntroSortLoop_##NAME(keys, vals, low, lt, depth); \
+            low = gt; \
+        } else { \
+            typedIntroSortLoop_##NAME(keys, vals, gt, end, depth); \
+            end = lt; \
+        } \
+    } \
+    typedInsertionSort_##NAME(keys, vals, low, end); \
+} \
+\
+static inline void typedSort_##NAME(KEY_T* keys, VAL_T* vals, size_t n) { \
+    if (n > 1) { \
+        typedIntroSortLoop_##NAME(keys, vals, 0, n, typedDepthLimit(n)); \
+    } \
+} \
+\
+static inline int typedIsSorted_##NAME(const KEY_T* keys, size_t n) { \
+    for (size_t i = 1; i < n; i++) { \
+        if (LESS(keys[i], keys[i - 1])) return 0; \
+    } \
+    return 1; \
+} \
+DEFINE_TYPED_SORT_PARALLEL(NAME, KEY_T, VAL_T)
+
+// Task-parallel variant (OpenMP builds only): ranges larger than threshold are
+// partitioned by one thread and their left side becomes a task
+#ifdef _OPENMP
+#define DEFINE_TYPED_SORT_PARALLEL(NAME, KEY_T, VAL_T) \
+static void typedSortTasks_##NAME(KEY_T* keys, VAL_T* vals, size_t low, size_t end, \
+                                  int depth, size_t threshold) { \
+    while (end - low > threshold && depth > 0) { \
+        depth--; \
+        size_t lt, gt; \
+        typedPartition_##NAME(keys, vals, low, end, &lt, &gt); \
+        _Pragma("omp task firstprivate(low, lt, depth)") \
+        typedSortTasks_##NAME(keys, vals, low, lt, depth, threshold); \
+        low = gt; \
+    } \
+    typedIntroSortLoop_##NAME(keys, vals, low, end, depth); \
+} \
+\
+static inline void typedSortParallel_##NAME(KEY_T* keys, VAL_T* vals, size_t n, size_t threshold) { \
+    if (n > 1) { \
+        _Pragma("omp parallel") \
+        _Pragma("omp single") \
+        typedSortTasks_##NAME(keys, vals, 0, n, typedDepthLimit(n), threshold); \
+    } \
+}
+#else
+#define DEFINE_TYPED_SORT_PARALLEL(NAME, KEY_T, VAL_T) \
+static inline void typedSortParallel_##NAME(KEY_T* keys, VAL_T* vals, size_t n, size_t threshold) { \
+    (void)threshold; \
+    typedSort_##NAME(keys, vals, n); \
+}
+#endif
+
+// Every key type, alone and with a 32-bit or 64-bit payload
+#define DEFINE_TYPED_SORTS_FOR_KEY(NAME, KEY_T, LESS) \
+    DEFINE_TYPED_SORT(NAME, KEY_T, unsigned char, 0, LESS) \
+    DEFINE_TYPED_SORT(NAME##_u32, KEY_T, uint32_t, 1, LESS) \
+    DEFINE_TYPED_SORT(NAME##_u64, KEY_T, uint64_t, 1, LESS)
+
+DEFINE_TYPED_SORTS_FOR_KEY(i32, int32_t, TYPED_LESS)
+DEFINE_TYPED_SORTS_FOR_KEY(i64, int64_t, TYPED_LESS)
+DEFINE_TYPED_SORTS_FOR_KEY(u32, uint32_t, TYPED_LESS)
+DEFINE_TYPED_SORTS_FOR_KEY(u64, uint64_t, TYPED_LESS)
+DEFINE_TYPED_SORTS_FOR_KEY(f32, float, TYPED_LESS_FLOAT)
+DEFINE_TYPED_SORTS_FOR_KEY(f64, double, TYPED_LESS_FLOAT)
+
+// Size in bytes of one key of the given type (0 if the type is unknown)
+static inline size_t typedKeySize(int key_type) {
+    switch (key_type) {
+        case KEY_INT32: case KEY_UINT32: case KEY_FLOAT: return 4;
+        case KEY_INT64: case KEY_UINT64: case KEY_DOUBLE: return 8;
+        default: return 0;
+    }
+}
+
+// One switch case per payload type for the instantiation NAME
+#define TYPED_SORT_CASE(KEY, NAME, KEY_T) \
+    case KEY: \
+        if (payload_type == PAYLOAD_NONE) \
+            typedSortParallel_##NAME((KEY_T*)keys, NULL, n, threshold); \
+        else if (payload_type == PAYLOAD_UINT32) \
+            typedSortParallel_##NAME##_u32((KEY_T*)keys, (uint32_t*)values, n, threshold); \
+        else if (payload_type == PAYLOAD_UINT64) \
+            typedSortParallel_##NAME##_u64((KEY_T*)keys, (uint64_t*)values, n, threshold); \
+        else \
+            return -1; \
+        return 0;
+
+// Sort n keys of key_type in place, moving the payload (NULL for PAYLOAD_NONE)
+// along with them; ranges above threshold become OpenMP tasks in OpenMP builds
+// (threshold >= n sorts serially). The type switch runs once per call, not per
+// comparison. Returns 0, or -1 for an unknown key or payload type
+static inline int typedSort(void* keys, void* values, size_t n, int key_type,
+                            int payload_type, size_t threshold) {
+    switch (key_type) {
+        TYPED_SORT_CASE(KEY_INT32, i32, int32_t)
+        TYPED_SORT_CASE(KEY_INT64, i64, int64_t)
+        TYPED_SORT_CASE(KEY_UINT32, u32, uint32_t)
+        TYPED_SORT_CASE(KEY_UINT64, u64, uint64_t)
+        TYPED_SORT_CASE(KEY_FLOAT, f32, float)
+        TYPED_SORT_CASE(KEY_DOUBLE, f64, double)
+        default:
+            return -1;
+    }
+}
+
+// Argsort: fill index[0..n-1] with the permutation that sorts keys, leaving
+// keys untouched (a scratch copy of the keys is sorted together with the
+// indices). Returns 0, or -1 for an unknown key type or allocation failure
+static inline int typedArgSort(const void* keys, uint64_t* index, size_t n, int key_type,
+                               size_t threshold) {
+    size_t key_size = typedKeySize(key_type);
+    void* scratch = malloc(n * key_size + 1);
+    int status;
+
+    if (key_size == 0 || scratch == NULL) {
+        free(scratch);
+        return -1;
+    }
+    memcpy(scratch, keys, n * key_size);
+    for (size_t i = 0; i < n; i++) {
+        index[i] = i;
+    }
+    status = typedSort(scratch, index, n, key_type, PAYLOAD_UINT64, threshold);
+    free(scratch);
+    return status;
+}
+
+// 1 if the n keys of key_type are in ascending order
+static inline int typedIsSorted(const void* keys, size_t n, int key_type) {
+    switch (key_type) {
+        case KEY_INT32: return typedIsSorted_i32((const int32_t*)keys, n);
+        case KEY_INT64: return typedIsSorted_i64((const int64_t*)keys, n);
+        case KEY_UINT32: return typedIsSorted_u32((const uint32_t*)keys, n);
+        case KEY_UINT64: return typedIsSorted_u64((const uint64_t*)keys, n);
+        case KEY_FLOAT: return typedIsSorted_f32((const float*)keys, n);
+        case KEY_DOUBLE: return typedIsSorted_f64((const double*)keys, n);
+        default: return 0;
+    }
+}
+
+// Names accepted by --key-type, indexed by KeyType
+static const char* const KEY_TYPE_NAMES[] = { "int32", "int64", "uint32", "uint64", "float", "double" };
+
+// Parse --key-type=NAME into *key_type
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+static inline int parseKeyTypeOption(const char* arg, int* key_type) {
+    if (strncmp(arg, "--key-type=", 11) != 0) return 0;
+    for (int t = KEY_INT32; t <= KEY_DOUBLE; t++) {
+        if (strcmp(arg + 11, KEY_TYPE_NAMES[t]) == 0) {
+            *key_type = t;
+            return 1;
+        }
+    }
+    return -1;
+}
+
+// Usage lines for the option understood by parseKeyTypeOption
+#define KEY_TYPE_USAGE \
+    "  --key-type=int32|int64|uint32|uint64|float|double\n" \
+    "                                 Sort typed keys with size_t indices (ninther,\n" \
+    "                                 three-way partition and introsort built in)\n"
+
+#endif // QUICKSORT_TYPED_SORT_H
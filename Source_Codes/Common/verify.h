@@ -0,0 +1,122 @@
+// Output verification for the Serial, OpenMP and MPI drivers
+// one parallel pass over the output checks the order and computes an
+// order-independent checksum of the keys (count, and the sum and xor of a
+// 64-bit hash of every key); comparing it with the checksum of the input
+// catches dropped, duplicated or corrupted keys that an order check misses.
+// Checksums of disjoint parts combine with checksumCombine (MPI: sum/xor reduce)
+#ifndef QUICKSORT_VERIFY_H
+#define QUICKSORT_VERIFY_H
+
+#include <stdio.h>
+#include <stdint.h>
+#include <string.h>
+
+// Order-independent checksum of a multiset of keys
+typedef struct {
+    uint64_t count;
+    uint64_t sum;        // sum of the key hashes (mod 2^64)
+    uint64_t hash_xor;   // xor of the key hashes
+} KeyChecksum;
+
+#define KEY_CHECKSUM_EMPTY { 0, 0, 0 }
+
+// 64-bit hash of one key (murmur3 finalizer)
+static inline uint64_t verifyHash(uint64_t key) {
+    key ^= key >> 33;
+    key *= 0xFF51AFD7ED558CCDULL;
+    key ^= key >> 33;
+    key *= 0xC4CEB9FE1A85EC53ULL;
+    return key ^ (key >> 33);
+}
+
+// Add the keys counted in part to total
+static inline void checksumCombine(KeyChecksum* total, const KeyChecksum* part) {
+    total->count += part->count;
+    total->sum += part->sum;
+    total->hash_xor ^= part->hash_xor;
+}
+
+// 1 if both checksums describe the same multiset (with high probability)
+static inline int checksumEqual(const KeyChecksum* a, const KeyChecksum* b) {
+    return a->count == b->count && a->sum == b->sum && a->hash_xor == b->hash_xor;
+}
+
+// Checksum of n int keys with threads OpenMP threads
+static inline KeyChecksum checksumKeys(const int keys[], size_t n, int threads) {
+    uint64_t sum = 0, hash_xor = 0;
+#ifdef _OPENMP
+    #pragma omp parallel for schedule(static) reduction(+:sum) reduction(^:hash_xor) \
+        num_threads(threads > 0 ? threads : 1)
+#else
+    (void)threads;
+#endif
+    for (size_t i = 0; i < n; i++) {
+        uint64_t h = verifyHash((uint64_t)(uint32_t)keys[i]);
+        sum += h;
+        hash_xor ^= h;
+    }
+    KeyChecksum checksum = { (uint64_t)n, sum, hash_xor };
+    return checksum;
+}
+
+// Checksum of n keys of key_size bytes (at most 8) by their bit patterns
+static inline KeyChecksum checksumBytes(const void* keys, size_t n, size_t key_size, int threads) {
+    const unsigned char* bytes = (const unsigned char*)keys;
+    uint64_t sum = 0, hash_xor = 0;
+#ifdef _OPENMP
+    #pragma omp parallel for schedule(static) reduction(+:sum) reduction(^:hash_xor) \
+        num_threads(threads > 0 ? threads : 1)
+#else
+    (void)threads;
+#endif
+    for (size_t i = 0; i < n; i++) {
+        uint64_t bits = 0;
+        memcpy(&bits, bytes + i * key_size, key_size);
+        uint64_t h = verifyHash(bits);
+        sum += h;
+        hash_xor ^= h;
+    }
+    KeyChecksum checksum = { (uint64_t)n, sum, hash_xor };
+    return checksum;
+}
+
+// Check that keys[0..n-1] are in order and compute their checksum in the same
+// pass, with threads OpenMP threads (each also compares across its boundary)
+// returns 1 if the keys are in non-decreasing order
+static inline int verifyKeys(const int keys[], size_t n, KeyChecksum* checksum, int threads) {
+    uint64_t sum = 0, hash_xor = 0;
+    int unsorted = 0;
+#ifdef _OPENMP
+    #pragma omp parallel for schedule(static) reduction(+:sum) reduction(^:hash_xor) \
+        reduction(|:unsorted) num_threads(threads > 0 ? threads : 1)
+#else
+    (void)threads;
+#endif
+    for (size_t i = 0; i < n; i++) {
+        uint64_t h = verifyHash((uint64_t)(uint32_t)keys[i]);
+        sum += h;
+        hash_xor ^= h;
+        unsorted |= (i + 1 < n && keys[i] > keys[i + 1]);
+    }
+    checksum->count = (uint64_t)n;
+    checksum->sum = sum;
+    checksum->hash_xor = hash_xor;
+    return !unsorted;
+}
+
+// Print the outcome of a verification (FAILED lines name what went wrong)
+static inline void printVerification(int ordered, int permutation) {
+    if (ordered && permutation) {
+        printf("✓ SUCCESS: Array is correctly sorted!\n");
+        printf("✓ Output is a permutation of the input (checksums match)\n");
+        return;
+    }
+    if (!ordered) {
+        printf("✗ FAILED: Array is NOT correctly sorted!\n");
+    }
+    if (!permutation) {
+        printf("✗ FAILED: Output is NOT a permutation of the input (checksum mismatch)!\n");
+    }
+}
+
+#endif // QUICKSORT_VERIFY_H
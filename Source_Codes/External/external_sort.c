@@ -0,0 +1,460 @@
+#define _FILE_OFFSET_BITS 64
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <limits.h>
+#include <time.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/resource.h>
+#include <sys/stat.h>
+#include <omp.h>
+#include "../Common/omp_sort.h"
+
+// Default memory budget for the chunk buffer and the merge buffers
+#define MEMORY_BUDGET_MB 1024
+
+// Smallest read buffer per run in the merge; with a smaller share of the
+// budget the runs are merged in several passes
+#define MIN_MERGE_BUFFER 65536
+
+// File descriptors kept out of the merge fan-in (stdio, the output file and
+// whatever the C and OpenMP runtimes hold open)
+#define FD_RESERVE 16
+
+// Elements written per block by --generate
+#define GENERATE_BLOCK 1048576
+
+// Partition strategy selected on the command line
+SortOptions sort_options = SORT_OPTIONS_DEFAULT;
+
+// External sort settings selected on the command line
+int memory_budget_mb = MEMORY_BUDGET_MB;
+int chunk_elements = 0;          // elements per sorted run (0: whole budget)
+int num_threads = 0;             // OpenMP threads per chunk sort (0: default)
+const char* tmp_dir = ".";       // where the run files go
+long long generate_count = 0;    // write this many random keys to the input first
+
+// Buffered reader over one sorted run file
+typedef struct {
+    FILE* file;
+    int* buffer;
+    size_t capacity;
+    size_t count;
+    size_t pos;
+} RunReader;
+
+// Refill a reader's buffer; returns the number of keys now available
+static size_t refillRun(RunReader* run) {
+    run->count = fread(run->buffer, sizeof(int), run->capacity, run->file);
+    run->pos = 0;
+    return run->count;
+}
+
+// Restore the min-heap of run indices (keyed by each run's current head) below node i
+static void siftDownReaders(int heap[], int n, int i, const RunReader runs[]) {
+    int top = heap[i];
+    int value = runs[top].buffer[runs[top].pos];
+
+    while (2 * i + 1 < n) {
+        int child = 2 * i + 1;
+        if (child + 1 < n &&
+            runs[heap[child + 1]].buffer[runs[heap[child + 1]].pos] <
+            runs[heap[child]].buffer[runs[heap[child]].pos]) {
+            child++;
+        }
+        if (value <= runs[heap[child]].buffer[runs[heap[child]].pos]) break;
+        heap[i] = heap[child];
+        i = child;
+    }
+    heap[i] = top;
+}
+
+// Write n keys to a new file at path; returns 0 on success, -1 on an I/O error
+int writeKeys(const char* path, const int keys[], size_t n) {
+    FILE* file = fopen(path, "wb");
+    if (file == NULL) {
+        perror(path);
+        return -1;
+    }
+    size_t written = fwrite(keys, sizeof(int), n, file);
+    if (fclose(file) != 0 || written != n) {
+        perror(path);
+        return -1;
+    }
+    return 0;
+}
+
+// k-way merge of the sorted run files into out_path, reading and writing
+// sequentially through buffers of buffer_elements keys each
+// returns 0 on success, -1 on an I/O or allocation error
+int mergeRuns(char* const paths[], int k, const char* out_path, size_t buffer_elements) {
+    RunReader* runs = (RunReader*)calloc(k, sizeof(RunReader));
+    int* heap = (int*)malloc(k * sizeof(int));
+    int* out_buffer = (int*)malloc(buffer_elements * sizeof(int));
+    FILE* out = fopen(out_path, "wb");
+    int status = 0, n = 0;
+    size_t out_count = 0;
+
+    if (runs == NULL || heap == NULL || out_buffer == NULL || out == NULL) {
+        perror(out_path);
+        status = -1;
+        goto done;
+    }
+
+    for (int r = 0; r < k; r++) {
+        runs[r].file = fopen(paths[r], "rb");
+        runs[r].buffer = (int*)malloc(buffer_elements * sizeof(int));
+        runs[r].capacity = buffer_elements;
+        if (runs[r].file == NULL || runs[r].buffer == NULL) {
+            perror(paths[r]);
+            status = -1;
+            goto done;
+        }
+        if (refillRun(&runs[r]) > 0) {
+            heap[n++] = r;
+        }
+    }
+    for (int i = n / 2 - 1; i >= 0; i--) {
+        siftDownReaders(heap, n, i, runs);
+    }
+
+    // Pop the smallest head, advance its run, refill from disk when a buffer drains
+    while (n > 0) {
+        RunReader* top = &runs[heap[0]];
+        out_buffer[out_count++] = top->buffer[top->pos++];
+        if (out_count == buffer_elements) {
+            if (fwrite(out_buffer, sizeof(int), out_count, out) != out_count) {
+                perror(out_path);
+                status = -1;
+                goto done;
+            }
+            out_count = 0;
+        }
+        if (top->pos == top->count && refillRun(top) == 0) {
+            heap[0] = heap[--n];
+        }
+        if (n > 0) {
+            siftDownReaders(heap, n, 0, runs);
+        }
+    }
+    if (fwrite(out_buffer, sizeof(int), out_count, out) != out_count) {
+        perror(out_path);
+        status = -1;
+    }
+
+done:
+    if (out != NULL && fclose(out) != 0) {
+        perror(out_path);
+        status = -1;
+    }
+    if (runs != NULL) {
+        for (int r = 0; r < k; r++) {
+            if (runs[r].file != NULL) fclose(runs[r].file);
+            free(runs[r].buffer);
+        }
+    }
+    free(runs);
+    free(heap);
+    free(out_buffer);
+    return status;
+}
+
+// Most run files one merge may open at once: the open-file limit
+// (RLIMIT_NOFILE) minus FD_RESERVE, at least 2
+int maxOpenRuns(void) {
+    struct rlimit limit;
+
+    if (getrlimit(RLIMIT_NOFILE, &limit) != 0 || limit.rlim_cur == RLIM_INFINITY
+            || limit.rlim_cur > (rlim_t)INT_MAX) {
+        return INT_MAX;
+    }
+    int runs = (int)limit.rlim_cur - FD_RESERVE;
+    return (runs < 2) ? 2 : runs;
+}
+
+// Delete the run files paths[first .. first+count-1] and free their paths
+// (NULL entries, e.g. a single run written straight to the output, are skipped)
+void removeRuns(char* paths[], int first, int count) {
+    for (int r = first; r < first + count; r++) {
+        if (paths[r] != NULL) {
+            unlink(paths[r]);
+            free(paths[r]);
+            paths[r] = NULL;
+        }
+    }
+}
+
+// Path of run file number id in tmp_dir (caller frees)
+char* runPath(int id) {
+    size_t length = strlen(tmp_dir) + 64;
+    char* path = (char*)malloc(length);
+    snprintf(path, length, "%s/quicksort_run_%d_%d.bin", tmp_dir, (int)getpid(), id);
+    return path;
+}
+
+// Write count random keys (0-99999) to path in blocks
+int generateFile(const char* path, long long count) {
+    int* block = (int*)malloc(GENERATE_BLOCK * sizeof(int));
+    FILE* file = fopen(path, "wb");
+    int status = 0;
+
+    if (block == NULL || file == NULL) {
+        perror(path);
+        free(block);
+        if (file != NULL) fclose(file);
+        return -1;
+    }
+    for (long long done = 0; done < count; done += GENERATE_BLOCK) {
+        size_t n = (count - done < GENERATE_BLOCK) ? (size_t)(count - done) : GENERATE_BLOCK;
+        for (size_t i = 0; i < n; i++) {
+            block[i] = rand() % 100000;
+        }
+        if (fwrite(block, sizeof(int), n, file) != n) {
+            perror(path);
+            status = -1;
+            break;
+        }
+    }
+    if (fclose(file) != 0) {
+        perror(path);
+        status = -1;
+    }
+    free(block);
+    return status;
+}
+
+// Map a whole file of keys read-only; *count receives the number of keys
+// returns NULL (with *count = 0) for an empty file, MAP_FAILED on error
+int* mapKeys(const char* path, long long* count) {
+    struct stat info;
+    int fd = open(path, O_RDONLY);
+
+    *count = 0;
+    if (fd < 0 || fstat(fd, &info) != 0) {
+        perror(path);
+        if (fd >= 0) close(fd);
+        return (int*)MAP_FAILED;
+    }
+    if (info.st_size % sizeof(int) != 0) {
+        fprintf(stderr, "%s: size %lld is not a multiple of %zu bytes\n",
+                path, (long long)info.st_size, sizeof(int));
+        close(fd);
+        return (int*)MAP_FAILED;
+    }
+    *count = info.st_size / sizeof(int);
+    if (*count == 0) {
+        close(fd);
+        return NULL;
+    }
+
+    int* keys = (int*)mmap(NULL, info.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+    close(fd);
+    if (keys == (int*)MAP_FAILED) {
+        perror(path);
+    } else {
+        posix_madvise(keys, info.st_size, POSIX_MADV_SEQUENTIAL);
+    }
+    return keys;
+}
+
+// Check that the keys in path are in order and that there are expected of them
+int isSortedFile(const char* path, long long expected) {
+    long long count;
+    int* keys = mapKeys(path, &count);
+    int sorted = 1;
+
+    if (keys == (int*)MAP_FAILED) return 0;
+    for (long long i = 1; i < count && sorted; i++) {
+        sorted = (keys[i - 1] <= keys[i]);
+    }
+    if (keys != NULL) munmap(keys, count * sizeof(int));
+    return sorted && count == expected;
+}
+
+// Parse one external-sort command line option
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+int parseExternalOption(const char* arg) {
+    if (strncmp(arg, "--memory=", 9) == 0) {
+        return parseIntValue(arg + 9, 1, &memory_budget_mb);
+    }
+    if (strncmp(arg, "--chunk=", 8) == 0) {
+        return parseIntValue(arg + 8, 1, &chunk_elements);
+    }
+    if (strncmp(arg, "--threads=", 10) == 0) {
+        return parseIntValue(arg + 10, 1, &num_threads);
+    }
+    if (strncmp(arg, "--tmpdir=", 9) == 0) {
+        tmp_dir = arg + 9;
+        return (*tmp_dir != '\0') ? 1 : -1;
+    }
+    if (strncmp(arg, "--generate=", 11) == 0) {
+        char* end;
+        generate_count = strtoll(arg + 11, &end, 10);
+        return (end != arg + 11 && *end == '\0' && generate_count > 0) ? 1 : -1;
+    }
+    return 0;
+}
+
+// Usage lines for the options understood by parseExternalOption
+#define EXTERNAL_OPTIONS_USAGE \
+    "  --memory=MB                    Memory budget for chunks and merge buffers\n" \
+    "                                 (default: 1024)\n" \
+    "  --chunk=N                      Keys per sorted run (default: the whole budget)\n" \
+    "  --threads=N                    OpenMP threads per chunk sort (default: all)\n" \
+    "  --tmpdir=DIR                   Directory for the run files (default: .)\n" \
+    "  --generate=N                   First write N random keys to <input>\n"
+
+#ifndef QUICKSORT_NO_MAIN
+int main(int argc, char* argv[]) {
+    // Check command line arguments
+    if (argc < 3) {
+        printf("Usage: %s <input.bin> <output.bin> [options]\n", argv[0]);
+        printf("Example: %s keys.bin sorted.bin --memory=512 --threads=8\n", argv[0]);
+        printf("Files hold raw native-endian 32-bit int keys.\n");
+        printf("Options:\n%s%s%s", SORT_OPTIONS_USAGE, EXTERNAL_OPTIONS_USAGE, OMP_OPTIONS_USAGE);
+        return 1;
+    }
+
+    const char* input_path = argv[1];
+    const char* output_path = argv[2];
+
+    // Parse optional partition strategy, engine and external sort flags
+    for (int i = 3; i < argc; i++) {
+        int status = parseSortOption(argv[i], &sort_options);
+        if (status == 0) {
+            status = parseExternalOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseOmpOption(argv[i]);
+        }
+        if (status != 1) {
+            printf("Error: Unknown or invalid option '%s'\n", argv[i]);
+            printf("Options:\n%s%s%s", SORT_OPTIONS_USAGE, EXTERNAL_OPTIONS_USAGE, OMP_OPTIONS_USAGE);
+            return 1;
+        }
+    }
+
+    if (generate_count > 0) {
+        srand(time(NULL));
+        printf("Generating %lld random keys into %s...\n", generate_count, input_path);
+        if (generateFile(input_path, generate_count) != 0) {
+            return 1;
+        }
+    }
+
+    // Chunk size: the configured value, else as many keys as the budget holds
+    long long budget_elements = (long long)memory_budget_mb * 1024 * 1024 / sizeof(int);
+    long long chunk = chunk_elements > 0 ? chunk_elements : budget_elements;
+    if (chunk > 2147483647LL) chunk = 2147483647LL;
+
+    long long total;
+    int* keys = mapKeys(input_path, &total);
+    if (keys == (int*)MAP_FAILED) {
+        return 1;
+    }
+
+    int num_runs = (int)((total + chunk - 1) / chunk);
+    if (num_runs <= 1) chunk = (total > 0) ? total : 1;
+
+    int* buffer = (int*)malloc(chunk * sizeof(int));
+    char** paths = (char**)malloc((num_runs > 0 ? num_runs : 1) * sizeof(char*));
+    if (buffer == NULL || paths == NULL) {
+        printf("Error: Memory allocation failed for a chunk of %lld keys!\n", chunk);
+        printf("Suggestion: Use a smaller --chunk or --memory\n");
+        return 1;
+    }
+
+    printf("Input: %s (%lld keys, %.2f MB)\n", input_path, total, total * sizeof(int) / 1048576.0);
+    printf("Memory Budget: %d MB, Chunk: %lld keys, Runs: %d\n", memory_budget_mb, chunk, num_runs);
+    printf("Sorting with external OpenMP %s...\n", ALGORITHM_NAMES[sort_algorithm]);
+
+    double start = omp_get_wtime();
+
+    // Phase 1: sort every mapped chunk in memory and write it out as a run
+    // (a single chunk goes straight to the output file)
+    for (int r = 0; r < num_runs; r++) {
+        long long offset = (long long)r * chunk;
+        int n = (int)((total - offset < chunk) ? total - offset : chunk);
+
+        memcpy(buffer, keys + offset, (size_t)n * sizeof(int));
+        sortParallel(buffer, n, num_threads);
+
+        paths[r] = (num_runs == 1) ? NULL : runPath(r);
+        if (writeKeys(paths[r] ? paths[r] : output_path, buffer, n) != 0) {
+            removeRuns(paths, 0, r + 1);
+            return 1;
+        }
+    }
+    if (num_runs == 0 && writeKeys(output_path, buffer, 0) != 0) {
+        return 1;
+    }
+    if (keys != NULL) munmap(keys, total * sizeof(int));
+    free(buffer);
+
+    double run_time = omp_get_wtime() - start;
+
+    // Phase 2: k-way merge; when the budget cannot give every run a large enough
+    // buffer, or the open-file limit cannot hold every run open at once, merge
+    // groups of fan_in runs into longer runs first
+    int fan_in = (int)(budget_elements / MIN_MERGE_BUFFER) - 1;
+    int next_id = num_runs, passes = 0;
+    if (fan_in > maxOpenRuns()) fan_in = maxOpenRuns();
+    if (fan_in < 2) fan_in = 2;
+
+    while (num_runs > fan_in) {
+        int merged = 0;
+        for (int first = 0; first < num_runs; first += fan_in) {
+            int k = (num_runs - first < fan_in) ? num_runs - first : fan_in;
+            char* path = runPath(next_id++);
+            if (mergeRuns(paths + first, k, path, budget_elements / (k + 1)) != 0) {
+                // (paths[0..merged-1] are this pass's runs, paths[first..] the unmerged ones)
+                unlink(path);
+                free(path);
+                removeRuns(paths, 0, merged);
+                removeRuns(paths, first, num_runs - first);
+                return 1;
+            }
+            removeRuns(paths, first, k);
+            paths[merged++] = path;
+        }
+        num_runs = merged;
+        passes++;
+    }
+    if (num_runs > 1) {
+        int status = mergeRuns(paths, num_runs, output_path, budget_elements / (num_runs + 1));
+        removeRuns(paths, 0, num_runs);
+        if (status != 0) {
+            return 1;
+        }
+        passes++;
+    }
+    free(paths);
+
+    double end = omp_get_wtime();
+    double time_taken = end - start;
+
+    printf("\nVerifying sorted file...\n");
+    if (isSortedFile(output_path, total)) {
+        printf("✓ SUCCESS: Array is correctly sorted!\n");
+    } else {
+        printf("✗ FAILED: Array is NOT correctly sorted!\n");
+        return 1;
+    }
+
+    printf("\n======================\n");
+    printf("Performance Results\n");
+    printf("======================\n");
+    printf("\nArray Size:  %lld elements\n", total);
+    printf("Sorted Runs: %d\n", (int)((total + chunk - 1) / chunk));
+    printf("Merge Passes: %d\n", passes);
+    printf("Run Formation Time:  %.6f seconds\n", run_time);
+    printf("Merge Time:  %.6f seconds\n", time_taken - run_time);
+    printf("Execution Time:  %.6f seconds\n", time_taken);
+    printf("Elements/second: %.2f million\n", (total / time_taken) / 1000000.0);
+    printf("-------------------------------------------------------\n");
+
+    return 0;
+}
+#endif // QUICKSORT_NO_MAIN
@@ -1,12 +1,31 @@
 #!/usr/bin/env python3
-import matplotlib.pyplot as plt
 import csv
+import os
+import sys
+
+import matplotlib.pyplot as plt
 
-# Updated Performance data using Serial baseline
-processes = [1, 2, 4, 8]
-execution_time = [0.696363, 0.337406, 0.209390, 0.198653]
-throughput = [14.36, 29.64, 47.76, 50.34]
-serial_time = 1.512392  # baseline serial execution time
+# Results store written by Benchmark/benchmark.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Benchmark'))
+import results_store
+import scaling
+
+# Array size to plot (python3 graphs.py [size])
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+SIZE_LABEL = f"{SIZE / 1e6:g} Million Elements"
+
+# Median times per process count and the serial baseline from the results store
+rows = results_store.select('mpi', size=SIZE)
+if not rows:
+    sys.exit(f"No MPI results for {SIZE} elements - run Benchmark/benchmark.py first")
+processes = [r['workers'] for r in rows]
+execution_time = [r['median_s'] for r in rows]
+throughput = [r['throughput_meps'] for r in rows]
+serial_time, estimated = results_store.baseline(SIZE)
+if serial_time is None:
+    sys.exit("No serial results in the store - run Benchmark/benchmark.py -i serial first")
+if estimated:
+    print(f"Serial baseline scaled from another array size: {serial_time:.6f}s (estimated)")
 
 # Calculate speedup and efficiency using Serial baseline
 speedup = []
@@ -17,8 +36,11 @@ for i in range(len(processes)):
     eff = (sp / processes[i]) * 100
     efficiency.append(eff)
 
+# Karp-Flatt serial fraction of every run (NaN for one process), see Benchmark/scaling.py
+karp_flatt = scaling.karp_flatt(speedup, processes)
+
 # Ideal linear speedup for comparison
-ideal_speedup = [1, 2, 4, 8]
+ideal_speedup = processes
 
 print("Generating MPI performance graphs with colored labels using serial baseline...")
 
@@ -30,7 +52,7 @@ fig1, ax1 = plt.subplots(figsize=(10, 6))
 ax1.plot(processes, execution_time, marker='o', linewidth=3, markersize=10, color='#2E86AB')
 ax1.set_xlabel('Number of Processes', fontsize=14, fontweight='bold')
 ax1.set_ylabel('Execution Time (seconds)', fontsize=14, fontweight='bold')
-ax1.set_title('MPI QuickSort: Processes vs Execution Time\n(10 Million Elements)', 
+ax1.set_title(f'MPI QuickSort: Processes vs Execution Time\n({SIZE_LABEL})', 
               fontsize=16, fontweight='bold')
 ax1.grid(True, alpha=0.3)
 ax1.set_xticks(processes)
@@ -58,7 +80,7 @@ ax2.plot(processes, ideal_speedup, linestyle='--', linewidth=3, color='#F18F01',
          alpha=0.8, label='Ideal Linear', zorder=2)
 ax2.set_xlabel('Number of Processes', fontsize=14, fontweight='bold')
 ax2.set_ylabel('Speedup (times)', fontsize=14, fontweight='bold')
-ax2.set_title('MPI QuickSort: Processes vs Speedup\n(10 Million Elements)', 
+ax2.set_title(f'MPI QuickSort: Processes vs Speedup\n({SIZE_LABEL})', 
               fontsize=16, fontweight='bold')
 ax2.grid(True, alpha=0.3)
 ax2.set_xticks(processes)
@@ -84,7 +106,7 @@ fig3, ax3 = plt.subplots(figsize=(10, 6))
 bars = ax3.bar(processes, efficiency, color='#06A77D', alpha=0.8, edgecolor='black', linewidth=1.5)
 ax3.set_xlabel('Number of Processes', fontsize=14, fontweight='bold')
 ax3.set_ylabel('Efficiency (%)', fontsize=14, fontweight='bold')
-ax3.set_title('MPI QuickSort: Processes vs Efficiency\n(10 Million Elements)', 
+ax3.set_title(f'MPI QuickSort: Processes vs Efficiency\n({SIZE_LABEL})', 
               fontsize=16, fontweight='bold')
 ax3.grid(True, alpha=0.3, axis='y')
 ax3.set_xticks(processes)
@@ -108,7 +130,7 @@ print("✓ Graph 3: graph3_processes_vs_efficiency.png")
 # =================================================================
 
 fig, axes = plt.subplots(1, 2, figsize=(20, 6))
-fig.suptitle('MPI QuickSort Performance Analysis (10 Million Elements, 8-Core System)', 
+fig.suptitle(f'MPI QuickSort Performance Analysis ({SIZE_LABEL})', 
              fontsize=18, fontweight='bold')
 
 # Time
@@ -149,23 +171,30 @@ print("✓ Combined: combined_all_graphs.png")
 print("\n" + "="*60)
 print("PERFORMANCE SUMMARY")
 print("="*60)
-print(f"Array Size: 10,000,000 elements")
-print(f"System: 8-core system (tested with 1, 2, 4, 8 processes)\n")
-print(f"{'Processes':<10} {'Time (s)':<12} {'Speedup':<12} {'Efficiency':<12}")
+print(f"Array Size: {SIZE:,} elements")
+print(f"Processes: {', '.join(str(p) for p in processes)}\n")
+print(f"{'Processes':<10} {'Time (s)':<12} {'Speedup':<12} {'Efficiency':<12} {'Karp-Flatt':<12}")
 print("-" * 60)
-for p, time, sp, eff in zip(processes, execution_time, speedup, efficiency):
-    print(f"{p:<10} {time:<12.6f} {sp:<12.2f} {eff:<12.2f}%")
+for p, time, sp, eff, kf in zip(processes, execution_time, speedup, efficiency, karp_flatt):
+    print(f"{p:<10} {time:<12.6f} {sp:<12.2f} {eff:<11.2f}% {kf:<12.4f}")
 print("="*60)
 print(f"\nBest Speedup: {max(speedup):.2f}x with {processes[speedup.index(max(speedup))]} processes")
 print(f"Best Efficiency: {max(efficiency):.2f}% with {processes[efficiency.index(max(efficiency))]} processes")
 print(f"Peak Throughput: {max(throughput):.2f} million elements/second")
 print(f"Time Reduction: {((execution_time[0] - execution_time[-1]) / execution_time[0] * 100):.1f}%")
+fits = scaling.fit(scaling.measurements(scaling.load()))
+fits = fits[(fits['implementation'] == 'mpi') & (fits['options'] == '')
+            & (fits['distribution'] == 'random') & (fits['size'] == SIZE)]
+if not fits.empty:
+    model = fits.iloc[0]
+    print(f"Scaling Model: T(p) = {model['a']:.4f} + {model['b']:.4f}/p + {model['c']:.4f}(p-1) s "
+          f"(Amdahl serial fraction {model['amdahl_fraction']:.3f})")
 print("="*60)
 
 print("\n✅ All 4 graphs generated successfully!")
 
 csv_filename = "mpi_quicksort_results.csv"
-array_size = 10000000  # 10M as indicated in the graphs title
+array_size = SIZE
 
 with open(csv_filename, mode='w', newline='') as csvfile:
     writer = csv.writer(csvfile)
@@ -178,5 +207,5 @@ with open(csv_filename, mode='w', newline='') as csvfile:
         "Efficiency (%)",
     ])
     # rows
-    for p, t, sp, eff, tp in zip(processes, execution_time, speedup, efficiency):
+    for p, t, sp, eff in zip(processes, execution_time, speedup, efficiency):
         writer.writerow([p, array_size, f"{t:.6f}", f"{sp:.4f}", f"{eff:.2f}"])
\ No newline at end of file
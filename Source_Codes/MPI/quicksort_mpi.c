@@ -1,37 +1,80 @@
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
+#include <limits.h>
 #include <time.h>
 #include <mpi.h>
+#include "../Common/partition.h"
+#include "../Common/radix_sort.h"
+#include "../Common/report.h"
+#include "../Common/generate.h"
+#include "../Common/keyio.h"
+#include "../Common/verify.h"
+#ifdef _OPENMP
+#include "../Common/omp_sort.h"
+#endif
 
-// Function to swap two elements
-void swap(int* a, int* b) {
-    int temp = *a;
-    *a = *b;
-    *b = temp;
-}
+// Samples per thread when splitting a k-way merge between threads
+#define MERGE_OVERSAMPLING 64
 
-// Partition function
-int partition(int arr[], int low, int high) {
-    int pivot = arr[high];
-    int i = low - 1;
-    
-    for (int j = low; j < high; j++) {
-        if (arr[j] < pivot) {
-            i++;
-            swap(&arr[i], &arr[j]);
-        }
-    }
-    swap(&arr[i + 1], &arr[high]);
-    return i + 1;
-}
+// Keys each rank sorts to measure its speed for --calibrate
+#define CALIBRATION_SIZE 200000
+
+// Default number of chunks per rank for --pipeline
+#define PIPELINE_CHUNKS 4
+
+// Distributed algorithms selectable with --algorithm
+typedef enum {
+    MPI_ALGORITHM_MERGE = 0,   // scatter, local sort, gather, merge on rank 0
+    MPI_ALGORITHM_PSRS = 1     // parallel sorting by regular sampling
+} MpiAlgorithm;
+
+// Partition strategy selected on the command line
+SortOptions sort_options = SORT_OPTIONS_DEFAULT;
+
+// Algorithm and result placement selected on the command line
+int mpi_algorithm = MPI_ALGORITHM_MERGE;
+int gather_result = 0;   // PSRS: also collect the sorted slices on rank 0
+int merge_threads = 0;   // OpenMP threads for k-way merges (0: same as --threads)
+int local_threads = 1;   // OpenMP threads for each rank's local sort (hybrid build)
+int use_radix = 0;       // local sorts use the radix backend (--radix)
+
+// Relative share of the input per rank (NULL: equal shares)
+double* rank_weights = NULL;
+int num_rank_weights = 0;
+int calibrate_weights = 0;   // measure the weights with a calibration sort
+
+// Chunks per rank streamed by the pipelined merge mode (0: no pipelining)
+int pipeline_chunks = 0;
+
+// Input distribution, seed and key range (keys 0-99999 by default)
+InputSpec input_spec = INPUT_SPEC_DEFAULT(100000);
 
 // Serial Quick Sort
 void quickSort(int arr[], int low, int high) {
-    if (low < high) {
-        int pi = partition(arr, low, high);
-        quickSort(arr, low, pi - 1);
-        quickSort(arr, pi + 1, high);
+    introSort(arr, low, high, &sort_options);
+}
+
+// Sort this rank's block: with the radix backend if --radix is given, else with
+// the OpenMP task engine on local_threads threads in the hybrid build, otherwise
+// with the serial quick sort
+// (the task engine times its own partition and local sort phases)
+void localSort(int arr[], int size) {
+    PROFILE_START(start);
+    if (use_radix && radixSort(arr, size, local_threads) == 0) {
+        PROFILE_STOP(start, PHASE_LOCAL_SORT);
+        return;
+    }
+#ifdef _OPENMP
+    if (local_threads > 1) {
+        sortParallel(arr, size, local_threads);
+        return;
     }
+#endif
+    if (size > 1) {
+        quickSort(arr, 0, size - 1);
+    }
+    PROFILE_STOP(start, PHASE_LOCAL_SORT);
 }
 
 // Simple merge of two sorted arrays
@@ -55,23 +98,700 @@ void merge(int* result, int* left, int left_size, int* right, int right_size) {
     }
 }
 
-// Function to generate random array
-void generateRandomArray(int arr[], int size) {
-    for (int i = 0; i < size; i++) {
-        arr[i] = rand() % 100000;
+// Number of elements of the sorted array arr[0..n-1] that are <= value
+int upperBound(const int arr[], int n, int value) {
+    int lo = 0, hi = n;
+    while (lo < hi) {
+        int mid = lo + (hi - lo) / 2;
+        if (arr[mid] <= value) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return lo;
+}
+
+// Restore the min-heap order of run heads below heap slot i
+static void siftDownRuns(int heap[], int heap_size, int i, const int src[], const int pos[]) {
+    int run = heap[i];
+    int value = src[pos[run]];
+    
+    while (2 * i + 1 < heap_size) {
+        int child = 2 * i + 1;
+        if (child + 1 < heap_size && src[pos[heap[child + 1]]] < src[pos[heap[child]]]) {
+            child++;
+        }
+        if (value <= src[pos[heap[child]]]) break;
+        heap[i] = heap[child];
+        i = child;
+    }
+    heap[i] = run;
+}
+
+// Single-pass k-way merge of the sorted runs src[begin[r]..end[r]-1]
+// a binary min-heap holds the run heads, so every element is copied exactly
+// once into out[0..] and the merge costs O(n log k)
+void kWayMerge(const int src[], const int begin[], const int end[], int k, int out[]) {
+    if (k == 1) {
+        memcpy(out, src + begin[0], (size_t)(end[0] - begin[0]) * sizeof(int));
+        return;
+    }
+    if (k == 2) {
+        merge(out, (int*)src + begin[0], end[0] - begin[0],
+              (int*)src + begin[1], end[1] - begin[1]);
+        return;
+    }
+    
+    int* heap = (int*)malloc(k * sizeof(int));
+    int* pos = (int*)malloc(k * sizeof(int));
+    if (heap == NULL || pos == NULL) {
+        printf("Error: Merge heap allocation failed!\n");
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+    int heap_size = 0;
+    int o = 0;
+    
+    for (int r = 0; r < k; r++) {
+        pos[r] = begin[r];
+        if (begin[r] < end[r]) {
+            heap[heap_size++] = r;
+        }
+    }
+    for (int i = heap_size / 2 - 1; i >= 0; i--) {
+        siftDownRuns(heap, heap_size, i, src, pos);
+    }
+    
+    while (heap_size > 0) {
+        int run = heap[0];
+        out[o++] = src[pos[run]++];
+        if (pos[run] == end[run]) {
+            heap[0] = heap[--heap_size];
+        }
+        if (heap_size > 0) {
+            siftDownRuns(heap, heap_size, 0, src, pos);
+        }
     }
+    
+    free(heap);
+    free(pos);
 }
 
-// Function to verify if array is sorted
-int isSorted(int arr[], int size) {
-    for (int i = 0; i < size - 1; i++) {
-        if (arr[i] > arr[i + 1]) {
-            return 0;
+// K-way merge of the k sorted runs stored back to back in src
+// (run r occupies [starts[r], starts[r+1])) into out[0..], split across
+// threads OpenMP threads: sampled splitter keys cut every run with a binary
+// search, so each thread merges one independent key range straight into
+// its own part of the output
+void kWayMergeParallel(const int src[], const int starts[], int k, int out[], int threads) {
+    int total = starts[k] - starts[0];
+    PROFILE_START(start);
+    
+#ifndef _OPENMP
+    threads = 1;
+#endif
+    if (threads <= 1 || total < threads * MERGE_OVERSAMPLING) {
+        kWayMerge(src, starts, starts + 1, k, out);
+        PROFILE_STOP(start, PHASE_MERGE);
+        return;
+    }
+    
+    // Splitter keys from evenly spaced samples of all runs
+    // (without memory for the splitters and cuts, merge on one thread)
+    int num_samples = threads * MERGE_OVERSAMPLING;
+    int* sample = (int*)malloc(num_samples * sizeof(int));
+    int* cut = (int*)malloc((size_t)(threads + 1) * k * sizeof(int));
+    int* out_offset = (int*)malloc((threads + 1) * sizeof(int));
+    if (sample == NULL || cut == NULL || out_offset == NULL) {
+        free(sample);
+        free(cut);
+        free(out_offset);
+        kWayMerge(src, starts, starts + 1, k, out);
+        PROFILE_STOP(start, PHASE_MERGE);
+        return;
+    }
+    for (int i = 0; i < num_samples; i++) {
+        sample[i] = src[starts[0] + (int)((long long)i * total / num_samples)];
+    }
+    quickSort(sample, 0, num_samples - 1);
+    
+    // cut[t*k + r]: where thread t's share of run r begins
+    for (int r = 0; r < k; r++) {
+        cut[r] = starts[r];
+        cut[threads * k + r] = starts[r + 1];
+    }
+    for (int t = 1; t < threads; t++) {
+        int splitter = sample[t * MERGE_OVERSAMPLING];
+        for (int r = 0; r < k; r++) {
+            cut[t * k + r] = starts[r] + upperBound(src + starts[r], starts[r + 1] - starts[r], splitter);
         }
     }
+    for (int t = 0; t <= threads; t++) {
+        out_offset[t] = 0;
+        for (int r = 0; r < k; r++) {
+            out_offset[t] += cut[t * k + r] - starts[r];
+        }
+    }
+    
+#ifdef _OPENMP
+    #pragma omp parallel for num_threads(threads) schedule(static, 1)
+#endif
+    for (int t = 0; t < threads; t++) {
+        kWayMerge(src, cut + t * k, cut + (t + 1) * k, k, out + out_offset[t]);
+    }
+    
+    free(sample);
+    free(cut);
+    free(out_offset);
+    PROFILE_STOP(start, PHASE_MERGE);
+}
+
+// PSRS sample: a key and where it sits (rank, index in that rank's sorted
+// block); ordering by all three gives equal keys a total order too
+typedef struct {
+    int key;
+    int rank;
+    int index;
+} PsrsSample;
+
+// qsort comparison of two PsrsSamples by (key, rank, index)
+int comparePsrsSamples(const void* a, const void* b) {
+    const PsrsSample* x = (const PsrsSample*)a;
+    const PsrsSample* y = (const PsrsSample*)b;
+    if (x->key != y->key) return (x->key < y->key) ? -1 : 1;
+    if (x->rank != y->rank) return (x->rank < y->rank) ? -1 : 1;
+    return (x->index > y->index) - (x->index < y->index);
+}
+
+// Number of elements of rank's sorted block arr[0..n-1] that are <= splitter
+// by (key, rank, index): a run of keys equal to the splitter key is cut at the
+// splitter's own rank and index, so it can be spread over adjacent buckets
+int psrsBucketEnd(const int arr[], int n, const PsrsSample* splitter, int rank) {
+    int less = (splitter->key == INT_MIN) ? 0 : upperBound(arr, n, splitter->key - 1);
+    int less_equal = upperBound(arr, n, splitter->key);
+    
+    if (rank < splitter->rank) return less_equal;
+    if (rank > splitter->rank) return less;
+    if (splitter->index + 1 < less) return less;
+    return (splitter->index + 1 < less_equal) ? splitter->index + 1 : less_equal;
+}
+
+// Parallel Sorting by Regular Sampling (PSRS)
+// every rank sorts its block, contributes regular samples from which all ranks
+// derive the same p-1 global splitters, then the ranks exchange buckets with
+// MPI_Alltoallv and merge what they receive. Samples and splitters carry their
+// rank and index, so keys equal to a splitter are split between adjacent ranks
+// instead of all landing on one (equal-key or few-unique input stays balanced).
+// On return *slice holds this rank's part of the globally sorted array (every
+// key on rank r is <= every key on rank r+1); the return value is its length.
+int psrsSort(int local_arr[], int local_size, int** slice, int rank, int num_procs) {
+    int p = num_procs;
+    
+    // Local sort
+    localSort(local_arr, local_size);
+    
+    // Regular samples: p per non-empty rank, shared with every rank
+    // (a PsrsSample travels as three MPI_INTs)
+    PROFILE_START(partition_start);
+    int num_samples = (local_size > 0) ? p : 0;
+    int* sample_counts = (int*)malloc(p * sizeof(int));
+    int* sample_displs = (int*)malloc(p * sizeof(int));
+    PsrsSample* samples = (PsrsSample*)malloc(p * sizeof(PsrsSample));
+    if (sample_counts == NULL || sample_displs == NULL || samples == NULL) {
+        printf("Process %d: Sample allocation failed!\n", rank);
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+    for (int i = 0; i < num_samples; i++) {
+        int index = (int)((long long)i * local_size / p);
+        samples[i].key = local_arr[index];
+        samples[i].rank = rank;
+        samples[i].index = index;
+    }
+    int sample_ints = 3 * num_samples;
+    MPI_Allgather(&sample_ints, 1, MPI_INT, sample_counts, 1, MPI_INT, MPI_COMM_WORLD);
+    
+    int total_samples = 0;
+    for (int r = 0; r < p; r++) {
+        sample_displs[r] = 3 * total_samples;
+        total_samples += sample_counts[r] / 3;
+    }
+    PsrsSample* all_samples = (PsrsSample*)malloc((total_samples > 0 ? total_samples : 1) * sizeof(PsrsSample));
+    if (all_samples == NULL) {
+        printf("Process %d: Sample allocation failed!\n", rank);
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+    MPI_Allgatherv(samples, sample_ints, MPI_INT, all_samples, sample_counts, sample_displs,
+                   MPI_INT, MPI_COMM_WORLD);
+    PROFILE_COUNT(COUNTER_BYTES_SENT, (long long)num_samples * (p - 1) * sizeof(PsrsSample));
+    
+    // Global splitters: p-1 evenly spaced picks from the sorted samples
+    PsrsSample* splitters = (PsrsSample*)malloc(p * sizeof(PsrsSample));
+    if (splitters == NULL) {
+        printf("Process %d: Splitter allocation failed!\n", rank);
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+    if (total_samples > 1) {
+        qsort(all_samples, total_samples, sizeof(PsrsSample), comparePsrsSamples);
+    }
+    for (int i = 1; i < p; i++) {
+        splitters[i - 1] = all_samples[(int)((long long)i * total_samples / p)];
+    }
+    
+    // Bucket j gets the elements in (splitters[j-1], splitters[j]] by (key, rank, index)
+    int* send_counts = (int*)malloc(p * sizeof(int));
+    int* send_displs = (int*)malloc(p * sizeof(int));
+    int* recv_counts = (int*)malloc(p * sizeof(int));
+    int* recv_displs = (int*)malloc((p + 1) * sizeof(int));
+    if (send_counts == NULL || send_displs == NULL || recv_counts == NULL || recv_displs == NULL) {
+        printf("Process %d: Bucket table allocation failed!\n", rank);
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+    int prev = 0;
+    for (int j = 0; j < p; j++) {
+        int next = (j < p - 1) ? psrsBucketEnd(local_arr, local_size, &splitters[j], rank) : local_size;
+        send_displs[j] = prev;
+        send_counts[j] = next - prev;
+        prev = next;
+    }
+    PROFILE_STOP(partition_start, PHASE_PARTITION);
+    
+    // Exchange bucket sizes, then the buckets themselves
+    PROFILE_START(exchange_start);
+    MPI_Alltoall(send_counts, 1, MPI_INT, recv_counts, 1, MPI_INT, MPI_COMM_WORLD);
+    int recv_total = 0;
+    for (int r = 0; r < p; r++) {
+        recv_displs[r] = recv_total;
+        recv_total += recv_counts[r];
+    }
+    recv_displs[p] = recv_total;
+    
+    int* received = (int*)malloc((recv_total > 0 ? recv_total : 1) * sizeof(int));
+    int* tmp = (int*)malloc((recv_total > 0 ? recv_total : 1) * sizeof(int));
+    if (received == NULL || tmp == NULL) {
+        printf("Process %d: Bucket allocation failed!\n", rank);
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+    MPI_Alltoallv(local_arr, send_counts, send_displs, MPI_INT,
+                  received, recv_counts, recv_displs, MPI_INT, MPI_COMM_WORLD);
+    PROFILE_STOP(exchange_start, PHASE_EXCHANGE);
+    PROFILE_COUNT(COUNTER_BYTES_SENT, (long long)(local_size - send_counts[rank]) * sizeof(int));
+    
+    // Every received bucket is already sorted: merge the p runs in one pass
+    kWayMergeParallel(received, recv_displs, p, tmp, merge_threads);
+    free(received);
+    *slice = tmp;
+    
+    free(sample_counts);
+    free(sample_displs);
+    free(samples);
+    free(all_samples);
+    free(splitters);
+    free(send_counts);
+    free(send_displs);
+    free(recv_counts);
+    free(recv_displs);
+    
+    return recv_total;
+}
+
+// Collect the PSRS slices, in rank order, into arr on rank 0
+void gatherSlices(int slice[], int slice_size, int arr[], int rank, int num_procs) {
+    int* counts = NULL;
+    int* displs = NULL;
+    PROFILE_START(start);
+    
+    if (rank == 0) {
+        counts = (int*)malloc(num_procs * sizeof(int));
+        displs = (int*)malloc(num_procs * sizeof(int));
+    }
+    MPI_Gather(&slice_size, 1, MPI_INT, counts, 1, MPI_INT, 0, MPI_COMM_WORLD);
+    if (rank == 0) {
+        int offset = 0;
+        for (int r = 0; r < num_procs; r++) {
+            displs[r] = offset;
+            offset += counts[r];
+        }
+    }
+    MPI_Gatherv(slice, slice_size, MPI_INT, arr, counts, displs, MPI_INT, 0, MPI_COMM_WORLD);
+    PROFILE_STOP(start, PHASE_GATHER);
+    if (rank != 0) {
+        PROFILE_COUNT(COUNTER_BYTES_SENT, (long long)slice_size * sizeof(int));
+    }
+    
+    free(counts);
+    free(displs);
+}
+
+// Cut every rank's share into chunks pieces: run r*chunks + c of the
+// pipelined mode covers [bounds[r*chunks + c], bounds[r*chunks + c + 1])
+void pipelineBounds(const int counts[], const int displs[], int num_procs, int chunks, int bounds[]) {
+    for (int r = 0; r < num_procs; r++) {
+        for (int c = 0; c < chunks; c++) {
+            bounds[r * chunks + c] = displs[r] + (int)((long long)counts[r] * c / chunks);
+        }
+    }
+    bounds[num_procs * chunks] = displs[num_procs - 1] + counts[num_procs - 1];
+}
+
+// Pipelined scatter, local sort and gather (--pipeline)
+// rank 0 streams every share in chunks with MPI_Isend and posts the matching
+// MPI_Irecv for each sorted run; the other ranks sort whichever chunk arrives
+// first (MPI_Waitany) and send it back while later chunks are still in flight.
+// Rank 0 sorts its own chunks meanwhile, then merges all runs into *arr.
+void pipelinedSort(int** arr, const int counts[], const int displs[], int local_arr[],
+                   int rank, int num_procs, int chunks) {
+    int num_runs = num_procs * chunks;
+    int* bounds = (int*)malloc((num_runs + 1) * sizeof(int));
+    if (bounds == NULL) {
+        printf("Process %d: Pipeline bounds allocation failed!\n", rank);
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+    pipelineBounds(counts, displs, num_procs, chunks, bounds);
+    
+    if (rank == 0) {
+        int size = bounds[num_runs];
+        int* runs = (int*)malloc(size * sizeof(int));
+        MPI_Request* requests = (MPI_Request*)malloc(2 * num_runs * sizeof(MPI_Request));
+        int num_requests = 0;
+        if (runs == NULL || requests == NULL) {
+            printf("Error: Pipeline buffer allocation failed!\n");
+            MPI_Abort(MPI_COMM_WORLD, 1);
+        }
+        
+        // Chunk-major order: every rank gets its first chunk as early as possible
+        PROFILE_START(distribute_start);
+        PROFILE_COUNT(COUNTER_BYTES_SENT, (long long)(size - bounds[chunks]) * sizeof(int));
+        for (int c = 0; c < chunks; c++) {
+            for (int r = 1; r < num_procs; r++) {
+                int run = r * chunks + c;
+                int n = bounds[run + 1] - bounds[run];
+                MPI_Isend(*arr + bounds[run], n, MPI_INT, r, c, MPI_COMM_WORLD,
+                          &requests[num_requests++]);
+                MPI_Irecv(runs + bounds[run], n, MPI_INT, r, c, MPI_COMM_WORLD,
+                          &requests[num_requests++]);
+            }
+        }
+        PROFILE_STOP(distribute_start, PHASE_DISTRIBUTE);
+        
+        // Sort the root's own chunks while the transfers progress
+        for (int c = 0; c < chunks; c++) {
+            int n = bounds[c + 1] - bounds[c];
+            int done;
+            memcpy(runs + bounds[c], *arr + bounds[c], n * sizeof(int));
+            localSort(runs + bounds[c], n);
+            MPI_Testall(num_requests, requests, &done, MPI_STATUSES_IGNORE);
+        }
+        PROFILE_START(gather_start);
+        MPI_Waitall(num_requests, requests, MPI_STATUSES_IGNORE);
+        PROFILE_STOP(gather_start, PHASE_GATHER);
+        
+        // Every send has completed, so the input array can take the merged result
+        kWayMergeParallel(runs, bounds, num_runs, *arr, merge_threads);
+        
+        free(runs);
+        free(requests);
+    } else {
+        int base = displs[rank];
+        int* first = bounds + rank * chunks;
+        MPI_Request* recv_requests = (MPI_Request*)malloc(chunks * sizeof(MPI_Request));
+        MPI_Request* send_requests = (MPI_Request*)malloc(chunks * sizeof(MPI_Request));
+        if (recv_requests == NULL || send_requests == NULL) {
+            printf("Process %d: Pipeline request allocation failed!\n", rank);
+            MPI_Abort(MPI_COMM_WORLD, 1);
+        }
+        
+        for (int c = 0; c < chunks; c++) {
+            MPI_Irecv(local_arr + first[c] - base, first[c + 1] - first[c], MPI_INT,
+                      0, c, MPI_COMM_WORLD, &recv_requests[c]);
+        }
+        for (int i = 0; i < chunks; i++) {
+            int c;
+            PROFILE_START(distribute_start);
+            MPI_Waitany(chunks, recv_requests, &c, MPI_STATUS_IGNORE);
+            PROFILE_STOP(distribute_start, PHASE_DISTRIBUTE);
+            int n = first[c + 1] - first[c];
+            localSort(local_arr + first[c] - base, n);
+            MPI_Isend(local_arr + first[c] - base, n, MPI_INT, 0, c, MPI_COMM_WORLD,
+                      &send_requests[c]);
+            PROFILE_COUNT(COUNTER_BYTES_SENT, (long long)n * sizeof(int));
+        }
+        PROFILE_START(gather_start);
+        MPI_Waitall(chunks, send_requests, MPI_STATUSES_IGNORE);
+        PROFILE_STOP(gather_start, PHASE_GATHER);
+        
+        free(recv_requests);
+        free(send_requests);
+    }
+    
+    free(bounds);
+}
+
+// Split size elements across the ranks in proportion to weights (NULL: equally)
+// rank r receives counts[r] elements starting at displs[r]; displs[num_procs] = size
+void computeDistribution(int size, int num_procs, const double weights[],
+                         int counts[], int displs[]) {
+    double total = 0.0, cumulative = 0.0;
+    
+    for (int r = 0; r < num_procs; r++) {
+        total += weights ? weights[r] : 1.0;
+    }
+    displs[0] = 0;
+    for (int r = 0; r < num_procs; r++) {
+        if (r == num_procs - 1) {
+            displs[r + 1] = size;
+        } else if (weights == NULL) {
+            displs[r + 1] = (int)((long long)size * (r + 1) / num_procs);
+        } else {
+            cumulative += weights[r];
+            displs[r + 1] = (int)((double)size * cumulative / total);
+        }
+        counts[r] = displs[r + 1] - displs[r];
+    }
+}
+
+// Sorting speed of this rank (elements per second) on CALIBRATION_SIZE random keys
+double calibrationRate(int rank) {
+    int* keys = (int*)malloc(CALIBRATION_SIZE * sizeof(int));
+    unsigned int state = 2463534242u + (unsigned int)rank;
+    
+    if (keys == NULL) {
+        return 1.0;
+    }
+    for (int i = 0; i < CALIBRATION_SIZE; i++) {
+        state = state * 1103515245u + 12345u;
+        keys[i] = (int)((state >> 8) % 100000u);
+    }
+    
+    double start = MPI_Wtime();
+    localSort(keys, CALIBRATION_SIZE);
+    double elapsed = MPI_Wtime() - start;
+    
+    free(keys);
+    return (elapsed > 0.0) ? CALIBRATION_SIZE / elapsed : 1.0;
+}
+
+// Parse a comma-separated list of positive weights into rank_weights
+// returns 1 on success, -1 if the list is malformed
+int parseWeights(const char* text) {
+    int count = 1;
+    for (const char* c = text; *c; c++) {
+        if (*c == ',') count++;
+    }
+    
+    free(rank_weights);
+    rank_weights = (double*)malloc(count * sizeof(double));
+    num_rank_weights = 0;
+    
+    const char* cursor = text;
+    for (int i = 0; i < count; i++) {
+        char* end;
+        double value = strtod(cursor, &end);
+        if (end == cursor || value <= 0.0 || (*end != ',' && *end != '\0')) {
+            return -1;
+        }
+        rank_weights[num_rank_weights++] = value;
+        cursor = end + 1;
+    }
     return 1;
 }
 
+// Parse one MPI-specific command line option
+// returns 1 if the option was recognised, 0 if not, -1 if its value is invalid
+int parseMpiOption(const char* arg) {
+    if (strncmp(arg, "--algorithm=", 12) == 0) {
+        const char* value = arg + 12;
+        if (strcmp(value, "merge") == 0) mpi_algorithm = MPI_ALGORITHM_MERGE;
+        else if (strcmp(value, "psrs") == 0) mpi_algorithm = MPI_ALGORITHM_PSRS;
+        else return -1;
+        return 1;
+    }
+    if (strcmp(arg, "--gather") == 0) {
+        gather_result = 1;
+        return 1;
+    }
+    if (strncmp(arg, "--weights=", 10) == 0) {
+        return parseWeights(arg + 10);
+    }
+    if (strcmp(arg, "--pipeline") == 0) {
+        pipeline_chunks = PIPELINE_CHUNKS;
+        return 1;
+    }
+    if (strncmp(arg, "--pipeline=", 11) == 0) {
+        return parseIntValue(arg + 11, 1, &pipeline_chunks);
+    }
+    if (strcmp(arg, "--calibrate") == 0) {
+        calibrate_weights = 1;
+        return 1;
+    }
+    if (strncmp(arg, "--merge-threads=", 16) == 0) {
+        return parseIntValue(arg + 16, 1, &merge_threads);
+    }
+    if (strcmp(arg, "--radix") == 0) {
+        use_radix = 1;
+        return 1;
+    }
+    if (strncmp(arg, "--threads=", 10) == 0) {
+        return parseIntValue(arg + 10, 1, &local_threads);
+    }
+    return 0;
+}
+
+// Usage lines for the options understood by parseMpiOption
+#define MPI_OPTIONS_USAGE \
+    "  --algorithm=merge|psrs         Gather and merge on rank 0 (default) or\n" \
+    "                                 distributed sample sort with MPI_Alltoallv\n" \
+    "  --gather                       PSRS: also collect the sorted slices on rank 0\n" \
+    "  --threads=N                    OpenMP threads for each rank's local sort\n" \
+    "                                 (hybrid build: make hybrid; default: 1)\n" \
+    "  --merge-threads=N              Split k-way merges across N OpenMP threads\n" \
+    "                                 (hybrid build; default: same as --threads)\n" \
+    "  --weights=w0,w1,...            Relative share of the input for every rank\n" \
+    "  --calibrate                    Set the weights from a calibration sort per rank\n" \
+    RADIX_OPTION_USAGE \
+    "  --pipeline[=C]                 Merge mode: stream C chunks per rank (default 4)\n" \
+    "                                 with Isend/Irecv and sort them as they arrive\n"
+
+// Task engine options accepted by the hybrid build
+#define HYBRID_OPTIONS_USAGE \
+    "  --task-threshold=N, --task-depth=D, --parallel-partition[=N]\n" \
+    "                                 Task granularity of the local sort (hybrid\n" \
+    "                                 build, see the OpenMP version)\n"
+
+// Function to generate the input array (--distribution, --seed, --range)
+// with local_threads threads in the hybrid build
+void generateRandomArray(int arr[], int size) {
+    generateKeys(arr, (size_t)size, &input_spec, local_threads);
+}
+
+// Combine the checksums of every rank's keys (the result is on every rank)
+void allreduceChecksum(KeyChecksum* checksum) {
+    uint64_t counts[2] = { checksum->count, checksum->sum }, totals[2];
+    uint64_t hash_xor = checksum->hash_xor;
+    
+    MPI_Allreduce(counts, totals, 2, MPI_UINT64_T, MPI_SUM, MPI_COMM_WORLD);
+    MPI_Allreduce(&hash_xor, &checksum->hash_xor, 1, MPI_UINT64_T, MPI_BXOR, MPI_COMM_WORLD);
+    checksum->count = totals[0];
+    checksum->sum = totals[1];
+}
+
+// Check a distributed result: every slice is sorted, no slice starts below
+// the largest key of the slices before it, and the slices together are a
+// permutation of the input (*permutation: checksums match)
+// returns 1 on every rank if the keys are in order
+int isSortedDistributed(int slice[], int slice_size, const KeyChecksum* input_checksum,
+                        int* permutation, int rank) {
+    KeyChecksum checksum;
+    int ok = verifyKeys(slice, (size_t)slice_size, &checksum, local_threads);
+    int local_max = (slice_size > 0) ? slice[slice_size - 1] : INT_MIN;
+    int prev_max = INT_MIN;
+    
+    // Largest key held by any lower rank
+    MPI_Exscan(&local_max, &prev_max, 1, MPI_INT, MPI_MAX, MPI_COMM_WORLD);
+    if (rank == 0) {
+        prev_max = INT_MIN;
+    }
+    if (slice_size > 0 && slice[0] < prev_max) {
+        ok = 0;
+    }
+    
+    allreduceChecksum(&checksum);
+    *permutation = checksumEqual(input_checksum, &checksum);
+    
+    int all_ok = 0;
+    MPI_Allreduce(&ok, &all_ok, 1, MPI_INT, MPI_LAND, MPI_COMM_WORLD);
+    return all_ok;
+}
+
+// Open a key file (--input) for MPI-IO on every rank
+// returns its number of keys, at most max_count if that is positive, or -1
+// (file closed, rank 0 printed why) if it cannot be sorted
+long long openKeyFile(const char* path, long long max_count, MPI_File* file, int rank) {
+    MPI_Offset bytes = 0;
+    
+    if (MPI_File_open(MPI_COMM_WORLD, (char*)path, MPI_MODE_RDONLY, MPI_INFO_NULL, file) != MPI_SUCCESS) {
+        if (rank == 0) printf("Error: Cannot open %s!\n", path);
+        return -1;
+    }
+    MPI_File_get_size(*file, &bytes);
+    long long count = (long long)(bytes / sizeof(int));
+    if (max_count > 0 && count > max_count) count = max_count;
+    if (bytes % sizeof(int) != 0 || count == 0 || count > INT_MAX) {
+        if (rank == 0) {
+            printf("Error: %s must hold 1 to %d whole 32-bit keys (it has %lld bytes)!\n",
+                   path, INT_MAX, (long long)bytes);
+        }
+        MPI_File_close(file);
+        return -1;
+    }
+    return count;
+}
+
+// Read the keys of an open key file in parallel: every rank reads its own
+// share into local_arr with one collective read; the pipeline streams from
+// rank 0, so there rank 0 reads the whole file into arr instead
+void readKeyFile(MPI_File* file, int arr[], int local_arr[], const int counts[],
+                 const int displs[], int rank, int num_procs) {
+    if (pipeline_chunks > 0) {
+        if (rank == 0) {
+            MPI_File_read_at(*file, 0, arr, displs[num_procs], MPI_INT, MPI_STATUS_IGNORE);
+        }
+    } else {
+        MPI_File_read_at_all(*file, (MPI_Offset)displs[rank] * sizeof(int), local_arr,
+                             counts[rank], MPI_INT, MPI_STATUS_IGNORE);
+    }
+    MPI_File_close(file);
+}
+
+// Write the PSRS slices side by side into path with one collective MPI-IO
+// write (slice r starts after the keys of slices 0..r-1)
+// returns 0 on every rank if the whole file was written, otherwise -1
+int writeKeySlices(const char* path, int slice[], int slice_size, int total, int rank) {
+    MPI_File file;
+    long long count = slice_size, offset = 0;
+    int ok = 0, all_ok = 0;
+    
+    MPI_Exscan(&count, &offset, 1, MPI_LONG_LONG, MPI_SUM, MPI_COMM_WORLD);
+    if (rank == 0) {
+        offset = 0;
+    }
+    if (MPI_File_open(MPI_COMM_WORLD, (char*)path, MPI_MODE_WRONLY | MPI_MODE_CREATE,
+                      MPI_INFO_NULL, &file) == MPI_SUCCESS) {
+        // Truncate a longer old file to exactly the sorted keys
+        ok = (MPI_File_set_size(file, (MPI_Offset)total * sizeof(int)) == MPI_SUCCESS);
+        ok &= (MPI_File_write_at_all(file, (MPI_Offset)offset * sizeof(int), slice, slice_size,
+                                     MPI_INT, MPI_STATUS_IGNORE) == MPI_SUCCESS);
+        MPI_File_close(&file);
+    }
+    MPI_Allreduce(&ok, &all_ok, 1, MPI_INT, MPI_LAND, MPI_COMM_WORLD);
+    if (!all_ok && rank == 0) {
+        printf("Error: Cannot write %s!\n", path);
+    }
+    return all_ok ? 0 : -1;
+}
+
+#ifdef QUICKSORT_PROFILE
+// Combine this rank's thread slots into one row and collect the rows of all
+// ranks on rank 0 (*seconds: num_procs * PHASE_COUNT, *counters: num_procs *
+// COUNTER_COUNT; both stay NULL on the other ranks)
+void gatherRankProfile(int rank, int num_procs, double** seconds, long long** counters) {
+    static double thread_seconds[PROFILE_MAX_THREADS * PHASE_COUNT];
+    static long long thread_counters[PROFILE_MAX_THREADS * COUNTER_COUNT];
+    double local_seconds[PHASE_COUNT];
+    long long local_counters[COUNTER_COUNT];
+    
+    int rows = profileCollect(thread_seconds, thread_counters, PROFILE_MAX_THREADS);
+    profileTotals(thread_seconds, thread_counters, rows, local_seconds, local_counters);
+    
+    if (rank == 0) {
+        *seconds = (double*)malloc((size_t)num_procs * PHASE_COUNT * sizeof(double));
+        *counters = (long long*)malloc((size_t)num_procs * COUNTER_COUNT * sizeof(long long));
+    }
+    MPI_Gather(local_seconds, PHASE_COUNT, MPI_DOUBLE, *seconds, PHASE_COUNT, MPI_DOUBLE,
+               0, MPI_COMM_WORLD);
+    MPI_Gather(local_counters, COUNTER_COUNT, MPI_LONG_LONG, *counters, COUNTER_COUNT,
+               MPI_LONG_LONG, 0, MPI_COMM_WORLD);
+}
+#endif
+
 // Function to print sample elements
 void printSampleElements(int arr[], int size) {
     int step = size / 10;
@@ -89,133 +809,365 @@ int main(int argc, char* argv[]) {
     int *arr = NULL;
     int *local_arr = NULL;
     int local_size;
+    int *counts = NULL;     // elements scattered to every rank
+    int *displs = NULL;     // and where each rank's share starts
+    int *slice = NULL;      // PSRS: this rank's part of the sorted array
+    int slice_size = 0;
     double start_time, end_time;
+    int exit_status = 0;
     
-    // Initialize MPI
+    // Initialize MPI (only the main thread of each rank makes MPI calls)
+#ifdef _OPENMP
+    int thread_support;
+    MPI_Init_thread(&argc, &argv, MPI_THREAD_FUNNELED, &thread_support);
+#else
     MPI_Init(&argc, &argv);
+#endif
     MPI_Comm_rank(MPI_COMM_WORLD, &rank);
     MPI_Comm_size(MPI_COMM_WORLD, &num_procs);
     
     // Check command line arguments
-    if (argc != 2) {
+    if (argc < 2) {
         if (rank == 0) {
-            printf("Usage: %s <array_size>\n", argv[0]);
+            printf("Usage: %s <array_size> [options]\n", argv[0]);
             printf("Example: mpirun -np 4 %s 10000000\n", argv[0]);
+            printf("Options:\n%s%s%s%s%s%s", SORT_OPTIONS_USAGE, MPI_OPTIONS_USAGE, INPUT_OPTIONS_USAGE,
+                   KEY_IO_OPTIONS_USAGE, OUTPUT_OPTIONS_USAGE, HYBRID_OPTIONS_USAGE);
         }
         MPI_Finalize();
         return 1;
     }
     
+    // Parse optional partition strategy and algorithm flags
+    for (int i = 2; i < argc; i++) {
+        int status = parseSortOption(argv[i], &sort_options);
+        if (status == 0) {
+            status = parseMpiOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseInputOption(argv[i], &input_spec);
+        }
+        if (status == 0) {
+            status = parseKeyIoOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseOutputOption(argv[i]);
+        }
+#ifdef _OPENMP
+        if (status == 0) {
+            status = parseOmpOption(argv[i]);
+        }
+#endif
+        if (status != 1) {
+            if (rank == 0) {
+                printf("Error: Unknown or invalid option '%s'\n", argv[i]);
+                printf("Options:\n%s%s%s%s%s%s", SORT_OPTIONS_USAGE, MPI_OPTIONS_USAGE, INPUT_OPTIONS_USAGE,
+                   KEY_IO_OPTIONS_USAGE, OUTPUT_OPTIONS_USAGE, HYBRID_OPTIONS_USAGE);
+            }
+            MPI_Finalize();
+            return 1;
+        }
+    }
+    
+    if (keyIoBegin() != 0) {
+        MPI_Finalize();
+        return 1;
+    }
+    reportBegin();
+    
     size = atoi(argv[1]);
+    if (merge_threads == 0) {
+        merge_threads = local_threads;
+    }
+    
+    // Validate input (with --input the size only caps the keys read, 0: all)
+    if (size < 0 || (size == 0 && key_input_path == NULL)) {
+        if (rank == 0) {
+            printf("Error: Array size must be positive!\n");
+        }
+        MPI_Finalize();
+        return 1;
+    }
+    
+    if (rank_weights != NULL && num_rank_weights != num_procs) {
+        if (rank == 0) {
+            printf("Error: --weights lists %d values but there are %d processes!\n",
+                   num_rank_weights, num_procs);
+        }
+        MPI_Finalize();
+        return 1;
+    }
     
-    // Validate input
-    if (size <= 0 || size % num_procs != 0) {
+    if (pipeline_chunks > 0 && mpi_algorithm == MPI_ALGORITHM_PSRS) {
         if (rank == 0) {
-            printf("Error: Array size must be positive and divisible by number of processes!\n");
-            printf("Array size: %d, Processes: %d\n", size, num_procs);
-            printf("Suggestion: Use size that's divisible by %d\n", num_procs);
+            printf("Error: --pipeline applies to --algorithm=merge only!\n");
         }
         MPI_Finalize();
         return 1;
     }
     
-    // Calculate local size for each process
-    local_size = size / num_procs;
+    // Sorted keys on stdout need the whole result on rank 0
+    if (key_output_path != NULL && strcmp(key_output_path, "-") == 0) {
+        gather_result = 1;
+    }
+    
+    // Keys from a file are read with MPI-IO by every rank (parallel_input),
+    // keys from stdin by rank 0, which then scatters them as usual
+    int parallel_input = (key_input_path != NULL && strcmp(key_input_path, "-") != 0);
+    MPI_File input_file;
+    double generate_time = 0.0;
+    double read_start = MPI_Wtime();
+    if (key_input_path != NULL) {
+        long long count = -1;
+        if (parallel_input) {
+            count = openKeyFile(key_input_path, size, &input_file, rank);
+        } else if (rank == 0) {
+            arr = loadKeys(key_input_path, size, &count);
+            if (arr != NULL && count > INT_MAX) {
+                printf("Error: %lld keys is more than this program can sort!\n", count);
+                count = -1;
+            }
+            if (arr == NULL) {
+                count = -1;
+            }
+        }
+        MPI_Bcast(&count, 1, MPI_LONG_LONG, 0, MPI_COMM_WORLD);
+        if (count <= 0) {
+            if (rank == 0) {
+                free(arr);
+            }
+            MPI_Finalize();
+            return 1;
+        }
+        size = (int)count;
+    }
+    
+    // Calibration sort: every rank's measured speed becomes its weight
+    if (calibrate_weights) {
+        double rate = calibrationRate(rank);
+        free(rank_weights);
+        rank_weights = (double*)malloc(num_procs * sizeof(double));
+        num_rank_weights = num_procs;
+        MPI_Allgather(&rate, 1, MPI_DOUBLE, rank_weights, 1, MPI_DOUBLE, MPI_COMM_WORLD);
+    }
+    
+    // Calculate each process's share (any size, optionally weighted)
+    counts = (int*)malloc(num_procs * sizeof(int));
+    displs = (int*)malloc((num_procs + 1) * sizeof(int));
+    computeDistribution(size, num_procs, rank_weights, counts, displs);
+    local_size = counts[rank];
     
-    // Master process generates array
+    // PSRS generates the input where it is sorted: every rank fills its own
+    // share with the counter-based generator (same keys as one generated
+    // array), so rank 0 needs the whole array only to gather the result
+    int local_input = (key_input_path == NULL && mpi_algorithm == MPI_ALGORITHM_PSRS);
+    int distributed = (mpi_algorithm == MPI_ALGORITHM_PSRS && !gather_result);
+    
+    // Master process generates array (or receives the result of a file read)
+    unsigned seed = (key_input_path != NULL) ? 0 : inputSeed(&input_spec);
+    if (local_input) {
+        // One seed for all shares (the clock may differ between ranks)
+        MPI_Bcast(&seed, 1, MPI_UNSIGNED, 0, MPI_COMM_WORLD);
+        input_spec.seed = seed;
+    }
+    const char* input_name = (key_input_path != NULL) ? keyInputName()
+                                                      : DISTRIBUTION_NAMES[input_spec.distribution];
     if (rank == 0) {
-        arr = (int*)malloc(size * sizeof(int));
-        if (arr == NULL) {
-            printf("Error: Memory allocation failed!\n");
-            MPI_Abort(MPI_COMM_WORLD, 1);
+        if (arr == NULL && !distributed) {
+            arr = (int*)malloc(size * sizeof(int));
+            if (arr == NULL) {
+                printf("Error: Memory allocation failed!\n");
+                MPI_Abort(MPI_COMM_WORLD, 1);
+            }
         }
         
-        srand(time(NULL));
-        printf("Generating random array...\n");
-        generateRandomArray(arr, size);
+        if (parallel_input) {
+            printf("Reading %d keys from %s with MPI-IO (%d processes)...\n",
+                   size, key_input_path, num_procs);
+        } else if (key_input_path != NULL) {
+            generate_time = MPI_Wtime() - read_start;
+            printf("Read %d keys from stdin\n", size);
+            printf("\nBefore Sorting (Sample elements): ");
+            printSampleElements(arr, size);
+        } else if (local_input) {
+            printf("Generating %s array (seed %u), every process its own share...\n", input_name, seed);
+        } else {
+            printf("Generating %s array (seed %u)...\n", input_name, seed);
+            double generate_start = MPI_Wtime();
+            generateRandomArray(arr, size);
+            generate_time = MPI_Wtime() - generate_start;
+            
+            printf("\nBefore Sorting (Sample elements): ");
+            printSampleElements(arr, size);
+        }
+        printf("Sorting with MPI %s (%d processes)...\n",
+               mpi_algorithm == MPI_ALGORITHM_PSRS ? "sample sort (PSRS)" : "quick sort + merge",
+               num_procs);
         
-        printf("\nBefore Sorting (Sample elements): ");
-        printSampleElements(arr, size);
-        printf("Sorting with MPI (%d processes)...\n", num_procs);
+        if (rank_weights != NULL) {
+            printf("Weighted distribution (%s):\n", calibrate_weights ? "calibrated" : "static");
+            for (int r = 0; r < num_procs; r++) {
+                printf("  Process %d: weight %.3g, %d elements\n", r, rank_weights[r], counts[r]);
+            }
+        }
     }
     
-    // Allocate local array for each process
-    local_arr = (int*)malloc(local_size * sizeof(int));
+    // Allocate local array for each process (at least one slot, shares may be empty)
+    local_arr = (int*)malloc((local_size > 0 ? local_size : 1) * sizeof(int));
     if (local_arr == NULL) {
         printf("Process %d: Memory allocation failed!\n", rank);
         MPI_Abort(MPI_COMM_WORLD, 1);
     }
     
-    // Start timing
-    MPI_Barrier(MPI_COMM_WORLD);
-    start_time = MPI_Wtime();
+    // Every rank reads its share of the key file
+    if (parallel_input) {
+        readKeyFile(&input_file, arr, local_arr, counts, displs, rank, num_procs);
+        MPI_Barrier(MPI_COMM_WORLD);
+        generate_time = MPI_Wtime() - read_start;
+    }
     
-    // Scatter data from master to all processes
-    MPI_Scatter(arr, local_size, MPI_INT, local_arr, local_size, MPI_INT, 0, MPI_COMM_WORLD);
+    // or generates its share of the input (PSRS)
+    if (local_input) {
+        double generate_start = MPI_Wtime();
+        generateKeyRange(local_arr, (size_t)displs[rank], (size_t)local_size, (size_t)size,
+                         &input_spec, local_threads);
+        MPI_Barrier(MPI_COMM_WORLD);
+        generate_time = MPI_Wtime() - generate_start;
+        if (rank == 0) {
+            printf("\nBefore Sorting (Rank 0 share, sample elements): ");
+            printSampleElements(local_arr, local_size);
+        }
+    }
     
-    // Each process sorts its local array
-    quickSort(local_arr, 0, local_size - 1);
+    // Checksum of the input, compared with the output's after the sort: over
+    // the shares a parallel read or generation placed, otherwise over rank 0's array
+    double checksum_start = MPI_Wtime();
+    KeyChecksum input_checksum = KEY_CHECKSUM_EMPTY;
+    if ((parallel_input && pipeline_chunks == 0) || local_input) {
+        input_checksum = checksumKeys(local_arr, (size_t)local_size, local_threads);
+    } else if (rank == 0) {
+        input_checksum = checksumKeys(arr, (size_t)size, local_threads);
+    }
+    allreduceChecksum(&input_checksum);
+    double checksum_time = MPI_Wtime() - checksum_start;
     
-    // Gather sorted arrays back to master
-    MPI_Gather(local_arr, local_size, MPI_INT, arr, local_size, MPI_INT, 0, MPI_COMM_WORLD);
+    // Start timing
+    MPI_Barrier(MPI_COMM_WORLD);
+    PROFILE_RESET();
+    PROFILE_PERF_START();
+    start_time = MPI_Wtime();
     
-    // Master merges all sorted chunks
-    if (rank == 0) {
-        // Simple iterative merge
-        int *temp = (int*)malloc(size * sizeof(int));
-        if (temp == NULL) {
-            printf("Error: Temp array allocation failed!\n");
-            MPI_Abort(MPI_COMM_WORLD, 1);
+    // Scatter data from master to all processes (the pipeline streams it
+    // instead, and a parallel file read or generation already placed every share)
+    if (pipeline_chunks == 0 && !parallel_input && !local_input) {
+        PROFILE_START(distribute_start);
+        MPI_Scatterv(arr, counts, displs, MPI_INT, local_arr, local_size, MPI_INT, 0, MPI_COMM_WORLD);
+        PROFILE_STOP(distribute_start, PHASE_DISTRIBUTE);
+        if (rank == 0) {
+            PROFILE_COUNT(COUNTER_BYTES_SENT, (long long)(size - local_size) * sizeof(int));
         }
+    }
+    
+    if (pipeline_chunks > 0) {
+        // Distribution, local sorts and collection overlap chunk by chunk
+        pipelinedSort(&arr, counts, displs, local_arr, rank, num_procs, pipeline_chunks);
+    } else if (mpi_algorithm == MPI_ALGORITHM_PSRS) {
+
+        // Sample sort: every rank ends up owning one globally ordered slice
+        slice_size = psrsSort(local_arr, local_size, &slice, rank, num_procs);
         
-        // Copy first chunk
-        for (int i = 0; i < local_size; i++) {
-            temp[i] = arr[i];
+        if (gather_result) {
+            gatherSlices(slice, slice_size, arr, rank, num_procs);
         }
-        
-        int current_size = local_size;
-        
-        // Merge remaining chunks one by one
-        for (int proc = 1; proc < num_procs; proc++) {
-            int *merged = (int*)malloc((current_size + local_size) * sizeof(int));
+    } else {
+        // Each process sorts its local array
+        localSort(local_arr, local_size);
+    
+        // Gather sorted arrays back to master
+        PROFILE_START(gather_start);
+        MPI_Gatherv(local_arr, local_size, MPI_INT, arr, counts, displs, MPI_INT, 0, MPI_COMM_WORLD);
+        PROFILE_STOP(gather_start, PHASE_GATHER);
+        if (rank != 0) {
+            PROFILE_COUNT(COUNTER_BYTES_SENT, (long long)local_size * sizeof(int));
+        }
+    
+        // Master merges all sorted chunks in a single k-way pass into one
+        // preallocated output (peak memory 2n instead of 3n)
+        if (rank == 0) {
+            int *merged = (int*)malloc(size * sizeof(int));
             if (merged == NULL) {
                 printf("Error: Merged array allocation failed!\n");
                 MPI_Abort(MPI_COMM_WORLD, 1);
             }
             
-            // Merge temp with next chunk
-            merge(merged, temp, current_size, 
-                  arr + proc * local_size, local_size);
+            kWayMergeParallel(arr, displs, num_procs, merged, merge_threads);
             
-            // Update current result
-            free(temp);
-            temp = merged;
-            current_size += local_size;
-        }
-        
-        // Copy final result back to arr
-        for (int i = 0; i < size; i++) {
-            arr[i] = temp[i];
+            free(arr);
+            arr = merged;
         }
-        
-        free(temp);
     }
     
-    // End timing
+    // End timing (the wait at the barrier shows the load imbalance)
+    PROFILE_START(barrier_start);
     MPI_Barrier(MPI_COMM_WORLD);
     end_time = MPI_Wtime();
+    PROFILE_STOP(barrier_start, PHASE_BARRIER);
+    PROFILE_PERF_STOP();
     
     
+    // A PSRS result that was not gathered is verified where it lives
+    int ordered = 0, permutation = 0;
+    int min_slice = 0, max_slice = 0;
+    double verify_start = MPI_Wtime();
+    if (distributed) {
+        ordered = isSortedDistributed(slice, slice_size, &input_checksum, &permutation, rank);
+        MPI_Reduce(&slice_size, &min_slice, 1, MPI_INT, MPI_MIN, 0, MPI_COMM_WORLD);
+        MPI_Reduce(&slice_size, &max_slice, 1, MPI_INT, MPI_MAX, 0, MPI_COMM_WORLD);
+    }
+    
+    // Sorted keys (--output): rank 0 writes a gathered result, every rank
+    // writes its own PSRS slice with MPI-IO otherwise
+    double write_time = 0.0;
+    if (key_output_path != NULL) {
+        double write_start = MPI_Wtime();
+        int write_status = 0;
+        if (distributed) {
+            write_status = writeKeySlices(key_output_path, slice, slice_size, size, rank);
+        } else if (rank == 0) {
+            write_status = writeKeys(key_output_path, arr, (size_t)size);
+        }
+        write_time = MPI_Wtime() - write_start;
+        if (write_status != 0) {
+            exit_status = 1;
+        }
+    }
+    
+#ifdef QUICKSORT_PROFILE
+    // One row per rank (its threads combined) on rank 0
+    double* rank_seconds = NULL;
+    long long* rank_counters = NULL;
+    gatherRankProfile(rank, num_procs, &rank_seconds, &rank_counters);
+#endif
+    
     if (rank == 0) {
-        printf("After sorting (Sample elements): ");
-        printSampleElements(arr, size);
-        
-        printf("\nVerifying sorted array...\n");
-        if (isSorted(arr, size)) {
-            printf("✓ SUCCESS: Array is correctly sorted!\n");
+        if (distributed) {
+            printf("Result distributed: slices of %d to %d elements per process\n",
+                   min_slice, max_slice);
+            printf("After sorting (Rank 0 slice, sample elements): ");
+            printSampleElements(slice, slice_size);
+            printf("\nVerifying distributed sorted array...\n");
         } else {
-            printf("✗ FAILED: Array is NOT correctly sorted!\n");
+            printf("After sorting (Sample elements): ");
+            printSampleElements(arr, size);
+            printf("\nVerifying sorted array...\n");
+            KeyChecksum output_checksum;
+            ordered = verifyKeys(arr, (size_t)size, &output_checksum, local_threads);
+            permutation = checksumEqual(&input_checksum, &output_checksum);
         }
+        double verify_time = MPI_Wtime() - verify_start + checksum_time;
+        int sorted_ok = ordered && permutation;
+        
+        printVerification(ordered, permutation);
         
         double time_taken = end_time - start_time;
         
@@ -224,16 +1176,68 @@ int main(int argc, char* argv[]) {
         printf("======================\n\n");
         printf("Array Size:  %d elements\n", size);
         printf("Number of Processes: %d\n", num_procs);
+#ifdef _OPENMP
+        printf("Threads per Process: %d\n", local_threads);
+        printf("Merge Threads: %d\n", merge_threads);
+        printf("Total Cores Used: %d\n", num_procs * local_threads);
+        if (thread_support < MPI_THREAD_FUNNELED) {
+            printf("Warning: MPI library does not report MPI_THREAD_FUNNELED support\n");
+        }
+#else
+        if (local_threads > 1 || merge_threads > 1) {
+            printf("Threads per Process: 1 (built without OpenMP; use make hybrid)\n");
+        }
+#endif
+        if (!use_radix && sort_options.leaf == LEAF_NETWORK) {
+            printf(LEAF_SORT_FORMAT, LEAF_SORT_ARGS(&sort_options));
+        }
         printf("Execution Time:  %.6f seconds\n", time_taken);
         printf("Elements/second: %.2f million\n", (size / time_taken) / 1000000.0);
+        printf("Verification Time: %.6f seconds (order + permutation checksum)\n", verify_time);
+        if (key_output_path != NULL && exit_status == 0) {
+            printf("Wrote %d keys to %s%s\n", size,
+                   (strcmp(key_output_path, "-") == 0) ? "stdout" : key_output_path,
+                   distributed ? " with MPI-IO" : "");
+        }
+        
+        // Machine-readable record (--json / --csv)
+        const char* algorithm = (mpi_algorithm == MPI_ALGORITHM_PSRS) ? "sample sort (PSRS)"
+                              : (pipeline_chunks > 0) ? "pipelined quick sort + merge"
+                              : "quick sort + merge";
+        RunRecord record = { "mpi", algorithm, input_name,
+                             size, num_procs, local_threads, seed,
+                             time_taken, sorted_ok, 0, {0}, {0} };
+        reportPhase(&record, key_input_path != NULL ? "read" : "generate", generate_time);
+        reportPhase(&record, "sort", time_taken);
+        reportPhase(&record, "verify", verify_time);
+        if (key_output_path != NULL) {
+            reportPhase(&record, "write", write_time);
+        }
+        
+#ifdef QUICKSORT_PROFILE
+        // Per-rank phase breakdown and counters
+        profilePrint("Rank", rank_seconds, rank_counters, num_procs);
+        profileRecord(&record, rank_seconds, rank_counters, num_procs);
+#endif
         printf("-------------------------------------------------------\n");
+        if (reportWrite(&record) != 0) {
+            exit_status = 1;
+        }
         
         free(arr);
     }
     
     free(local_arr);
+    free(slice);
+    free(counts);
+    free(displs);
+    free(rank_weights);
+#ifdef QUICKSORT_PROFILE
+    free(rank_seconds);
+    free(rank_counters);
+#endif
     
     // Finalize MPI
     MPI_Finalize();
-    return 0;
+    return exit_status;
 }
\ No newline at end of file
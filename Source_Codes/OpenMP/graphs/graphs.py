@@ -1,10 +1,30 @@
+import csv
+import os
+import sys
+
 import matplotlib.pyplot as plt
 
-# Updated Performance data using Serial baseline
-threads = [1, 2, 4, 8, 16]
-execution_time = [0.693676, 0.625962, 0.363606, 0.202783, 0.137115]
-throughput = [14.42, 15.98, 27.50, 49.31, 72.93]
-serial_time = 1.512392  # baseline serial execution time
+# Results store written by Benchmark/benchmark.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Benchmark'))
+import results_store
+import scaling
+
+# Array size to plot (python3 graphs.py [size])
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+SIZE_LABEL = f"{SIZE / 1e6:g} Million Elements"
+
+# Median times per thread count and the serial baseline from the results store
+rows = results_store.select('openmp', size=SIZE)
+if not rows:
+    sys.exit(f"No OpenMP results for {SIZE} elements - run Benchmark/benchmark.py first")
+threads = [r['workers'] for r in rows]
+execution_time = [r['median_s'] for r in rows]
+throughput = [r['throughput_meps'] for r in rows]
+serial_time, estimated = results_store.baseline(SIZE)
+if serial_time is None:
+    sys.exit("No serial results in the store - run Benchmark/benchmark.py -i serial first")
+if estimated:
+    print(f"Serial baseline scaled from another array size: {serial_time:.6f}s (estimated)")
 
 # Calculate speedup and efficiency using Serial baseline
 speedup = []
@@ -15,7 +35,10 @@ for i in range(len(threads)):
     eff = (sp / threads[i]) * 100
     efficiency.append(eff)
 
-ideal_speedup = [1, 2, 4, 8, 16]
+# Karp-Flatt serial fraction of every run (NaN for one thread), see Benchmark/scaling.py
+karp_flatt = scaling.karp_flatt(speedup, threads)
+
+ideal_speedup = threads
 
 print("Generating graphs with colored labels using serial baseline...")
 
@@ -24,7 +47,7 @@ fig1, ax1 = plt.subplots(figsize=(10, 6))
 ax1.plot(threads, execution_time, marker='o', linewidth=3, markersize=10, color='#2E86AB')
 ax1.set_xlabel('Number of Threads', fontsize=14, fontweight='bold')
 ax1.set_ylabel('Execution Time (seconds)', fontsize=14, fontweight='bold')
-ax1.set_title('Threads vs Execution Time\n(10 Million Elements)', fontsize=16, fontweight='bold')
+ax1.set_title(f'Threads vs Execution Time\n({SIZE_LABEL})', fontsize=16, fontweight='bold')
 ax1.grid(True, alpha=0.3)
 ax1.set_xticks(threads)
 
@@ -47,7 +70,7 @@ ax2.plot(threads, ideal_speedup, linestyle='--', linewidth=3, color='#F18F01',
          alpha=0.8, label='Ideal Linear', zorder=2)
 ax2.set_xlabel('Number of Threads', fontsize=14, fontweight='bold')
 ax2.set_ylabel('Speedup (times)', fontsize=14, fontweight='bold')
-ax2.set_title('Threads vs Speedup\n(10 Million Elements)', fontsize=16, fontweight='bold')
+ax2.set_title(f'Threads vs Speedup\n({SIZE_LABEL})', fontsize=16, fontweight='bold')
 ax2.grid(True, alpha=0.3)
 ax2.set_xticks(threads)
 ax2.legend(fontsize=12)
@@ -68,7 +91,7 @@ fig3, ax3 = plt.subplots(figsize=(10, 6))
 bars = ax3.bar(threads, efficiency, color='#06A77D', alpha=0.8, edgecolor='black', linewidth=1.5)
 ax3.set_xlabel('Number of Threads', fontsize=14, fontweight='bold')
 ax3.set_ylabel('Efficiency (%)', fontsize=14, fontweight='bold')
-ax3.set_title('Threads vs Efficiency\n(10 Million Elements)', fontsize=16, fontweight='bold')
+ax3.set_title(f'Threads vs Efficiency\n({SIZE_LABEL})', fontsize=16, fontweight='bold')
 ax3.grid(True, alpha=0.3, axis='y')
 ax3.set_xticks(threads)
 ax3.set_ylim([0, 250])
@@ -87,7 +110,7 @@ print("✓ Graph 3: graph3_threads_vs_efficiency.png")
 
 # Combined Graph
 fig, axes = plt.subplots(1, 2, figsize=(20, 6))
-fig.suptitle('OpenMP QuickSort Performance Analysis (10 Million Elements)', 
+fig.suptitle(f'OpenMP QuickSort Performance Analysis ({SIZE_LABEL})', 
              fontsize=18, fontweight='bold')
 
 # Time
@@ -128,16 +151,23 @@ print("Combined: execution time and speedup.png")
 print("\n" + "="*60)
 print("PERFORMANCE SUMMARY")
 print("="*60)
-print(f"Array Size: 10,000,000 elements\n")
-print(f"{'Threads':<10} {'Time (s)':<12} {'Speedup':<12} {'Efficiency':<12}")
+print(f"Array Size: {SIZE:,} elements\n")
+print(f"{'Threads':<10} {'Time (s)':<12} {'Speedup':<12} {'Efficiency':<12} {'Karp-Flatt':<12}")
 print("-" * 60)
-for t, time, sp, eff in zip(threads, execution_time, speedup, efficiency):
-    print(f"{t:<10} {time:<12.6f} {sp:<12.2f} {eff:<12.2f}%")
+for t, time, sp, eff, kf in zip(threads, execution_time, speedup, efficiency, karp_flatt):
+    print(f"{t:<10} {time:<12.6f} {sp:<12.2f} {eff:<11.2f}% {kf:<12.4f}")
 print("="*60)
 print(f"\nBest Speedup: {max(speedup):.2f}x with {threads[speedup.index(max(speedup))]} threads")
 print(f"Best Efficiency: {max(efficiency):.2f}% with {threads[efficiency.index(max(efficiency))]} threads")
 print(f"Peak Throughput: {max(throughput):.2f} million elements/second")
 print(f"Time Reduction: {((execution_time[0] - execution_time[-1]) / execution_time[0] * 100):.1f}%")
+fits = scaling.fit(scaling.measurements(scaling.load()))
+fits = fits[(fits['implementation'] == 'openmp') & (fits['options'] == '')
+            & (fits['distribution'] == 'random') & (fits['size'] == SIZE)]
+if not fits.empty:
+    model = fits.iloc[0]
+    print(f"Scaling Model: T(p) = {model['a']:.4f} + {model['b']:.4f}/p + {model['c']:.4f}(p-1) s "
+          f"(Amdahl serial fraction {model['amdahl_fraction']:.3f})")
 print("="*60)
 print("\nAll 4 graphs generated successfully!")
 
@@ -1,107 +1,164 @@
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <time.h>
 #include <omp.h>
+#include "../Common/omp_sort.h"
+#include "../Common/typed_sort.h"
+#include "../Common/report.h"
+#include "../Common/generate.h"
+#include "../Common/keyio.h"
+#include "../Common/verify.h"
+#include "../Common/numa.h"
+#include "../Common/segment_sort.h"
 
-// Minimum size for creating parallel tasks
-#define TASK_THRESHOLD 10000
+// Partition strategy selected on the command line
+SortOptions sort_options = SORT_OPTIONS_DEFAULT;
 
-// Function to swap two elements
-void swap(int* a, int* b) {
-    int temp = *a;
-    *a = *b;
-    *b = temp;
-}
+// Key type selected with --key-type (-1: the int sorter configured above)
+int key_type = -1;
+
+// Input distribution, seed and key range (keys 0-99999 by default)
+InputSpec input_spec = INPUT_SPEC_DEFAULT(100000);
 
-// Partition function
-int partition(int arr[], int low, int high) {
-    int pivot = arr[high];  // Choose rightmost element as pivot
-    int i = low - 1;        // Index of smaller element
+// Task threshold for a typed sort of n keys, chosen like chooseTaskGranularity
+// (returns n, i.e. no tasks, for a single thread)
+size_t typedTaskThreshold(size_t n, int num_threads) {
+    int threads = (num_threads > 0) ? num_threads : omp_get_max_threads();
+    size_t threshold = n / ((size_t)TASKS_PER_THREAD * threads);
     
-    for (int j = low; j < high; j++) {
-        // If current element is smaller than pivot
-        if (arr[j] < pivot) {
-            i++;
-            swap(&arr[i], &arr[j]);
-        }
+    if (num_threads > 0) {
+        omp_set_num_threads(num_threads);
     }
-    swap(&arr[i + 1], &arr[high]);
-    return i + 1;
+    if (threads <= 1) return n;
+    return (threshold < TASK_THRESHOLD_MIN) ? TASK_THRESHOLD_MIN : threshold;
 }
 
-// Serial Quick Sort
-void quickSortSerial(int arr[], int low, int high) {
-    if (low < high) {
-        int pi = partition(arr, low, high);
-        quickSortSerial(arr, low, pi - 1);
-        quickSortSerial(arr, pi + 1, high);
-    }
+// Sort n typed keys in place, moving an optional payload along with them
+// (exported for the Python engine; see Common/typed_sort.h for the type codes)
+// num_threads <= 0 uses the OpenMP default; returns 0, or -1 for an unknown type
+int sortTyped(void* keys, void* values, size_t n, int type, int payload_type, int num_threads) {
+    return typedSort(keys, values, n, type, payload_type, typedTaskThreshold(n, num_threads));
 }
 
-// Parallel Quick Sort using OpenMP tasks
-void quickSortParallel(int arr[], int low, int high) {
-    if (low < high) {
-        int pi = partition(arr, low, high);
-        
-        // Calculate subarray sizes
-        int left_size = pi - low;
-        int right_size = high - pi;
-        
-        // If subarrays are large enough, create parallel tasks
-        if (left_size > TASK_THRESHOLD && right_size > TASK_THRESHOLD) {
-            #pragma omp task shared(arr) firstprivate(low, pi)
-            {
-                quickSortParallel(arr, low, pi - 1);
-            }
-            
-            #pragma omp task shared(arr) firstprivate(pi, high)
-            {
-                quickSortParallel(arr, pi + 1, high);
-            }
-            
-            #pragma omp taskwait
-        }
-        // If only left subarray is large, parallelize left only
-        else if (left_size > TASK_THRESHOLD) {
-            #pragma omp task shared(arr) firstprivate(low, pi)
-            {
-                quickSortParallel(arr, low, pi - 1);
-            }
-            quickSortSerial(arr, pi + 1, high);
-            #pragma omp taskwait
-        }
-        // If only right subarray is large, parallelize right only
-        else if (right_size > TASK_THRESHOLD) {
-            quickSortSerial(arr, low, pi - 1);
-            #pragma omp task shared(arr) firstprivate(pi, high)
-            {
-                quickSortParallel(arr, pi + 1, high);
-            }
-            #pragma omp taskwait
-        }
-        // Both subarrays are small, use serial sort
-        else {
-            quickSortSerial(arr, low, pi - 1);
-            quickSortSerial(arr, pi + 1, high);
+// Fill index with the permutation that sorts n typed keys (keys are not modified)
+// returns 0, or -1 for an unknown type or allocation failure
+int argSortTyped(const void* keys, uint64_t* index, size_t n, int type, int num_threads) {
+    return typedArgSort(keys, index, n, type, typedTaskThreshold(n, num_threads));
+}
+
+// Function to generate the input array in parallel (--distribution, --seed, --range)
+void generateRandomArray(int arr[], int size, int num_threads) {
+    generateKeys(arr, (size_t)size, &input_spec, num_threads);
+}
+
+// Check the order of n typed keys in parallel: every thread checks one block
+// and the first key of the next
+int isSortedTyped(const void* keys, size_t n, int type, int num_threads) {
+    size_t key_size = typedKeySize(type);
+    int sorted = 1;
+    
+    #pragma omp parallel for schedule(static) reduction(&&:sorted) num_threads(num_threads)
+    for (int t = 0; t < num_threads; t++) {
+        size_t begin = n * t / num_threads;
+        size_t end = n * (t + 1) / num_threads;
+        if (end < n) end++;
+        if (end > begin) {
+            sorted = typedIsSorted((const char*)keys + begin * key_size, end - begin, type) && sorted;
         }
     }
+    return sorted;
 }
 
-// Function to generate random array
-void generateRandomArray(int arr[], int size) {
-    for (int i = 0; i < size; i++) {
-        arr[i] = rand() % 100000;  // 0-99999 range 
+// Fill n keys of the given type following input_spec in parallel
+// (64-bit keys get five more random low digits, float keys a random fraction)
+void generateTypedArray(void* keys, size_t n, int type, int num_threads) {
+    inputPrepare(&input_spec);
+    
+    #pragma omp parallel for schedule(static) num_threads(num_threads)
+    for (size_t i = 0; i < n; i++) {
+        int value = inputKey(&input_spec, i, n);
+        uint64_t bits = genRandom(input_spec.seed, i, 1);
+        switch (type) {
+            case KEY_INT32: ((int32_t*)keys)[i] = value; break;
+            case KEY_INT64: ((int64_t*)keys)[i] = (int64_t)value * 100000 + genBelow(bits, 100000); break;
+            case KEY_UINT32: ((uint32_t*)keys)[i] = (uint32_t)value; break;
+            case KEY_UINT64: ((uint64_t*)keys)[i] = (uint64_t)value * 100000 + genBelow(bits, 100000); break;
+            case KEY_FLOAT: ((float*)keys)[i] = (float)(value + genUnit(bits)); break;
+            case KEY_DOUBLE: ((double*)keys)[i] = value + genUnit(bits); break;
+        }
     }
 }
 
-// Function to verify if array is sorted
-int isSorted(int arr[], int size) {
-    for (int i = 0; i < size - 1; i++) {
-        if (arr[i] > arr[i + 1]) {
-            return 0;
-        }
+// Generate, sort and verify size typed keys (--key-type); returns the exit status
+int runTypedSort(size_t size, int num_threads) {
+    size_t key_size = typedKeySize(key_type);
+    void* keys = numaAlloc(size * key_size);
+    
+    if (keys == NULL) {
+        printf("Error: Memory allocation failed!\n");
+        return 1;
     }
-    return 1;
+    
+    unsigned seed = inputSeed(&input_spec);
+    printf("Generating %s %s array (seed %u)...\n", DISTRIBUTION_NAMES[input_spec.distribution],
+           KEY_TYPE_NAMES[key_type], seed);
+    double generate_start = omp_get_wtime();
+    generateTypedArray(keys, size, key_type, num_threads);
+    double generate_time = omp_get_wtime() - generate_start;
+    
+    // Checksum of the input, compared with the output's after the sort
+    double checksum_start = omp_get_wtime();
+    KeyChecksum input_checksum = checksumBytes(keys, size, key_size, num_threads);
+    double checksum_time = omp_get_wtime() - checksum_start;
+    
+    printf("Sorting %s keys with OpenMP quick sort (%d threads)...\n",
+           KEY_TYPE_NAMES[key_type], num_threads);
+    
+    double start = omp_get_wtime();
+    sortTyped(keys, NULL, size, key_type, PAYLOAD_NONE, num_threads);
+    double time_taken = omp_get_wtime() - start;
+    
+    printf("\nVerifying sorted array...\n");
+    double verify_start = omp_get_wtime();
+    int ordered = isSortedTyped(keys, size, key_type, num_threads);
+    KeyChecksum output_checksum = checksumBytes(keys, size, key_size, num_threads);
+    int permutation = checksumEqual(&input_checksum, &output_checksum);
+    int sorted = ordered && permutation;
+    double verify_time = omp_get_wtime() - verify_start + checksum_time;
+    
+    // Machine-readable record (--json / --csv)
+    char algorithm[64];
+    snprintf(algorithm, sizeof(algorithm), "typed quick sort (%s)", KEY_TYPE_NAMES[key_type]);
+    RunRecord record = { "openmp", algorithm, DISTRIBUTION_NAMES[input_spec.distribution],
+                         (long long)size, num_threads, 1, seed,
+                         time_taken, sorted, 0, {0}, {0} };
+    reportPhase(&record, "generate", generate_time);
+    reportPhase(&record, "sort", time_taken);
+    reportPhase(&record, "verify", verify_time);
+    
+    printVerification(ordered, permutation);
+    if (!sorted) {
+        free(keys);
+        reportWrite(&record);
+        return 1;
+    }
+    
+    printf("\n======================\n");
+    printf("Performance Results\n");
+    printf("======================\n");
+    printf("\nArray Size:  %zu elements\n", size);
+    printf("Key Type: %s (%zu bytes)\n", KEY_TYPE_NAMES[key_type], key_size);
+    printf("Number of Threads: %d\n", num_threads);
+    printf("Execution Time:  %.6f seconds\n", time_taken);
+    printf("Elements/second: %.2f million\n", (size / time_taken) / 1000000.0);
+    printf("Verification Time: %.6f seconds (order + permutation checksum)\n", verify_time);
+    if (numaReportWanted()) {
+        numaReport(keys, size * key_size, num_threads, &record);
+    }
+    printf("-------------------------------------------------------\n");
+    free(keys);
+    return reportWrite(&record) == 0 ? 0 : 1;
 }
 
 // Function to print sample elements
@@ -115,23 +172,80 @@ void printSampleElements(int arr[], int size) {
     printf("...\n");
 }
 
+// Offsets of num_segments segments of random sizes covering keys[0..size-1]
+// (sorted random cut points, so the sizes vary from 0 to many times the mean)
+int* makeSegmentOffsets(int size, int num_segments, unsigned seed) {
+    int* offsets = (int*)malloc(((size_t)num_segments + 1) * sizeof(int));
+    
+    if (offsets == NULL) {
+        return NULL;
+    }
+    offsets[0] = 0;
+    for (int s = 1; s < num_segments; s++) {
+        offsets[s] = genBelow(genRandom(seed, (size_t)s, 2), size + 1);
+    }
+    offsets[num_segments] = size;
+    introSort(offsets, 1, num_segments - 1, &DISPATCH_QUICKSORT_OPTIONS);
+    return offsets;
+}
+
+#ifndef QUICKSORT_NO_MAIN
 int main(int argc, char* argv[]) {
     int size;
     int num_threads;
     
     // Check command line arguments
-    if (argc != 3) {
-        printf("Usage: %s <array_size> <num_threads>\n", argv[0]);
-        printf("Example: %s 1000000 4\n", argv[0]);
+    if (argc < 3) {
+        printf("Usage: %s <array_size> <num_threads> [options]\n", argv[0]);
+        printf("Example: %s 1000000 4 --pivot=ninther --introsort\n", argv[0]);
+        printf("Options:\n%s%s%s%s%s%s%s%s", SORT_OPTIONS_USAGE, OMP_OPTIONS_USAGE, NUMA_OPTIONS_USAGE, SEGMENT_OPTIONS_USAGE,
+               KEY_TYPE_USAGE, INPUT_OPTIONS_USAGE, KEY_IO_OPTIONS_USAGE, OUTPUT_OPTIONS_USAGE);
+        return 1;
+    }
+    
+    // Parse optional partition strategy flags
+    for (int i = 3; i < argc; i++) {
+        int status = parseSortOption(argv[i], &sort_options);
+        if (status == 0) {
+            status = parseOmpOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseNumaOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseSegmentOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseKeyTypeOption(argv[i], &key_type);
+        }
+        if (status == 0) {
+            status = parseInputOption(argv[i], &input_spec);
+        }
+        if (status == 0) {
+            status = parseKeyIoOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseOutputOption(argv[i]);
+        }
+        if (status != 1) {
+            printf("Error: Unknown or invalid option '%s'\n", argv[i]);
+            printf("Options:\n%s%s%s%s%s%s%s%s", SORT_OPTIONS_USAGE, OMP_OPTIONS_USAGE, NUMA_OPTIONS_USAGE, SEGMENT_OPTIONS_USAGE,
+               KEY_TYPE_USAGE, INPUT_OPTIONS_USAGE, KEY_IO_OPTIONS_USAGE, OUTPUT_OPTIONS_USAGE);
+            return 1;
+        }
+    }
+    
+    if (keyIoBegin() != 0) {
         return 1;
     }
+    reportBegin();
     
     // Get array size and thread count from arguments
     size = atoi(argv[1]);
     num_threads = atoi(argv[2]);
     
-    // Validate input
-    if (size <= 0) {
+    // Validate input (with --input the size only caps the keys read, 0: all)
+    if (size < 0 || (size == 0 && key_input_path == NULL)) {
         printf("Error: Array size must be positive!\n");
         return 1;
     }
@@ -141,44 +255,117 @@ int main(int argc, char* argv[]) {
         return 1;
     }
     
-    // Set number of threads
+    // Set number of threads (pinned with --bind or --numa before they touch the keys)
     omp_set_num_threads(num_threads);
+    numaBindThreads(num_threads);
     
-    // Allocate memory for array
-    int* arr = (int*)malloc(size * sizeof(int));
-    
-    if (arr == NULL) {
-        printf("Error: Memory allocation failed!\n");
-        return 1;
+    if (key_type >= 0) {
+        if (segment_count > 0) {
+            printf("Error: --segments sorts int keys; it does not combine with --key-type!\n");
+            return 1;
+        }
+        if (key_input_path != NULL || key_output_path != NULL) {
+            printf("Error: --input and --output hold int keys; they do not combine with --key-type!\n");
+            return 1;
+        }
+        return runTypedSort((size_t)size, num_threads);
     }
     
-    // Seed random number generator
-    srand(time(NULL));
-    
-  
-    printf("Generating random array...\n");
-    generateRandomArray(arr, size);
+    int* arr;
+    unsigned seed = 0;
+    const char* input_name;
+    double generate_start = omp_get_wtime();
+    if (key_input_path != NULL) {
+        // Keys from a file (mapped, sorted in place) or stdin
+        long long count;
+        printf("Reading keys from %s...\n", (strcmp(key_input_path, "-") == 0) ? "stdin" : key_input_path);
+        arr = loadKeys(key_input_path, size, &count);
+        if (arr == NULL) {
+            return 1;
+        }
+        if (count > 2147483647LL) {
+            printf("Error: %lld keys is more than this program can sort!\n", count);
+            releaseKeys(arr);
+            return 1;
+        }
+        size = (int)count;
+        input_name = keyInputName();
+        
+        // NUMA mode: copy the keys into blocks placed on the nodes of their threads
+        if (numa_mode) {
+            int* placed = (int*)numaAlloc((size_t)size * sizeof(int));
+            if (placed != NULL) {
+                numaCopyKeys(placed, arr, (size_t)size, num_threads);
+                releaseKeys(arr);
+                arr = placed;
+            }
+        }
+    } else {
+        // Allocate memory for array (aligned and placed by first touch with --numa)
+        arr = (int*)numaAlloc((size_t)size * sizeof(int));
+        
+        if (arr == NULL) {
+            printf("Error: Memory allocation failed!\n");
+            return 1;
+        }
+        
+        // Seed of the input generator
+        seed = inputSeed(&input_spec);
+        
+        printf("Generating %s array (seed %u)...\n", DISTRIBUTION_NAMES[input_spec.distribution], seed);
+        generateRandomArray(arr, size, num_threads);
+        input_name = DISTRIBUTION_NAMES[input_spec.distribution];
+    }
+    double generate_time = omp_get_wtime() - generate_start;
     
     
     printf("\nBefore Sorting (Sample elements): ");
     printSampleElements(arr, size);
     
     
-    printf("Sorting with OpenMP (%d threads)...\n", num_threads);
+    // Checksum of the input, compared with the output's after the sort
+    double checksum_start = omp_get_wtime();
+    KeyChecksum input_checksum = checksumKeys(arr, (size_t)size, num_threads);
+    double checksum_time = omp_get_wtime() - checksum_start;
+    
+    // Segmented sort (--segments): offsets of the segments, built before the timer
+    int* offsets = NULL;
+    int batch = 0, calls = 0;
+    if (segment_count > 0) {
+        offsets = makeSegmentOffsets(size, segment_count, seed);
+        if (offsets == NULL) {
+            printf("Error: Memory allocation failed!\n");
+            releaseKeys(arr);
+            return 1;
+        }
+        batch = (segment_batch > 0 && segment_batch < segment_count) ? segment_batch : segment_count;
+        printf("Sorting %d segments with OpenMP segmented sort (%d threads, %d per call)...\n",
+               segment_count, num_threads, batch);
+    } else {
+        printf("Sorting with OpenMP %s (%d threads)...\n", ALGORITHM_NAMES[sort_algorithm], num_threads);
+    }
     
     // Measure execution time
+    PROFILE_RESET();
+    PROFILE_PERF_START();
     double start = omp_get_wtime();
     
-    // Start parallel region and create initial task
-    #pragma omp parallel
-    {
-        #pragma omp single
-        {
-            quickSortParallel(arr, 0, size - 1);
+    if (offsets != NULL) {
+        for (int first = 0; first < segment_count; first += batch, calls++) {
+            int count = (segment_count - first < batch) ? segment_count - first : batch;
+            if (sortSegments(arr, offsets + first, count, num_threads) != 0) {
+                printf("Error: Segmented sort failed (invalid offsets or out of memory)!\n");
+                free(offsets);
+                releaseKeys(arr);
+                return 1;
+            }
         }
+    } else {
+        sortParallel(arr, size, num_threads);
     }
     
     double end = omp_get_wtime();
+    PROFILE_PERF_STOP();
     double time_taken = end - start;
     
     
@@ -187,11 +374,33 @@ int main(int argc, char* argv[]) {
     
     
     printf("\nVerifying sorted array...\n");
-    if (isSorted(arr, size)) {
-        printf("✓ SUCCESS: Array is correctly sorted!\n");
-    } else {
-        printf("✗ FAILED: Array is NOT correctly sorted!\n");
-        free(arr);
+    double verify_start = omp_get_wtime();
+    KeyChecksum output_checksum;
+    int ordered = verifyKeys(arr, (size_t)size, &output_checksum, num_threads);
+    if (offsets != NULL) {
+        // Only each segment is in order (the checksum still covers all keys)
+        ordered = segmentsSorted(arr, offsets, segment_count, num_threads);
+    }
+    int permutation = checksumEqual(&input_checksum, &output_checksum);
+    int sorted = ordered && permutation;
+    double verify_time = omp_get_wtime() - verify_start + checksum_time;
+    
+    // Machine-readable record (--json / --csv)
+    const char* algorithm = (offsets != NULL) ? "segmented sort"
+                          : (sort_algorithm == ALGORITHM_AUTO) ? ENGINE_NAMES[dispatch_engine]
+                                                               : ALGORITHM_NAMES[sort_algorithm];
+    RunRecord record = { "openmp", algorithm, input_name,
+                         size, num_threads, 1, seed,
+                         time_taken, sorted, 0, {0}, {0} };
+    reportPhase(&record, key_input_path != NULL ? "read" : "generate", generate_time);
+    reportPhase(&record, "sort", time_taken);
+    reportPhase(&record, "verify", verify_time);
+    
+    printVerification(ordered, permutation);
+    if (!sorted) {
+        free(offsets);
+        releaseKeys(arr);
+        reportWrite(&record);
         return 1;
     }
     
@@ -201,12 +410,61 @@ int main(int argc, char* argv[]) {
     printf("======================\n");
     printf("\nArray Size:  %d elements\n", size);
     printf("Number of Threads: %d\n", num_threads);
+    if (offsets != NULL) {
+        int largest = 0;
+        for (int s = 0; s < segment_count; s++) {
+            if (offsets[s + 1] - offsets[s] > largest) largest = offsets[s + 1] - offsets[s];
+        }
+        printf("Segments: %d (mean %.1f, largest %d elements)\n",
+               segment_count, (double)size / segment_count, largest);
+        printf("Calls: %d (%d segments each, last batch: %d chunks, %d team-sorted)\n",
+               calls, batch, segment_chunks, segment_team_sorted);
+        reportCounter(&record, "segments", segment_count);
+        reportCounter(&record, "calls", calls);
+    } else if (sort_algorithm == ALGORITHM_QUICKSORT) {
+        printf("Task Threshold: %d elements\n", active_task_threshold);
+        printf("Task Depth Limit: %d\n", active_task_depth_limit);
+        printf("Tasks Created: %ld\n", tasks_created);
+    }
+    if ((sort_algorithm == ALGORITHM_QUICKSORT || sort_algorithm == ALGORITHM_SAMPLESORT)
+            && sort_options.leaf == LEAF_NETWORK) {
+        printf(LEAF_SORT_FORMAT, LEAF_SORT_ARGS(&sort_options));
+    }
+    if (sort_algorithm == ALGORITHM_RADIX) {
+        printf(RADIX_PLAN_FORMAT, RADIX_PLAN_ARGS);
+    } else if (sort_algorithm == ALGORITHM_AUTO) {
+        printf("Dispatch: %s (%s)\n", ENGINE_NAMES[dispatch_engine], dispatch_reason);
+    }
     printf("Execution Time:  %.6f seconds\n", time_taken);
     printf("Elements/second: %.2f million\n", (size / time_taken) / 1000000.0);
+    if (offsets != NULL) {
+        printf("Segments/second: %.2f million\n", (segment_count / time_taken) / 1000000.0);
+    }
+    printf("Verification Time: %.6f seconds (order + permutation checksum)\n", verify_time);
+    if (numaReportWanted()) {
+        numaReport(arr, (size_t)size * sizeof(int), num_threads, &record);
+    }
+    
+    // Sorted keys (--output)
+    if (key_output_path != NULL) {
+        double write_start = omp_get_wtime();
+        if (writeKeys(key_output_path, arr, (size_t)size) != 0) {
+            free(offsets);
+            releaseKeys(arr);
+            return 1;
+        }
+        reportPhase(&record, "write", omp_get_wtime() - write_start);
+        printf("Wrote %d keys to %s\n", size, (strcmp(key_output_path, "-") == 0) ? "stdout" : key_output_path);
+    }
+    
+    // Per-thread phase breakdown and counters (profiling builds only)
+    PROFILE_REPORT(&record);
     printf("-------------------------------------------------------\n");
     
-    // Free allocated memory
-    free(arr);
+    // Free allocated memory (or unmap the input file)
+    free(offsets);
+    releaseKeys(arr);
     
-    return 0;
-}
\ No newline at end of file
+    return reportWrite(&record) == 0 ? 0 : 1;
+}
+#endif // QUICKSORT_NO_MAIN
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""In-process access to the Serial and OpenMP quick sorts.
+
+The C sorters are loaded from the shared libraries built by the Makefile in
+this directory.  Arrays are sorted in place through their data pointer, so no
+copy is made, and ctypes releases the GIL for the duration of every call.
+The C engine keeps its settings and statistics in process-wide globals and
+is not re-entrant, so engine calls from several Python threads take turns
+on a module lock; other Python code keeps running meanwhile.
+"""
+import ctypes
+import os
+import threading
+
+import numpy as np
+
+LIB_DIR = os.path.dirname(os.path.abspath(__file__))
+SERIAL_LIB = 'libquicksort_serial.so'
+OMP_LIB = 'libquicksort_omp.so'
+
+# Largest element count the C code can index with an int
+MAX_SIZE = 2**31 - 1
+
+# Names accepted by configure(), mapped to the enums in Common/partition.h
+PIVOTS = {'last': 0, 'median3': 1, 'ninther': 2}
+PARTITIONS = {'lomuto': 0, '3way': 1, 'block': 2}
+LEAVES = {'insertion': 0, 'network': 1}
+ALGORITHMS = {'quicksort': 0, 'samplesort': 1, 'radix': 2, 'auto': 3}
+
+# Engines the 'auto' algorithm can pick, indexed by SortEngine in Common/dispatch.h
+ENGINES = ('insertion', 'quicksort', 'tasks', 'counting', 'radix', 'run_merge')
+
+# Key dtypes of the typed sorts, mapped to KeyType in Common/typed_sort.h
+KEY_TYPES = {np.dtype(np.int32): 0, np.dtype(np.int64): 1, np.dtype(np.uint32): 2,
+             np.dtype(np.uint64): 3, np.dtype(np.float32): 4, np.dtype(np.float64): 5}
+
+# Payload item size in bytes, mapped to PayloadType in Common/typed_sort.h
+PAYLOAD_TYPES = {4: 1, 8: 2}
+
+_libs = {}
+# Held for every call into the C libraries (loading, settings, sorts, statistics)
+_engine_lock = threading.RLock()
+_options = {'pivot': 'last', 'partition': 'lomuto', 'introsort': False, 'cutoff': None,
+            'leaf': 'insertion', 'parallel_partition': 0, 'task_threshold': 0, 'task_depth': 0,
+            'algorithm': 'quicksort'}
+
+
+# Mirror of SortOptions in Common/partition.h
+class SortOptions(ctypes.Structure):
+    _fields_ = [
+        ('pivot', ctypes.c_int),
+        ('scheme', ctypes.c_int),
+        ('depth_guard', ctypes.c_int),
+        ('cutoff', ctypes.c_int),
+        ('leaf', ctypes.c_int),
+    ]
+
+
+# Library loading
+
+def _load(name):
+    with _engine_lock:
+        if name not in _libs:
+            path = os.path.join(LIB_DIR, name)
+            if not os.path.exists(path):
+                raise OSError(f"{path} not found - run 'make' in {LIB_DIR} first")
+            # CDLL (not PyDLL) drops the GIL while the foreign function runs
+            lib = ctypes.CDLL(path)
+            _declare(lib)
+            _libs[name] = lib
+            _apply_options(lib)
+        return _libs[name]
+
+def _declare(lib):
+    int_p = ctypes.POINTER(ctypes.c_int)
+    if hasattr(lib, 'quickSort'):
+        lib.quickSort.argtypes = [int_p, ctypes.c_int, ctypes.c_int]
+        lib.quickSort.restype = None
+    if hasattr(lib, 'sortParallel'):
+        lib.sortParallel.argtypes = [int_p, ctypes.c_int, ctypes.c_int]
+        lib.sortParallel.restype = None
+    if hasattr(lib, 'sortTyped'):
+        lib.sortTyped.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t,
+                                  ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.sortTyped.restype = ctypes.c_int
+        lib.argSortTyped.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t,
+                                     ctypes.c_int, ctypes.c_int]
+        lib.argSortTyped.restype = ctypes.c_int
+    if hasattr(lib, 'sortSegments'):
+        lib.sortSegments.argtypes = [int_p, int_p, ctypes.c_int, ctypes.c_int]
+        lib.sortSegments.restype = ctypes.c_int
+
+
+def _apply_options(lib):
+    opts = SortOptions.in_dll(lib, 'sort_options')
+    opts.pivot = PIVOTS[_options['pivot']]
+    opts.scheme = PARTITIONS[_options['partition']]
+    opts.depth_guard = int(_options['introsort'])
+    opts.cutoff = -1 if _options['cutoff'] is None else _options['cutoff']
+    opts.leaf = LEAVES[_options['leaf']]
+    if hasattr(lib, 'sortParallel'):
+        threshold = ctypes.c_int.in_dll(lib, 'parallel_partition_threshold')
+        threshold.value = _options['parallel_partition']
+        ctypes.c_int.in_dll(lib, 'task_threshold').value = _options['task_threshold']
+        ctypes.c_int.in_dll(lib, 'task_depth_limit').value = _options['task_depth']
+        ctypes.c_int.in_dll(lib, 'sort_algorithm').value = ALGORITHMS[_options['algorithm']]
+
+
+# Argument checks
+
+def _as_int_pointer(arr):
+    if not isinstance(arr, np.ndarray):
+        raise TypeError(f"expected a numpy.ndarray, got {type(arr).__name__}")
+    if arr.dtype != np.int32:
+        raise TypeError(f"expected dtype int32, got {arr.dtype}")
+    if arr.ndim != 1:
+        raise ValueError(f"expected a 1-D array, got {arr.ndim} dimensions")
+    if not arr.flags['C_CONTIGUOUS']:
+        raise ValueError("array must be C-contiguous to be sorted in place")
+    if not arr.flags['WRITEABLE']:
+        raise ValueError("array is read-only")
+    if arr.size > MAX_SIZE:
+        raise ValueError(f"array has {arr.size} elements; the maximum is {MAX_SIZE}")
+    return arr.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
+
+def _check_typed(arr, name, writeable=True):
+    if not isinstance(arr, np.ndarray):
+        raise TypeError(f"{name}: expected a numpy.ndarray, got {type(arr).__name__}")
+    if arr.ndim != 1:
+        raise ValueError(f"{name}: expected a 1-D array, got {arr.ndim} dimensions")
+    if not arr.flags['C_CONTIGUOUS']:
+        raise ValueError(f"{name}: array must be C-contiguous")
+    if writeable and not arr.flags['WRITEABLE']:
+        raise ValueError(f"{name}: array is read-only")
+
+def _key_type(keys):
+    _check_typed(keys, 'keys')
+    if keys.dtype not in KEY_TYPES:
+        names = sorted(str(dtype) for dtype in KEY_TYPES)
+        raise TypeError(f"unsupported key dtype {keys.dtype}; choose from {names}")
+    return KEY_TYPES[keys.dtype]
+
+
+# Public API
+
+def configure(pivot=None, partition=None, introsort=None, cutoff=None, leaf=None,
+              parallel_partition=None, task_threshold=None, task_depth=None,
+              algorithm=None):
+    """Select the partition strategy used by every later sort call.
+
+    pivot is 'last', 'median3' or 'ninther'; partition is 'lomuto', '3way' or
+    'block'; introsort enables the heapsort fallback; cutoff is the leaf
+    sort size (-1 restores the automatic choice); leaf is 'insertion' or
+    'network' (SIMD bitonic sorting network); parallel_partition is the
+    range size from which sort_parallel partitions with the whole thread team
+    (0 disables it); task_threshold and task_depth override the automatic
+    task granularity of sort_parallel (0 restores it); algorithm selects
+    'quicksort' (tasks), 'samplesort', 'radix' or 'auto' (an engine chosen
+    per call from a sample of the input, see last_dispatch) for
+    sort_parallel.  The setting is process-wide.
+    """
+    if pivot is not None:
+        if pivot not in PIVOTS:
+            raise ValueError(f"unknown pivot {pivot!r}; choose from {sorted(PIVOTS)}")
+        _options['pivot'] = pivot
+    if partition is not None:
+        if partition not in PARTITIONS:
+            raise ValueError(f"unknown partition {partition!r}; choose from {sorted(PARTITIONS)}")
+        _options['partition'] = partition
+    if leaf is not None:
+        if leaf not in LEAVES:
+            raise ValueError(f"unknown leaf {leaf!r}; choose from {sorted(LEAVES)}")
+        _options['leaf'] = leaf
+    if algorithm is not None:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown algorithm {algorithm!r}; choose from {sorted(ALGORITHMS)}")
+        _options['algorithm'] = algorithm
+    if introsort is not None:
+        _options['introsort'] = bool(introsort)
+    if cutoff is not None:
+        if int(cutoff) < -1:
+            raise ValueError(f"cutoff must be -1 (auto) or >= 0, got {cutoff}")
+        _options['cutoff'] = None if int(cutoff) == -1 else int(cutoff)
+    if parallel_partition is not None:
+        if int(parallel_partition) < 0:
+            raise ValueError(f"parallel_partition must be >= 0, got {parallel_partition}")
+        _options['parallel_partition'] = int(parallel_partition)
+    for name, value in (('task_threshold', task_threshold), ('task_depth', task_depth)):
+        if value is not None:
+            if int(value) < 0:
+                raise ValueError(f"{name} must be >= 0, got {value}")
+            _options[name] = int(value)
+    with _engine_lock:
+        for lib in _libs.values():
+            _apply_options(lib)
+    return dict(_options)
+
+def sort_serial(arr):
+    """Sort an int32 array in place with quickSort from Serial/serial.c."""
+    ptr = _as_int_pointer(arr)
+    if arr.size > 1:
+        with _engine_lock:
+            _load(SERIAL_LIB).quickSort(ptr, 0, arr.size - 1)
+    return arr
+
+def sort_parallel(arr, num_threads=0):
+    """Sort an int32 array in place with quickSortParallel from OpenMP/quicksort_omp.c.
+
+    num_threads <= 0 uses the OpenMP default (OMP_NUM_THREADS or all cores).
+    """
+    ptr = _as_int_pointer(arr)
+    if arr.size > 1:
+        with _engine_lock:
+            _load(OMP_LIB).sortParallel(ptr, arr.size, int(num_threads))
+    return arr
+
+def last_dispatch():
+    """Return (engine, reason) of the most recent sort_parallel call with algorithm='auto'.
+
+    The engine keeps one record per process, so this is the most recent call
+    from any thread, not necessarily from the calling one.  engine is one of
+    ENGINES; set QUICKSORT_DISPATCH_LOG in the environment to have every
+    decision printed to stderr as well.
+    """
+    with _engine_lock:
+        lib = _load(OMP_LIB)
+        engine = ctypes.c_int.in_dll(lib, 'dispatch_engine').value
+        reason = (ctypes.c_char * 160).in_dll(lib, 'dispatch_reason').value.decode()
+    return ENGINES[engine], reason
+
+def sort_keys(keys, num_threads=0):
+    """Sort an int32, int64, uint32, uint64, float32 or float64 array in place.
+
+    Uses the typed sorts from Common/typed_sort.h (size_t indices, ninther
+    pivot, three-way partition, introsort); NaNs are placed last.
+    """
+    key_type = _key_type(keys)
+    with _engine_lock:
+        _load(OMP_LIB).sortTyped(keys.ctypes.data, None, keys.size, key_type, 0, int(num_threads))
+    return keys
+
+def sort_pairs(keys, values, num_threads=0):
+    """Sort keys in place and apply the same permutation to values.
+
+    values may have any dtype with 4- or 8-byte items (record ids, float
+    payloads, pointers); its bytes move with their key.  The sort is not stable.
+    """
+    key_type = _key_type(keys)
+    _check_typed(values, 'values')
+    if values.size != keys.size:
+        raise ValueError(f"keys has {keys.size} elements but values has {values.size}")
+    if values.itemsize not in PAYLOAD_TYPES:
+        raise TypeError(f"values must have 4- or 8-byte items, got {values.dtype}")
+    with _engine_lock:
+        _load(OMP_LIB).sortTyped(keys.ctypes.data, values.ctypes.data, keys.size, key_type,
+                                 PAYLOAD_TYPES[values.itemsize], int(num_threads))
+    return keys, values
+
+def argsort(keys, num_threads=0):
+    """Return the int64 index permutation that sorts keys; keys are not modified.
+
+    Equal keys may appear in any order (the sort is not stable).
+    """
+    _check_typed(keys, 'keys', writeable=False)
+    if keys.dtype not in KEY_TYPES:
+        names = sorted(str(dtype) for dtype in KEY_TYPES)
+        raise TypeError(f"unsupported key dtype {keys.dtype}; choose from {names}")
+    index = np.empty(keys.size, dtype=np.int64)
+    with _engine_lock:
+        status = _load(OMP_LIB).argSortTyped(keys.ctypes.data, index.ctypes.data, keys.size,
+                                             KEY_TYPES[keys.dtype], int(num_threads))
+    if status != 0:
+        raise MemoryError(f"could not allocate scratch space for {keys.size} keys")
+    return index
+
+def sort_segments(arr, offsets, num_threads=0):
+    """Sort every segment arr[offsets[s]:offsets[s + 1]] of an int32 array in place.
+
+    offsets holds S + 1 non-decreasing positions for S segments, from 0 or
+    later up to at most arr.size.  All segments are sorted in one parallel
+    region, small ones in chunks of equal estimated cost and large ones by the
+    whole thread team; pass many segments per call for the best throughput.
+    """
+    ptr = _as_int_pointer(arr)
+    # (checked before the conversion to int32, which would wrap large values)
+    positions = np.asarray(offsets)
+    if positions.ndim != 1 or positions.size < 1:
+        raise ValueError("offsets must be a 1-D array of at least one position")
+    if positions.dtype.kind not in 'iu':
+        raise TypeError(f"offsets must be integers, not {positions.dtype}")
+    if positions.size > 1:
+        if positions[0] < 0 or positions[-1] > min(arr.size, np.iinfo(np.int32).max):
+            raise ValueError(f"offsets must lie within 0..{arr.size}")
+        if np.any(positions[1:] < positions[:-1]):
+            raise ValueError("offsets must be non-decreasing")
+        offsets = np.ascontiguousarray(positions, dtype=np.int32)
+        with _engine_lock:
+            status = _load(OMP_LIB).sortSegments(ptr, offsets.ctypes.data_as(ctypes.POINTER(ctypes.c_int)),
+                                                 offsets.size - 1, int(num_threads))
+        if status != 0:
+            raise MemoryError(f"could not allocate the plan for {offsets.size - 1} segments")
+    return arr
+
+def task_stats():
+    """Task threshold, depth limit and task count of the most recent sort_parallel call.
+
+    The engine keeps one set of statistics per process, so this is the most
+    recent call from any thread, not necessarily from the calling one.
+    """
+    with _engine_lock:
+        lib = _load(OMP_LIB)
+        return {
+            'task_threshold': ctypes.c_int.in_dll(lib, 'active_task_threshold').value,
+            'task_depth_limit': ctypes.c_int.in_dll(lib, 'active_task_depth_limit').value,
+            'tasks_created': ctypes.c_long.in_dll(lib, 'tasks_created').value,
+        }
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = np.random.default_rng()
+
+    for name, sorter in (('Serial', sort_serial), ('OpenMP', sort_parallel)):
+        data = rng.integers(0, 100000, size=size, dtype=np.int32)
+        start = time.perf_counter()
+        if sorter is sort_parallel:
+            sorter(data, threads)
+        else:
+            sorter(data)
+        elapsed = time.perf_counter() - start
+        ok = bool(np.all(data[:-1] <= data[1:]))
+        print(f"{name:<8} {size} elements  {elapsed:.6f} s  "
+              f"{(size / elapsed) / 1e6:.2f} M/s  sorted={ok}")
+
+    # Segmented sort: one segment per 256 keys on average, all in one call
+    data = rng.integers(0, 100000, size=size, dtype=np.int32)
+    segments = max(size // 256, 1)
+    offsets = np.sort(rng.integers(0, size + 1, size=segments + 1, dtype=np.int32))
+    offsets[0], offsets[-1] = 0, size
+    start = time.perf_counter()
+    sort_segments(data, offsets, threads)
+    elapsed = time.perf_counter() - start
+    ok = all(bool(np.all(part[:-1] <= part[1:])) for part in np.split(data, offsets[1:-1]))
+    print(f"{'Segments':<8} {segments} segments  {elapsed:.6f} s  "
+          f"{(segments / elapsed) / 1e6:.2f} M/s  sorted={ok}")
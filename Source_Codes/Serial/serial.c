@@ -1,58 +1,31 @@
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <time.h>
+#include "../Common/partition.h"
+#include "../Common/radix_sort.h"
+#include "../Common/report.h"
+#include "../Common/generate.h"
+#include "../Common/keyio.h"
+#include "../Common/verify.h"
 
-// Function to swap two elements
-void swap(int* a, int* b) {
-    int temp = *a;
-    *a = *b;
-    *b = temp;
-}
+// Partition strategy selected on the command line
+SortOptions sort_options = SORT_OPTIONS_DEFAULT;
 
-// Partition function 
-// smaller elements to left, larger to right
-int partition(int arr[], int low, int high) {
-    int pivot = arr[high];  // Choose rightmost element as pivot
-    int i = low - 1;        // Index of smaller element
-    
-    for (int j = low; j < high; j++) {
-        // If current element is smaller than pivot
-        if (arr[j] < pivot) {
-            i++;
-            swap(&arr[i], &arr[j]);
-        }
-    }
-    swap(&arr[i + 1], &arr[high]);
-    return i + 1;
-}
+// Sort with the radix backend instead of quick sort (--radix)
+int use_radix = 0;
+
+// Input distribution, seed and key range (keys 0-9999 by default)
+InputSpec input_spec = INPUT_SPEC_DEFAULT(10000);
 
 // Quick Sort function
 void quickSort(int arr[], int low, int high) {
-    if (low < high) {
-        // Partition the array and get pivot index
-        int pi = partition(arr, low, high);
-        
-        // Recursively sort elements before & after partition
-        quickSort(arr, low, pi - 1);
-        quickSort(arr, pi + 1, high);
-    }
+    introSort(arr, low, high, &sort_options);
 }
 
-// Function to generate random array
+// Function to generate the input array (--distribution, --seed, --range)
 void generateRandomArray(int arr[], int size) {
-    for (int i = 0; i < size; i++) {
-        arr[i] = rand() % 10000;
-    }
-}
-
-// Function to verify if array is sorted
-int isSorted(int arr[], int size) {
-    for (int i = 0; i < size - 1; i++) {
-        if (arr[i] > arr[i + 1]) {
-            return 0;
-        }
-    }
-    return 1;
+    generateKeys(arr, (size_t)size, &input_spec, 1);
 }
 
 // Print array function
@@ -78,53 +51,136 @@ void printArray(int arr[], int size) {
     }
 }
 
-int main() {
-    int size;
-    
-    
-    printf("Enter array size: ");
-    if (scanf("%d", &size) != 1) {
-        printf("Error: Invalid input!\n");
-        return 1;
+#ifndef QUICKSORT_NO_MAIN
+int main(int argc, char* argv[]) {
+    int size = 0;
+    int first_option = 1;
+    
+    // Optional array size before the options (otherwise read from stdin)
+    if (argc > 1 && strncmp(argv[1], "--", 2) != 0) {
+        char* end;
+        long value = strtol(argv[1], &end, 10);
+        if (end == argv[1] || *end != '\0' || value < 0 || value > 2147483647L) {
+            printf("Error: Invalid array size '%s'!\n", argv[1]);
+            return 1;
+        }
+        size = (int)value;
+        first_option = 2;
     }
     
-   
-    if (size <= 0) {
-        printf("Error: Array size must be positive!\n");
+    // Parse optional partition strategy, input and output flags
+    for (int i = first_option; i < argc; i++) {
+        if (strcmp(argv[i], "--radix") == 0) {
+            use_radix = 1;
+            continue;
+        }
+        int status = parseSortOption(argv[i], &sort_options);
+        if (status == 0) {
+            status = parseInputOption(argv[i], &input_spec);
+        }
+        if (status == 0) {
+            status = parseKeyIoOption(argv[i]);
+        }
+        if (status == 0) {
+            status = parseOutputOption(argv[i]);
+        }
+        if (status != 1) {
+            printf("Usage: %s [array_size] [options]\n", argv[0]);
+            printf("Options:\n%s%s%s%s%s", SORT_OPTIONS_USAGE, RADIX_OPTION_USAGE, INPUT_OPTIONS_USAGE,
+                   KEY_IO_OPTIONS_USAGE, OUTPUT_OPTIONS_USAGE);
+            return 1;
+        }
+    }
+    if (keyIoBegin() != 0) {
         return 1;
     }
+    reportBegin();
     
-    // Allocate memory for array
-    int* arr = (int*)malloc(size * sizeof(int));
+    // No size on the command line: read it from stdin (prompt on a terminal)
+    if (first_option == 1 && key_input_path == NULL) {
+        if (isatty(REPORT_FILENO(stdin))) {
+            printf("Enter array size: ");
+            fflush(stdout);
+        }
+        if (scanf("%d", &size) != 1) {
+            printf("Error: Invalid input!\n");
+            return 1;
+        }
+    }
     
-    if (arr == NULL) {
-        printf("Error: Memory allocation failed!\n");
+    if (size <= 0 && key_input_path == NULL) {
+        printf("Error: Array size must be positive!\n");
         return 1;
     }
     
-    // Seed random number generator
-    srand(time(NULL));
-    
-    // Generate random array
-    generateRandomArray(arr, size);
+    int* arr;
+    unsigned seed = 0;
+    const char* input_name;
+    clock_t generate_start = clock();
+    if (key_input_path != NULL) {
+        // Keys from a file (mapped) or stdin, at most size of them if given
+        long long count;
+        arr = loadKeys(key_input_path, size, &count);
+        if (arr == NULL) {
+            return 1;
+        }
+        if (count > 2147483647LL) {
+            printf("Error: %lld keys is more than this program can sort!\n", count);
+            releaseKeys(arr);
+            return 1;
+        }
+        size = (int)count;
+        input_name = keyInputName();
+    } else {
+        // Allocate memory for array
+        arr = (int*)malloc(size * sizeof(int));
+        
+        if (arr == NULL) {
+            printf("Error: Memory allocation failed!\n");
+            return 1;
+        }
+        
+        // Seed of the input generator
+        seed = inputSeed(&input_spec);
+        
+        // Generate random array
+        generateRandomArray(arr, size);
+        input_name = DISTRIBUTION_NAMES[input_spec.distribution];
+    }
+    double generate_time = ((double)(clock() - generate_start)) / CLOCKS_PER_SEC;
     
    
     printf("\n===================\n");
-    printf("Serial Quick Sort\n");
+    printf("Serial %s\n", use_radix ? "Radix Sort" : "Quick Sort");
     printf("===================\n");
     
     
-    printf("Array Size: %d\n\n", size);
+    printf("Array Size: %d\n", size);
+    if (key_input_path != NULL) {
+        printf("Input: %s\n\n", (strcmp(key_input_path, "-") == 0) ? "stdin" : key_input_path);
+    } else {
+        printf("Input: %s, seed %u\n\n", input_name, seed);
+    }
     
     
     printf("Before sorting: \n");
     printArray(arr, size);
     printf("\n");
     
+    // Checksum of the input, compared with the output's after the sort
+    clock_t checksum_start = clock();
+    KeyChecksum input_checksum = checksumKeys(arr, (size_t)size, 1);
+    double checksum_time = ((double)(clock() - checksum_start)) / CLOCKS_PER_SEC;
+    
     // Measure execution time
+    PROFILE_RESET();
+    PROFILE_PERF_START();
     clock_t start = clock();
-    quickSort(arr, 0, size - 1);
+    if (!use_radix || radixSort(arr, size, 1) != 0) {
+        quickSort(arr, 0, size - 1);
+    }
     clock_t end = clock();
+    PROFILE_PERF_STOP();
     
     double time_taken = ((double)(end - start)) / CLOCKS_PER_SEC;
     
@@ -135,18 +191,54 @@ int main() {
     
     
     printf("Verifying sorted array...\n");
-    if (isSorted(arr, size)) {
-        printf("✓ SUCCESS: Array is correctly sorted!\n\n");
-    } else {
-        printf("✗ FAILED: Array is NOT correctly sorted!\n\n");
-    }
+    clock_t verify_start = clock();
+    KeyChecksum output_checksum;
+    int ordered = verifyKeys(arr, (size_t)size, &output_checksum, 1);
+    int permutation = checksumEqual(&input_checksum, &output_checksum);
+    int sorted = ordered && permutation;
+    double verify_time = ((double)(clock() - verify_start)) / CLOCKS_PER_SEC + checksum_time;
+    printVerification(ordered, permutation);
+    printf("\n");
     
    
+    if (use_radix) {
+        printf(RADIX_PLAN_FORMAT, RADIX_PLAN_ARGS);
+    } else if (sort_options.leaf == LEAF_NETWORK) {
+        printf(LEAF_SORT_FORMAT, LEAF_SORT_ARGS(&sort_options));
+    }
     printf("Execution Time: %.6f seconds\n", time_taken);
+    printf("Verification Time: %.6f seconds (order + permutation checksum)\n", verify_time);
+    
+    // Sorted keys (--output)
+    double write_time = 0.0;
+    if (key_output_path != NULL) {
+        clock_t write_start = clock();
+        if (writeKeys(key_output_path, arr, (size_t)size) != 0) {
+            releaseKeys(arr);
+            return 1;
+        }
+        write_time = ((double)(clock() - write_start)) / CLOCKS_PER_SEC;
+        printf("Wrote %d keys to %s\n", size, (strcmp(key_output_path, "-") == 0) ? "stdout" : key_output_path);
+    }
+    
+    // Machine-readable record (--json / --csv)
+    RunRecord record = { "serial", use_radix ? "radix sort" : "quick sort",
+                         input_name, size, 1, 1, seed,
+                         time_taken, sorted, 0, {0}, {0} };
+    reportPhase(&record, key_input_path != NULL ? "read" : "generate", generate_time);
+    reportPhase(&record, "sort", time_taken);
+    reportPhase(&record, "verify", verify_time);
+    if (key_output_path != NULL) {
+        reportPhase(&record, "write", write_time);
+    }
+    
+    // Phase breakdown and counters (profiling builds only)
+    PROFILE_REPORT(&record);
     printf("----------------------------------------\n");
     
-    // Free allocated memory
-    free(arr);
+    // Free allocated memory (or unmap the input file)
+    releaseKeys(arr);
     
-    return 0;
-}
\ No newline at end of file
+    return reportWrite(&record) == 0 ? 0 : 1;
+}
+#endif // QUICKSORT_NO_MAIN